@@ -0,0 +1,355 @@
+"""Time the fetch -> indicators -> serialize hot path on synthetic data.
+
+Run from the repository root::
+
+    python benchmarks/run_benchmarks.py                      # print results
+    python benchmarks/run_benchmarks.py --max-bars 100000    # skip the big sizes
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --save-baseline
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+
+With ``--baseline`` (and without ``--save-baseline``) every case is
+compared to the stored best time. The run exits with status 1 when a case
+is slower than ``baseline * (1 + tolerance)`` by more than the noise floor.
+Baselines depend on the machine, so record one on the host that runs the
+comparison.
+
+``MetaTrader5`` is replaced by an in-process stub that serves synthetic
+rates, so no terminal is needed and the numbers measure only our code.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.insert(0, str(ROOT / "src"))
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (50, 5_000, 500_000, 5_000_000)
+DEFAULT_CALLS = 1_000
+SIMULATED_SIGNALS = 20_000
+INDICATORS = {"atr14": True, "rsi14": True, "sma20": True, "ema50": True, "sma200": True}
+BAR_SECONDS = 300
+START_TIME = 1_600_000_000
+# larger sizes are dominated by the work itself, so skip their warm-up run
+_WARMUP_MAX = 100_000
+
+
+# -- synthetic data -------------------------------------------------------
+def synthetic_rates(bars: int, seed: int = 7, start: int = START_TIME) -> np.ndarray:
+    """Return *bars* M5 rates as an MT5 structured array (random walk)."""
+    from gpt_trader.fetch.bar_store import BAR_DTYPE
+
+    rng = np.random.default_rng(seed)
+    close = 2000.0 + np.cumsum(rng.normal(0.0, 0.5, bars))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0.0, 0.4, bars))
+    rates = np.zeros(bars, dtype=BAR_DTYPE)
+    rates["time"] = start + np.arange(bars, dtype=np.int64) * BAR_SECONDS
+    rates["open"] = np.round(open_, 2)
+    rates["close"] = np.round(close, 2)
+    rates["high"] = np.round(np.maximum(open_, close) + spread, 2)
+    rates["low"] = np.round(np.minimum(open_, close) - spread, 2)
+    rates["tick_volume"] = rng.integers(50, 500, bars)
+    return rates
+
+
+def synthetic_frame(bars: int, seed: int = 7):
+    """Return *bars* rates as the OHLCV frame the indicators expect."""
+    from gpt_trader.fetch.fetch_mt5_data import _rates_to_frame
+
+    return _rates_to_frame(synthetic_rates(bars, seed))
+
+
+def synthetic_reply(seed: int = 0) -> str:
+    """Return a GPT-style reply with a fenced signal JSON."""
+    signal = {
+        "signal_id": f"xauusd{START_TIME + seed}",
+        "entry": 2034.5,
+        "sl": 2029.0,
+        "tp": 2045.0,
+        "pending_order_type": "buy_limit",
+        "confidence": 72,
+        "short_reason": "Higher lows on M15 with RSI holding above 50",
+    }
+    return "Analysis of the current structure.\n```json\n" + json.dumps(signal, indent=2) + "\n```\n"
+
+
+def _stub_mt5(rates: np.ndarray) -> ModuleType:
+    mt5 = ModuleType("MetaTrader5")
+    for value, name in enumerate(["M1", "M5", "M15", "M30", "H1", "H4", "D1"], start=1):
+        setattr(mt5, f"TIMEFRAME_{name}", value)
+    for value, name in enumerate(["BUY_LIMIT", "SELL_LIMIT", "BUY_STOP", "SELL_STOP"], start=2):
+        setattr(mt5, f"ORDER_TYPE_{name}", value)
+    mt5.initialize = lambda *args, **kwargs: True
+    mt5.shutdown = lambda: None
+    mt5.last_error = lambda: (0, "stub")
+    mt5.terminal_info = lambda: object()
+    mt5.copy_rates_from_pos = lambda symbol, tf, pos, count: rates[len(rates) - count :]
+    return mt5
+
+
+def install_stub_mt5(max_bars: int) -> None:
+    """Replace ``MetaTrader5`` with a stub serving *max_bars* synthetic rates."""
+    sys.modules["MetaTrader5"] = _stub_mt5(synthetic_rates(max_bars + 1_000))
+
+
+# -- timing ---------------------------------------------------------------
+def time_call(
+    func: Callable[[], Any], repeat: int = 5, budget: float = 2.0
+) -> dict[str, Any]:
+    """Return the best and median wall time of *func* over up to *repeat* runs.
+
+    Runs stop early once *budget* seconds have been spent, so the large
+    sizes are measured once or twice instead of *repeat* times.
+    """
+    times = []
+    spent = 0.0
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        times.append(elapsed)
+        spent += elapsed
+        if spent >= budget:
+            break
+    return {"best": min(times), "median": statistics.median(times), "runs": len(times)}
+
+
+class Case:
+    """One benchmark: ``setup(size)`` returns the callable timed for *size*."""
+
+    __slots__ = ("name", "setup", "sizes", "unit")
+
+    def __init__(
+        self,
+        name: str,
+        setup: Callable[[int], Callable[[], Any]],
+        sizes: Iterable[int],
+        unit: str = "bars",
+    ) -> None:
+        self.name = name
+        self.setup = setup
+        self.sizes = tuple(sizes)
+        self.unit = unit
+
+
+def _compute_indicators(size: int) -> Callable[[], Any]:
+    from gpt_trader.utils.indicators import compute_indicators
+
+    df = synthetic_frame(size)
+    return lambda: compute_indicators(df, INDICATORS)
+
+
+def _fetch_multi_tf(size: int) -> Callable[[], Any]:
+    from gpt_trader.fetch import fetch_mt5_data
+
+    config = {
+        "timeframes": [{"tf": "M5", "keep": size}],
+        "indicators": INDICATORS,
+        "fetch_bars": "auto",
+    }
+    return lambda: fetch_mt5_data.fetch_multi_tf("XAUUSD", config)
+
+
+def _write_json_no_nulls(size: int, workdir: Path) -> Callable[[], Any]:
+    from gpt_trader.fetch import fetch_mt5_data
+    from gpt_trader.utils import write_json_no_nulls
+
+    config = {"timeframes": [{"tf": "M5", "keep": size}], "indicators": INDICATORS}
+    df = fetch_mt5_data.fetch_multi_tf("XAUUSD", config)
+    # every size overwrites the same file, so only the largest stays on disk
+    out = workdir / "bars.json"
+    return lambda: write_json_no_nulls(df, out)
+
+
+def _extract_json(calls: int) -> Callable[[], Any]:
+    from gpt_trader.parse.parse_gpt_response import _extract_json as extract
+
+    replies = [synthetic_reply(i) for i in range(calls)]
+    return lambda: [extract(text) for text in replies]
+
+
+def _calculate_lot(calls: int) -> Callable[[], Any]:
+    from gpt_trader.cli.latest_signal_to_mt5 import TradeSignalSender
+
+    sender = TradeSignalSender.__new__(TradeSignalSender)
+    sender.risk_per_trade = 1.0
+    sender.entry = 2034.5
+    stops = (2034.5 - np.linspace(0.5, 20.0, calls)).tolist()
+
+    def run() -> None:
+        for sl in stops:
+            sender.sl = sl
+            sender.calculate_lot(10_000.0, 1.0, 0.01, 0.01, 100.0, 0.01)
+
+    return run
+
+
+def _simulate_trades(size: int) -> Callable[[], Any]:
+    import pandas as pd
+
+    from gpt_trader.backtest.simulator import TradeSimulator
+
+    rates = synthetic_rates(size)
+    rng = np.random.default_rng(3)
+    picks = rng.integers(0, size, SIMULATED_SIGNALS)
+    close = rates["close"][picks]
+    entry = close - rng.uniform(0.5, 5.0, len(picks))
+    signals = pd.DataFrame(
+        {
+            "timestamp": pd.to_datetime(rates["time"][picks], unit="s").astype(str),
+            "signal_id": "xauusd",
+            "entry": entry,
+            "sl": entry - 5.0,
+            "tp": entry + 10.0,
+            "pending_order_type": "buy_limit",
+            "confidence": 70,
+        }
+    )
+    simulator = TradeSimulator(max_risk_per_trade=1.0, spread=0.2)
+    return lambda: simulator.run(signals, rates)
+
+
+def default_cases(
+    sizes: Iterable[int], workdir: Path, calls: int = DEFAULT_CALLS
+) -> list[Case]:
+    """Return the standard cases; files they write go to *workdir*."""
+    sizes = tuple(sizes)
+    return [
+        Case("compute_indicators", _compute_indicators, sizes),
+        Case("fetch_multi_tf", _fetch_multi_tf, sizes),
+        Case("write_json_no_nulls", partial(_write_json_no_nulls, workdir=workdir), sizes),
+        Case("extract_json", _extract_json, (calls,), unit="calls"),
+        Case("calculate_lot", _calculate_lot, (calls,), unit="calls"),
+        Case("simulate_trades", _simulate_trades, sizes),
+    ]
+
+
+def run_cases(
+    cases: Iterable[Case], repeat: int = 5, budget: float = 2.0, only: Optional[str] = None
+) -> dict[str, dict[str, Any]]:
+    """Run *cases* and return the timings keyed by ``name[size unit]``."""
+    results = {}
+    for case in cases:
+        if only and only not in case.name:
+            continue
+        for size in case.sizes:
+            key = f"{case.name}[{size} {case.unit}]"
+            func = case.setup(size)
+            if size <= _WARMUP_MAX:
+                func()  # warm-up: imports, caches, first allocation
+            results[key] = time_call(func, repeat, budget)
+            results[key]["size"] = size
+            LOGGER.info("%-40s best %.6fs median %.6fs", key, results[key]["best"], results[key]["median"])
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    tolerance: float = 0.25,
+    noise_floor: float = 0.001,
+) -> list[str]:
+    """Return one message per case slower than its *baseline* entry."""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        limit = base["best"] * (1 + tolerance)
+        if current["best"] > limit and current["best"] - base["best"] > noise_floor:
+            regressions.append(
+                f"{key}: {current['best']:.6f}s vs baseline {base['best']:.6f}s "
+                f"({current['best'] / base['best']:.2f}x)"
+            )
+    return regressions
+
+
+def _report(results: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the fetch/serialize hot path")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="Comma separated bar counts",
+    )
+    parser.add_argument("--max-bars", type=int, help="Drop sizes above this bar count")
+    parser.add_argument("--calls", type=int, default=DEFAULT_CALLS, help="Calls per scalar case")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case")
+    parser.add_argument("--budget", type=float, default=2.0, help="Seconds per case before stopping")
+    parser.add_argument("--only", help="Only run cases whose name contains this text")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against (or to write)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown fraction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    # fetch_multi_tf logs every request; keep the output to the results
+    logging.getLogger("gpt_trader").setLevel(logging.WARNING)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    if args.max_bars:
+        sizes = [s for s in sizes if s <= args.max_bars]
+    install_stub_mt5(max(sizes, default=DEFAULT_SIZES[0]))
+    # measure the encoder, not the disk
+    from gpt_trader.utils.atomic_io import set_fsync_policy
+
+    set_fsync_policy("never")
+
+    with tempfile.TemporaryDirectory(prefix="gpt_trader_bench_") as workdir:
+        cases = default_cases(sizes, Path(workdir), args.calls)
+        results = run_cases(cases, args.repeat, args.budget, args.only)
+    report = _report(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        LOGGER.info("Saved results to %s", args.output)
+
+    if not args.baseline:
+        return
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        if baseline_path.exists():
+            stored = json.loads(baseline_path.read_text(encoding="utf-8"))
+            stored["results"].update(results)
+            report["results"] = stored["results"]
+        baseline_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        LOGGER.info("Saved baseline to %s", baseline_path)
+        return
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        LOGGER.error("Regression %s", message)
+    if regressions:
+        raise SystemExit(1)
+    LOGGER.info("No regressions against %s", baseline_path)
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main()
@@ -0,0 +1,399 @@
+"""In-process backtest engine.
+
+The bar history of every configured timeframe is loaded once for the whole
+backtest period. Each step then slices the point-in-time window ending at
+the step time from memory and runs the fetch, prompt and parse logic as
+plain function calls, so no interpreter is started per step.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from gpt_trader.backtest.pipeline import Pipeline
+from gpt_trader.fetch.bar_store import BarIndex, BarStore
+from gpt_trader.parse.parse_gpt_response import (
+    _extract_json,
+    append_signal_row,
+    make_signal_row,
+    save_signal,
+)
+from gpt_trader.send.send_to_gpt import (
+    _build_messages,
+    _call_gpt,
+    _save_prompt_copy,
+    build_prompt,
+    create_async_client,
+    create_client,
+)
+from gpt_trader.send.gpt_pool import GptPool, OrderedWriter
+from gpt_trader.send.payload import prepare_payload
+from gpt_trader.send.response_cache import cache_key, lookup, open_cache, store
+from gpt_trader.utils import atomic_write_text, dumps_no_nulls
+from gpt_trader.utils.indicator_registry import parse_specs, resolve_fetch_bars
+
+if TYPE_CHECKING:  # pragma: no cover - only for type hints
+    from openai import OpenAI
+
+LOGGER = logging.getLogger(__name__)
+
+# Extra history loaded before the first step so weekends and holidays do
+# not leave the first windows short.
+HISTORY_MARGIN = pd.Timedelta(days=4)
+
+
+class BarHistory(BarIndex):
+    """Preloaded bars per ``(symbol, timeframe)`` sliced by end time.
+
+    Instances are callable with the ``rates_source`` signature accepted by
+    ``fetch_multi_tf``.
+    """
+
+    def window(
+        self,
+        symbol: str,
+        tf_name: str,
+        bars: int,
+        end_time: Optional[pd.Timestamp] = None,
+    ) -> np.ndarray:
+        """Return the last *bars* bars opened at or before *end_time*."""
+        return self.ending_at(symbol, tf_name, bars, end_time)
+
+
+def backtest_steps(start: datetime, end: datetime, step: timedelta) -> list[datetime]:
+    """Return the step times from *start* to *end* inclusive."""
+    if step <= timedelta(0):
+        raise ValueError("loop_every_minutes must be positive")
+    steps = []
+    current = start
+    while current <= end:
+        steps.append(current)
+        current += step
+    return steps
+
+
+class StepPayload:
+    """Data produced by the fetch stage of one step."""
+
+    __slots__ = ("time", "signal_id", "frame", "json_text")
+
+    def __init__(self, time: datetime, signal_id: str, frame: pd.DataFrame, json_text: str) -> None:
+        self.time = time
+        self.signal_id = signal_id
+        self.frame = frame
+        self.json_text = json_text
+
+
+class BacktestEngine:
+    """Run the fetch -> GPT -> parse loop over a period in one process.
+
+    Parameters
+    ----------
+    config:
+        Backtest settings in the ``setting_backtest.json`` layout.
+    client:
+        OpenAI client; created from the ``send`` section when omitted.
+    fetch_module:
+        Module providing ``TF_MAP``, ``fetch_range`` and ``fetch_multi_tf``.
+        Defaults to :mod:`gpt_trader.fetch.fetch_mt5_data`, imported lazily
+        so the engine can be used with other sources without MetaTrader5.
+    prompt:
+        Prompt text overriding the default prompt.
+    cache_mode:
+        Response cache mode; defaults to ``send.cache_mode`` or ``"off"``.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        client: Optional["OpenAI"] = None,
+        fetch_module: Any = None,
+        prompt: Optional[str] = None,
+        cache_mode: Optional[str] = None,
+    ) -> None:
+        self.fetch_cfg: Dict[str, Any] = dict(config.get("fetch") or {})
+        self.send_cfg: Dict[str, Any] = dict(config.get("send") or {})
+        self.parse_cfg: Dict[str, Any] = dict(config.get("parse") or {})
+        self.start = datetime.fromisoformat(config.get("start_time"))
+        self.end = datetime.fromisoformat(config.get("end_time"))
+        self.step = timedelta(minutes=int(config.get("loop_every_minutes", 60)))
+        self.signal_table = Path(
+            config.get("signal_table", "data/back_test/signals/backtest_signals.csv")
+        )
+        self.symbol = self.fetch_cfg.get("symbol", "EURUSD")
+        self.signal_prefix = str(self.fetch_cfg.get("symbol_signal", self.symbol)).lower()
+        self.tz_shift = int(self.fetch_cfg.get("tz_shift", 0))
+        self.model = self.send_cfg.get("model", "gpt-4o")
+        self.prompt = prompt
+        self.cache_mode = cache_mode or self.send_cfg.get("cache_mode", "off")
+        self.cache = None
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._fetch_module = fetch_module
+        self.history = BarHistory()
+
+    # -- setup -----------------------------------------------------------
+    @property
+    def fetch_module(self) -> Any:
+        if self._fetch_module is None:
+            from gpt_trader.fetch import fetch_mt5_data
+
+            self._fetch_module = fetch_mt5_data
+        return self._fetch_module
+
+    @property
+    def client(self) -> "OpenAI":
+        with self._client_lock:
+            if self._client is None:
+                self._client = create_client(self.send_cfg)
+        return self._client
+
+    def steps(self) -> list[datetime]:
+        """Return the step times of the backtest."""
+        return backtest_steps(self.start, self.end, self.step)
+
+    def load_history(self) -> None:
+        """Load bars for every configured timeframe over the whole period."""
+        mod = self.fetch_module
+        specs = parse_specs(self.fetch_cfg.get("indicators"))
+        fetch_bars_conf = self.fetch_cfg.get("fetch_bars", "auto")
+        store_path = self.fetch_cfg.get("bar_store")
+        store = BarStore(store_path) if store_path else None
+        for item in self.fetch_cfg.get("timeframes", []):
+            tf_name = str(item.get("tf", "")).upper()
+            tf_const = mod.TF_MAP.get(tf_name)
+            if tf_const is None:
+                raise ValueError(f"Unsupported timeframe: {tf_name}")
+            bars = resolve_fetch_bars(fetch_bars_conf, specs, int(item.get("keep", 0)))
+            first = pd.Timestamp(self.start) - mod.TF_DELTA[tf_const] * bars - HISTORY_MARGIN
+            rates = mod.fetch_range(
+                self.symbol, tf_const, first, pd.Timestamp(self.end), store=store, tf_name=tf_name
+            )
+            self.history.add(self.symbol, tf_name, rates)
+            LOGGER.info("Loaded %s %s bars for %s", len(rates), tf_name, self.symbol)
+            if len(self.history.window(self.symbol, tf_name, bars, self.start)) < bars:
+                LOGGER.warning(
+                    "History for %s %s starts after the first step; early windows are short",
+                    self.symbol,
+                    tf_name,
+                )
+
+    # -- stages ----------------------------------------------------------
+    def fetch_step(self, current: datetime) -> StepPayload:
+        """Build the multi-timeframe frame for the step at *current*."""
+        step_cfg = dict(self.fetch_cfg)
+        step_cfg["time_fetch"] = current.strftime("%Y-%m-%d %H:%M:%S")
+        df = self.fetch_module.fetch_multi_tf(
+            self.symbol, step_cfg, tz_shift=self.tz_shift, rates_source=self.history
+        )
+        signal_id = f"{self.signal_prefix}{int(pd.Timestamp(current).timestamp())}"
+        payload = StepPayload(current, signal_id, df, dumps_no_nulls(df))
+        save_path = self.fetch_cfg.get("save_as_path")
+        if save_path:
+            out = Path(save_path) / f"{signal_id}.json"
+            out.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(out, payload.json_text)
+        return payload
+
+    def build_messages(self, payload: StepPayload) -> list[dict[str, str]]:
+        """Return the chat messages for *payload*, saving a prompt copy."""
+        prompt = build_prompt(payload.signal_id, self.prompt)
+        save_dir = self.send_cfg.get("save_prompt_dir")
+        if save_dir:
+            try:
+                _save_prompt_copy(
+                    Path(f"{payload.signal_id}.json"),
+                    payload.json_text,
+                    prompt,
+                    Path(save_dir),
+                    payload.signal_id,
+                )
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.warning("Failed to save prompt copy: %s", exc)
+        return _build_messages(prepare_payload(payload.json_text, self.send_cfg), prompt)
+
+    def _cached(self, messages: list[dict[str, str]]) -> tuple[str, Optional[str]]:
+        key = cache_key(self.model, messages)
+        return key, lookup(self.cache, self.cache_mode, key)
+
+    def send_messages(self, messages: list[dict[str, str]]) -> str:
+        """Return the cached or fresh GPT response to *messages*."""
+        key, response = self._cached(messages)
+        if response is None:
+            response = _call_gpt(messages, self.model, self.client)
+            store(self.cache, self.cache_mode, key, response, self.model)
+        return response
+
+    def send_step(self, payload: StepPayload) -> str:
+        """Send *payload* to GPT and return the raw response."""
+        return self.send_messages(self.build_messages(payload))
+
+    def parse_step(self, payload: StepPayload, response: str) -> Dict[str, Any]:
+        """Parse *response* and record it in the signal table.
+
+        Rows are stamped with the step time rather than the wall clock so
+        the table lines up with the backtest period.
+        """
+        latest = self.parse_cfg.get("path_latest_response")
+        if latest:
+            latest_path = Path(latest)
+            latest_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(latest_path, response)
+        data = _extract_json(response)
+        append_signal_row(self.signal_table, make_signal_row(data, payload.time))
+        json_dir = self.parse_cfg.get("path_signals_json")
+        if json_dir:
+            save_signal(data, Path(json_dir) / f"{payload.signal_id}.json")
+        return data
+
+    def run_step(self, current: datetime) -> Dict[str, Any]:
+        """Run fetch, send and parse for one step."""
+        payload = self.fetch_step(current)
+        return self.parse_step(payload, self.send_step(payload))
+
+    def run(self) -> list[Dict[str, Any]]:
+        """Run every step and return the parsed signals.
+
+        A failing step is logged and skipped so one bad response does not
+        abort a long backtest.
+        """
+        self.load_history()
+        self.cache = open_cache(self.send_cfg, self.cache_mode)
+        results = []
+        try:
+            for current in self.steps():
+                LOGGER.info("Backtest step at %s", current.isoformat())
+                try:
+                    results.append(self.run_step(current))
+                except Exception as exc:  # noqa: BLE001
+                    LOGGER.error("Backtest step %s failed: %s", current.isoformat(), exc)
+        finally:
+            self._close_cache()
+        return results
+
+    def run_pipelined(self, prefetch: int = 4, send_workers: int = 1) -> list[Dict[str, Any]]:
+        """Run every step with fetching overlapped with the GPT calls.
+
+        Up to *prefetch* steps are fetched and turned into prompts while
+        earlier steps wait on GPT; *send_workers* requests run at once.
+        Responses are parsed and appended to the signal table in step
+        order, as in :meth:`run`. A failing step is logged and skipped.
+        """
+        self.load_history()
+        self.cache = open_cache(self.send_cfg, self.cache_mode)
+        results: list[Dict[str, Any]] = []
+
+        def _prepare(current: datetime) -> tuple[StepPayload, list[dict[str, str]]]:
+            LOGGER.info("Backtest step at %s", current.isoformat())
+            payload = self.fetch_step(current)
+            return payload, self.build_messages(payload)
+
+        def _commit(current: datetime, prepared: Any, response: Any) -> None:
+            for failure in (prepared, response):
+                if isinstance(failure, Exception):
+                    LOGGER.error("Backtest step %s failed: %s", current.isoformat(), failure)
+                    return
+            try:
+                results.append(self.parse_step(prepared[0], response))
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.error("Backtest step %s failed: %s", current.isoformat(), exc)
+
+        pipeline = Pipeline(
+            _prepare,
+            lambda prepared: self.send_messages(prepared[1]),
+            _commit,
+            prefetch=prefetch,
+            send_workers=send_workers,
+        )
+        try:
+            stats = pipeline.run(self.steps())
+            LOGGER.info("%s", stats.summary())
+        finally:
+            self._close_cache()
+        return results
+
+    def _close_cache(self) -> None:
+        if self.cache is not None:
+            LOGGER.info(
+                "Response cache: %s hits, %s misses", self.cache.hits, self.cache.misses
+            )
+            self.cache.close()
+            self.cache = None
+
+    async def run_concurrent(
+        self,
+        pool_cfg: Optional[Dict[str, Any]] = None,
+        client: Any = None,
+    ) -> list[Dict[str, Any]]:
+        """Run every step with GPT requests fanned out through a pool.
+
+        All step payloads are built first, since their data windows do not
+        depend on earlier responses. Responses are parsed and appended to
+        the signal table in step order as soon as every earlier step is
+        done. Cached responses are used without a request. *pool_cfg*
+        holds :class:`GptPool` options (``concurrency``, ``rpm``, ``tpm``,
+        ``max_retries``, ``base_delay``, ``max_delay``).
+        """
+        self.load_history()
+        payloads: list[StepPayload] = []
+        for current in self.steps():
+            try:
+                payloads.append(self.fetch_step(current))
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.error("Backtest step %s failed: %s", current.isoformat(), exc)
+        requests = [self.build_messages(p) for p in payloads]
+        results: list[Dict[str, Any]] = []
+
+        def _write(index: int, response: Any) -> None:
+            payload = payloads[index]
+            if isinstance(response, Exception):
+                LOGGER.error("Backtest step %s failed: %s", payload.time.isoformat(), response)
+                return
+            try:
+                results.append(self.parse_step(payload, response))
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.error("Backtest step %s failed: %s", payload.time.isoformat(), exc)
+
+        writer = OrderedWriter(_write)
+        self.cache = open_cache(self.send_cfg, self.cache_mode)
+        try:
+            keys: list[str] = []
+            misses: list[int] = []
+            for index, messages in enumerate(requests):
+                key, cached = self._cached(messages)
+                keys.append(key)
+                if cached is None:
+                    misses.append(index)
+                else:
+                    writer.push(index, cached)
+
+            def _sent(pos: int, response: Any) -> None:
+                index = misses[pos]
+                if not isinstance(response, Exception):
+                    store(self.cache, self.cache_mode, keys[index], response, self.model)
+                writer.push(index, response)
+
+            if misses:
+                pool = GptPool(
+                    client or create_async_client(self.send_cfg),
+                    self.model,
+                    **(pool_cfg or {}),
+                )
+                LOGGER.info(
+                    "Sending %s requests with concurrency %s", len(misses), pool.concurrency
+                )
+                await pool.map([requests[i] for i in misses], _sent)
+                if pool.retries:
+                    LOGGER.info("GPT pool retried %s requests", pool.retries)
+        finally:
+            self._close_cache()
+        return results
+
+
+__all__ = ["BacktestEngine", "BarHistory", "StepPayload", "backtest_steps"]
@@ -0,0 +1,246 @@
+"""Pipelined execution of backtest steps.
+
+:class:`Pipeline` runs the steps through three stages joined by bounded
+queues::
+
+    fetch (1 thread) --[send queue]--> send (N threads) --[commit queue]--> commit
+
+While step N waits on the GPT API, the fetch thread already builds the
+frames and prompts of the next ``prefetch`` steps. Steps reach the commit
+stage out of order when several send workers run. The commit stage runs in
+the calling thread and passes them to the callback strictly in step order
+through :class:`~gpt_trader.send.gpt_pool.OrderedWriter`.
+
+Each queue publishes its depth as the gauge
+``gpt_trader_pipeline_queue_depth{queue=...}``. Waits longer than
+:data:`STALL_MIN_SECONDS` are recorded as ``pipeline_stall`` spans labelled
+with the waiting stage (``worker``) and the reason. The reason is
+``starved`` when the stage had no input, and ``blocked`` when the next
+queue was full. :class:`PipelineStats` sums both for the summary logged
+after a run.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from gpt_trader.send.gpt_pool import OrderedWriter
+from gpt_trader.utils.metrics import gauge, observe
+
+STALL_MIN_SECONDS = 0.001
+
+_DONE = object()
+_POLL = 0.1
+
+
+class PipelineStats:
+    """Busy time, stall time and peak queue depth of one pipeline run."""
+
+    __slots__ = ("steps", "wall", "busy", "stalls", "max_depth", "_lock")
+
+    def __init__(self) -> None:
+        self.steps = 0
+        self.wall = 0.0
+        self.busy: dict[str, float] = {}
+        self.stalls: dict[tuple[str, str], float] = {}
+        self.max_depth: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_busy(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.busy[stage] = self.busy.get(stage, 0.0) + seconds
+
+    def add_stall(self, stage: str, reason: str, seconds: float) -> None:
+        with self._lock:
+            key = (stage, reason)
+            self.stalls[key] = self.stalls.get(key, 0.0) + seconds
+        if seconds >= STALL_MIN_SECONDS:
+            observe("pipeline_stall", seconds, worker=stage, reason=reason)
+
+    def note_depth(self, name: str, depth: int) -> None:
+        with self._lock:
+            self.max_depth[name] = max(self.max_depth.get(name, 0), depth)
+        gauge("pipeline_queue_depth", depth, queue=name)
+
+    def summary(self) -> str:
+        """Return a one-line summary for the log."""
+        busy = " ".join(f"{k}={v:.2f}s" for k, v in self.busy.items())
+        stalls = " ".join(f"{s}/{r}={v:.2f}s" for (s, r), v in sorted(self.stalls.items()))
+        depth = " ".join(f"{k}={v}" for k, v in self.max_depth.items())
+        return (
+            f"Pipeline ran {self.steps} steps in {self.wall:.2f}s; busy {busy}; "
+            f"stalls {stalls or 'none'}; max queue depth {depth}"
+        )
+
+
+class _StageQueue:
+    """Bounded queue that records waits and depth in *stats*."""
+
+    def __init__(
+        self, name: str, maxsize: int, stats: PipelineStats, stop: threading.Event
+    ) -> None:
+        self.name = name
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._stats = stats
+        self._stop = stop
+
+    def put(self, item: Any, stage: str) -> bool:
+        """Put *item*; return ``False`` if the pipeline stopped first."""
+        started = time.perf_counter()
+        while True:
+            try:
+                self._queue.put(item, timeout=_POLL)
+                break
+            except queue.Full:
+                if self._stop.is_set():
+                    return False
+        self._stats.add_stall(stage, "blocked", time.perf_counter() - started)
+        self._stats.note_depth(self.name, self._queue.qsize())
+        return True
+
+    def get(self, stage: str) -> Any:
+        """Return the next item, or ``None`` if the pipeline stopped first."""
+        started = time.perf_counter()
+        while True:
+            try:
+                item = self._queue.get(timeout=_POLL)
+                break
+            except queue.Empty:
+                if self._stop.is_set():
+                    return None
+        self._stats.add_stall(stage, "starved", time.perf_counter() - started)
+        self._stats.note_depth(self.name, self._queue.qsize())
+        return item
+
+
+class Pipeline:
+    """Overlap the fetch, send and commit stages of independent steps.
+
+    Parameters
+    ----------
+    fetch:
+        Called with each step item in the fetch thread; returns a payload.
+    send:
+        Called with a payload in a send worker; returns the response.
+    commit:
+        Called in step order as ``commit(item, payload, response)`` in the
+        thread that runs :meth:`run`. A failing fetch or send passes its
+        exception as the payload or response instead.
+    prefetch:
+        Steps the fetch stage may run ahead of the send stage.
+    send_workers:
+        Send calls in flight at once.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Any], Any],
+        send: Callable[[Any], Any],
+        commit: Callable[[Any, Any, Any], None],
+        prefetch: int = 4,
+        send_workers: int = 1,
+    ) -> None:
+        if prefetch < 1 or send_workers < 1:
+            raise ValueError("prefetch and send_workers must be at least 1")
+        self.fetch = fetch
+        self.send = send
+        self.commit = commit
+        self.prefetch = prefetch
+        self.send_workers = send_workers
+
+    def _fetch_loop(self, items: list, out: _StageQueue, stats: PipelineStats) -> None:
+        for index, item in enumerate(items):
+            started = time.perf_counter()
+            try:
+                payload = self.fetch(item)
+            except Exception as exc:  # noqa: BLE001
+                payload = exc
+            stats.add_busy("fetch", time.perf_counter() - started)
+            if not out.put((index, item, payload), "fetch"):
+                return
+        for _ in range(self.send_workers):
+            if not out.put(_DONE, "fetch"):
+                return
+
+    def _send_loop(self, inp: _StageQueue, out: _StageQueue, stats: PipelineStats) -> None:
+        while True:
+            entry = inp.get("send")
+            if entry is None:
+                return
+            if entry is _DONE:
+                out.put(_DONE, "send")
+                return
+            index, item, payload = entry
+            if isinstance(payload, Exception):
+                response: Any = payload
+            else:
+                started = time.perf_counter()
+                try:
+                    response = self.send(payload)
+                except Exception as exc:  # noqa: BLE001
+                    response = exc
+                stats.add_busy("send", time.perf_counter() - started)
+            if not out.put((index, item, payload, response), "send"):
+                return
+
+    def run(self, items: Iterable[Any], stats: Optional[PipelineStats] = None) -> PipelineStats:
+        """Run every item through the stages and return the run statistics."""
+        items = list(items)
+        stats = stats or PipelineStats()
+        stop = threading.Event()
+        to_send = _StageQueue("send", self.prefetch, stats, stop)
+        to_commit = _StageQueue("commit", self.prefetch + self.send_workers, stats, stop)
+        crashed: list[BaseException] = []
+
+        def _guard(target: Callable[..., None], *args: Any) -> None:
+            try:
+                target(*args)
+            except BaseException as exc:  # noqa: BLE001 - reported by run()
+                crashed.append(exc)
+                stop.set()
+
+        threads = [
+            threading.Thread(
+                target=_guard, args=(self._fetch_loop, items, to_send, stats), daemon=True
+            )
+        ]
+        threads += [
+            threading.Thread(
+                target=_guard, args=(self._send_loop, to_send, to_commit, stats), daemon=True
+            )
+            for _ in range(self.send_workers)
+        ]
+
+        def _release(index: int, entry: tuple) -> None:
+            started = time.perf_counter()
+            self.commit(*entry)
+            stats.add_busy("commit", time.perf_counter() - started)
+            stats.steps += 1
+
+        writer = OrderedWriter(_release)
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            finished = 0
+            while finished < self.send_workers:
+                entry = to_commit.get("commit")
+                if entry is None:
+                    raise RuntimeError("Pipeline worker failed") from crashed[0]
+                if entry is _DONE:
+                    finished += 1
+                    continue
+                index, item, payload, response = entry
+                writer.push(index, (item, payload, response))
+        finally:
+            # workers stuck in a GPT call are daemons and end with the process
+            stop.set()
+            stats.wall = time.perf_counter() - started
+        for thread in threads:
+            thread.join()
+        return stats
+
+
+__all__ = ["Pipeline", "PipelineStats", "STALL_MIN_SECONDS"]
@@ -0,0 +1,502 @@
+"""Score backtest signals against the bars that followed them.
+
+:func:`simulate` takes the signal table written by ``main_backtest`` and a
+bar history, preferably M1. It places every pending order as
+:class:`~gpt_trader.cli.latest_signal_to_mt5.TradeSignalSender` would, then
+finds the bar that fills it and the first bar that touches its SL or TP.
+The orders are sized with :func:`~gpt_trader.utils.risk.calculate_lots`,
+so PnL matches the lots the live sender would have traded.
+
+The rules are:
+
+* an order is placed after the signal time. The close of the last bar
+  opened at or before it is the bid, and the bid plus ``spread`` the ask.
+  Limit and stop types are swapped against that price like
+  ``TradeSignalSender._adjust_order_type`` does;
+* bar prices are bid prices. Buy orders fill and sells close when the ask
+  (bid plus ``spread``) reaches the level;
+* an unfilled order expires after ``expiry_minutes`` (never by default);
+* a TP touched in the fill bar is ignored, because the bar may have reached
+  it before the fill. When SL and TP are touched in the same later bar, the
+  SL counts;
+* exits happen at the SL or TP price, so gaps and slippage are not
+  modelled. Trades still open at the end of the history are closed at the
+  last close and reported as ``open``.
+
+Every search is a vectorized descent over a max pyramid of the high and
+low arrays (:class:`TouchIndex`). All orders are resolved together in
+``O(log n)`` NumPy steps, so tens of thousands of signals over years of M1
+bars take a few seconds.
+
+Run it after a backtest::
+
+    python src/gpt_trader/backtest/simulator.py --config config/setting_backtest.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from gpt_trader.fetch.bar_store import epoch_seconds, to_bar_array
+from gpt_trader.fetch.fetch_replay_data import ReplaySource, read_history_file
+from gpt_trader.utils import atomic_write_csv
+from gpt_trader.utils.risk import calculate_lots, risk_percent
+
+LOGGER = logging.getLogger(__name__)
+
+ORDER_TYPES = ("buy_limit", "buy_stop", "sell_limit", "sell_stop")
+
+STATUSES = ("skipped", "invalid", "unfilled", "tp", "sl", "open")
+
+TRADE_FIELDS = [
+    "timestamp",
+    "signal_id",
+    "pending_order_type",
+    "entry",
+    "sl",
+    "tp",
+    "confidence",
+    "risk_per_trade",
+    "lot",
+    "status",
+    "fill_time",
+    "exit_time",
+    "exit_price",
+    "pnl_points",
+    "r_multiple",
+    "pnl",
+]
+
+DEFAULT_CONFIDENCE = 70
+
+
+class TouchIndex:
+    """Find the first bar at or after a start whose value reaches a level.
+
+    The values are padded to a power of two and reduced pairwise into a
+    pyramid of maxima. A query climbs from its start bar while the blocks
+    to its right stay below the level, then descends into the first block
+    that reaches it.
+    """
+
+    __slots__ = ("size", "levels")
+
+    def __init__(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=float)
+        self.size = len(values)
+        width = 1 << max(0, int(self.size - 1).bit_length())
+        base = np.full(width, -np.inf)
+        base[: self.size] = np.where(np.isnan(values), -np.inf, values)
+        self.levels = [base]
+        while len(self.levels[-1]) > 1:
+            prev = self.levels[-1]
+            self.levels.append(np.maximum(prev[0::2], prev[1::2]))
+
+    def first_at_or_above(self, thresholds: np.ndarray, start: np.ndarray) -> np.ndarray:
+        """Return the first index ``>= start`` with a value ``>= thresholds``.
+
+        Both arguments are arrays of one entry per query. Queries without
+        such a bar get ``-1``.
+        """
+        thresholds = np.asarray(thresholds, dtype=float)
+        pos = np.asarray(start, dtype=np.int64).copy()
+        found_level = np.full(len(pos), -1, dtype=np.int64)
+        block = np.zeros(len(pos), dtype=np.int64)
+        climbing = (pos >= 0) & (pos < self.size) & ~np.isnan(thresholds)
+        top = len(self.levels) - 1
+        for level, maxima in enumerate(self.levels):
+            index = pos >> level
+            # a query is aligned to this level; check the block unless the
+            # parent block starting at the same bar covers it
+            check = climbing & (((index & 1) == 1) | (level == top))
+            check &= index < len(maxima)
+            rows = np.flatnonzero(check)
+            hit = maxima[index[rows]] >= thresholds[rows]
+            found_level[rows[hit]] = level
+            block[rows[hit]] = index[rows[hit]]
+            climbing[rows[hit]] = False
+            pos[rows[~hit]] += 1 << level
+            climbing &= pos < self.size
+        for level in range(top, 0, -1):
+            rows = np.flatnonzero(found_level == level)
+            left = block[rows] * 2
+            go_left = self.levels[level - 1][left] >= thresholds[rows]
+            block[rows] = np.where(go_left, left, left + 1)
+            found_level[rows] = level - 1
+        return np.where(found_level == 0, block, -1)
+
+
+def _to_time(seconds: np.ndarray) -> pd.Series:
+    times = pd.to_datetime(np.where(seconds >= 0, seconds, 0), unit="s")
+    return pd.Series(times).where(seconds >= 0)
+
+
+def load_signals(path: Path | str) -> pd.DataFrame:
+    """Read a signal table written by ``main_backtest`` or ``parse_gpt_response``."""
+    return pd.read_csv(path)
+
+
+def adjust_order_types(
+    order_type: np.ndarray, entry: np.ndarray, bid: np.ndarray, ask: np.ndarray
+) -> np.ndarray:
+    """Swap limit and stop types whose entry is on the wrong side of the price."""
+    order_type = np.asarray(order_type, dtype=object).copy()
+    rules = (
+        ("buy_stop", entry <= ask, "buy_limit"),
+        ("buy_limit", entry >= ask, "buy_stop"),
+        ("sell_stop", entry >= bid, "sell_limit"),
+        ("sell_limit", entry <= bid, "sell_stop"),
+    )
+    # decide every swap on the original types so no order is swapped twice
+    swaps = [((order_type == name) & cond, new) for name, cond, new in rules]
+    for mask, new in swaps:
+        order_type[mask] = new
+    return order_type
+
+
+class TradeSimulator:
+    """Fill and exit simulation with the sizing rules of the order sender.
+
+    Parameters
+    ----------
+    balance:
+        Account balance every order is sized from; results do not compound.
+    risk_per_trade, max_risk_per_trade:
+        Risk settings passed to :func:`~gpt_trader.utils.risk.risk_percent`.
+    symbol_info:
+        ``tick_value``, ``tick_size``, ``volume_min``, ``volume_max`` and
+        ``volume_step`` of the traded symbol, as MT5 reports them.
+    spread:
+        Spread in price units added to bid bars for buy fills and sell exits.
+    expiry_minutes:
+        Minutes a pending order waits for its fill; ``None`` keeps it until
+        the end of the history.
+    """
+
+    __slots__ = (
+        "balance",
+        "risk_per_trade",
+        "max_risk_per_trade",
+        "symbol_info",
+        "spread",
+        "expiry_minutes",
+    )
+
+    DEFAULT_SYMBOL_INFO = {
+        "tick_value": 1.0,
+        "tick_size": 0.01,
+        "volume_min": 0.01,
+        "volume_max": 100.0,
+        "volume_step": 0.01,
+    }
+
+    def __init__(
+        self,
+        balance: float = 10_000.0,
+        risk_per_trade: Optional[float] = None,
+        max_risk_per_trade: Optional[float] = None,
+        symbol_info: Optional[Mapping[str, float]] = None,
+        spread: float = 0.0,
+        expiry_minutes: Optional[float] = None,
+    ) -> None:
+        self.balance = float(balance)
+        self.risk_per_trade = risk_per_trade
+        self.max_risk_per_trade = max_risk_per_trade
+        self.symbol_info = {**self.DEFAULT_SYMBOL_INFO, **(symbol_info or {})}
+        self.spread = float(spread)
+        self.expiry_minutes = expiry_minutes
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "TradeSimulator":
+        """Create a simulator from the ``simulate`` section of a backtest config."""
+        return cls(
+            balance=config.get("balance", 10_000.0),
+            risk_per_trade=config.get("risk_per_trade"),
+            max_risk_per_trade=config.get("max_risk_per_trade"),
+            symbol_info=config.get("symbol_info"),
+            spread=config.get("spread", 0.0),
+            expiry_minutes=config.get("expiry_minutes"),
+        )
+
+    def _risk(self, signals: pd.DataFrame, confidence: np.ndarray) -> np.ndarray:
+        fixed = self.risk_per_trade is not None or self.max_risk_per_trade is not None
+        if fixed and self.max_risk_per_trade is None:
+            return np.full(len(signals), float(self.risk_per_trade))
+        if fixed:
+            return np.minimum(
+                float(self.max_risk_per_trade), confidence / 100 * float(self.max_risk_per_trade)
+            )
+        rows = signals.to_dict("records")
+        risk = [
+            risk_percent(conf, {k: v for k, v in row.items() if pd.notna(v)})
+            for conf, row in zip(confidence, rows)
+        ]
+        return np.array(risk, dtype=float)
+
+    def run(self, signals: pd.DataFrame, bars) -> pd.DataFrame:
+        """Return one row of :data:`TRADE_FIELDS` per signal in *signals*.
+
+        *bars* is anything :func:`~gpt_trader.fetch.bar_store.to_bar_array`
+        accepts, with ``time`` in epoch seconds of the signal clock.
+        """
+        bars = to_bar_array(bars)
+        times = bars["time"]
+        high = bars["high"].astype(float)
+        low = bars["low"].astype(float)
+        n = len(signals)
+        spread = self.spread
+
+        placed = epoch_seconds(signals["timestamp"]) if n else np.empty(0, dtype=np.int64)
+        entry = pd.to_numeric(signals["entry"], errors="coerce").to_numpy(dtype=float)
+        sl = pd.to_numeric(signals["sl"], errors="coerce").to_numpy(dtype=float)
+        tp = pd.to_numeric(signals["tp"], errors="coerce").to_numpy(dtype=float)
+        confidence = (
+            pd.to_numeric(
+                signals.get("confidence", pd.Series(np.nan, index=signals.index))
+                .astype(str)
+                .str.rstrip("%"),
+                errors="coerce",
+            )
+            .fillna(DEFAULT_CONFIDENCE)
+            .to_numpy(dtype=float)
+        )
+        raw_type = (
+            signals["pending_order_type"].fillna("").astype(str).str.lower().str.replace(" ", "_")
+        ).to_numpy(dtype=object)
+
+        start = np.searchsorted(times, placed, "right")
+        bid = np.where(start > 0, bars["close"][np.maximum(start - 1, 0)], np.nan)
+        order_type = adjust_order_types(raw_type, entry, bid, bid + spread)
+        is_buy = (order_type == "buy_limit") | (order_type == "buy_stop")
+        is_sell = (order_type == "sell_limit") | (order_type == "sell_stop")
+        sane = np.isfinite(entry) & np.isfinite(sl) & np.isfinite(tp)
+        sane &= np.where(is_buy, (sl < entry) & (entry < tp), (tp < entry) & (entry < sl))
+
+        status = np.full(n, "invalid", dtype=object)
+        status[raw_type == "skip"] = "skipped"
+        risk = self._risk(signals, confidence) if n else np.empty(0)
+        info = self.symbol_info
+        lot = calculate_lots(
+            self.balance,
+            risk,
+            entry,
+            sl,
+            info["tick_value"],
+            info["tick_size"],
+            info["volume_min"],
+            info["volume_max"],
+            info["volume_step"],
+        )
+        active = (is_buy | is_sell) & sane & ~np.isnan(lot)
+        status[active] = "unfilled"
+
+        highs = TouchIndex(high)
+        lows = TouchIndex(-low)
+
+        def first_high(level, begin, rows):
+            out = np.full(n, -1, dtype=np.int64)
+            out[rows] = highs.first_at_or_above(level[rows], begin[rows])
+            return out
+
+        def first_low(level, begin, rows):
+            out = np.full(n, -1, dtype=np.int64)
+            out[rows] = lows.first_at_or_above(-level[rows], begin[rows])
+            return out
+
+        # fills: buys trade at the ask, sells at the bid
+        up = active & ((order_type == "buy_stop") | (order_type == "sell_limit"))
+        down = active & ((order_type == "buy_limit") | (order_type == "sell_stop"))
+        level = np.where(is_buy, entry - spread, entry)
+        fill = np.maximum(first_high(level, start, up), first_low(level, start, down))
+        if self.expiry_minutes is not None:
+            expires = np.searchsorted(times, placed + int(float(self.expiry_minutes) * 60), "left")
+            fill[fill >= expires] = -1
+        filled = active & (fill >= 0)
+
+        # exits: longs close at the bid, shorts at the ask
+        long_ = filled & is_buy
+        short = filled & is_sell
+        after = fill + 1
+        sl_hit = np.maximum(
+            first_low(sl, fill, long_), first_high(sl - spread, fill, short)
+        )
+        tp_hit = np.maximum(
+            first_high(tp, after, long_), first_low(tp - spread, after, short)
+        )
+        hit_sl = filled & (sl_hit >= 0) & ((tp_hit < 0) | (sl_hit <= tp_hit))
+        hit_tp = filled & (tp_hit >= 0) & ~hit_sl
+        still_open = filled & ~hit_sl & ~hit_tp
+        status[hit_sl] = "sl"
+        status[hit_tp] = "tp"
+        status[still_open] = "open"
+
+        exit_at = np.where(hit_sl, sl_hit, np.where(hit_tp, tp_hit, -1))
+        exit_price = np.full(n, np.nan)
+        exit_price[hit_sl] = sl[hit_sl]
+        exit_price[hit_tp] = tp[hit_tp]
+        if len(bars):
+            last_close = float(bars["close"][-1])
+            exit_price[still_open] = last_close + np.where(is_sell[still_open], spread, 0.0)
+            exit_at[still_open] = len(bars) - 1
+
+        direction = np.where(is_buy, 1.0, -1.0)
+        pnl_points = np.where(filled, (exit_price - entry) * direction, np.nan)
+        sl_distance = np.abs(entry - sl)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r_multiple = pnl_points / sl_distance
+        tick_size = info["tick_size"]
+        pip_value = info["tick_value"] / tick_size if tick_size else 10
+        pnl = np.where(filled, pnl_points * lot * pip_value, 0.0)
+
+        def bar_time(index: np.ndarray) -> pd.Series:
+            seconds = np.where(index >= 0, times[np.maximum(index, 0)] if len(times) else -1, -1)
+            return _to_time(seconds)
+
+        return pd.DataFrame(
+            {
+                "timestamp": signals["timestamp"].to_numpy() if n else [],
+                "signal_id": signals.get("signal_id", pd.Series([None] * n)).to_numpy(),
+                "pending_order_type": np.where(active, order_type, raw_type),
+                "entry": entry,
+                "sl": sl,
+                "tp": tp,
+                "confidence": confidence,
+                "risk_per_trade": risk,
+                "lot": np.where(active, lot, np.nan),
+                "status": status,
+                "fill_time": bar_time(np.where(filled, fill, -1)),
+                "exit_time": bar_time(exit_at),
+                "exit_price": exit_price,
+                "pnl_points": pnl_points,
+                "r_multiple": r_multiple,
+                "pnl": pnl,
+            },
+            columns=TRADE_FIELDS,
+        )
+
+
+def simulate(signals: pd.DataFrame, bars, **kwargs: Any) -> pd.DataFrame:
+    """Run :meth:`TradeSimulator.run` with a simulator built from *kwargs*."""
+    return TradeSimulator(**kwargs).run(signals, bars)
+
+
+def summarize(trades: pd.DataFrame, balance: float = 10_000.0) -> Dict[str, Any]:
+    """Return fill rate, win rate, R-multiples and PnL of simulated *trades*."""
+    counts = trades["status"].value_counts()
+    orders = int(len(trades) - counts.get("skipped", 0) - counts.get("invalid", 0))
+    filled = trades[trades["status"].isin(["tp", "sl", "open"])]
+    closed = int(counts.get("tp", 0) + counts.get("sl", 0))
+    wins = filled["pnl"] > 0
+    gross_win = float(filled.loc[wins, "pnl"].sum())
+    gross_loss = float(-filled.loc[~wins, "pnl"].sum())
+    equity = filled.sort_values("exit_time", kind="stable")["pnl"].cumsum()
+    drawdown = float((equity.cummax().clip(lower=0) - equity).max()) if len(equity) else 0.0
+    total_pnl = float(filled["pnl"].sum())
+    return {
+        "signals": int(len(trades)),
+        "skipped": int(counts.get("skipped", 0)),
+        "invalid": int(counts.get("invalid", 0)),
+        "orders": orders,
+        "filled": int(len(filled)),
+        "fill_rate": len(filled) / orders if orders else 0.0,
+        "tp": int(counts.get("tp", 0)),
+        "sl": int(counts.get("sl", 0)),
+        "open": int(counts.get("open", 0)),
+        "win_rate": int(counts.get("tp", 0)) / closed if closed else 0.0,
+        "total_r": float(filled["r_multiple"].sum()),
+        "avg_r": float(filled["r_multiple"].mean()) if len(filled) else 0.0,
+        "total_pnl": total_pnl,
+        "profit_factor": gross_win / gross_loss if gross_loss else None,
+        "max_drawdown": drawdown,
+        "final_balance": balance + total_pnl,
+    }
+
+
+def _load_config(path: Path) -> Dict[str, Any]:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as exc:  # noqa: BLE001
+        raise RuntimeError(f"Failed to read config: {exc}") from exc
+
+
+def main() -> None:
+    pre_parser = argparse.ArgumentParser(add_help=False)
+    default_cfg = Path(__file__).resolve().parents[3] / "config" / "setting_backtest.json"
+    pre_parser.add_argument(
+        "--config", help="Path to backtest JSON config", default=str(default_cfg)
+    )
+    pre_args, remaining = pre_parser.parse_known_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    try:
+        config = _load_config(Path(pre_args.config))
+    except RuntimeError as exc:
+        LOGGER.error("%s", exc)
+        raise SystemExit(1)
+    sim_cfg = config.get("simulate") or {}
+    fetch_cfg = config.get("fetch") or {}
+
+    parser = argparse.ArgumentParser(
+        description="Simulate fills and exits of backtest signals", parents=[pre_parser]
+    )
+    parser.add_argument(
+        "--signals",
+        default=config.get("signal_table", "data/back_test/signals/backtest_signals.csv"),
+        help="Signal table CSV",
+    )
+    parser.add_argument("--bars", default=sim_cfg.get("bars"), help="Bar history file")
+    parser.add_argument("--symbol", default=fetch_cfg.get("symbol", "XAUUSD"))
+    parser.add_argument(
+        "--timeframe",
+        default=sim_cfg.get("timeframe", "M1"),
+        help="Replay timeframe used when --bars is not given",
+    )
+    parser.add_argument(
+        "--output",
+        default=sim_cfg.get("output", "data/back_test/signals/backtest_trades.csv"),
+        help="Trade table CSV",
+    )
+    args = parser.parse_args(remaining)
+
+    try:
+        signals = load_signals(args.signals)
+        if args.bars:
+            bars = read_history_file(args.bars)
+        else:
+            bars = ReplaySource.from_config(fetch_cfg).bars(args.symbol, args.timeframe)
+        simulator = TradeSimulator.from_config(sim_cfg)
+        trades = simulator.run(signals, bars)
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.error("Simulation failed: %s", exc)
+        raise SystemExit(1)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_csv(trades, output)
+    summary = summarize(trades, simulator.balance)
+    LOGGER.info("Saved %s simulated trades to %s", len(trades), output)
+    LOGGER.info("Simulation summary: %s", json.dumps(summary))
+
+
+__all__ = [
+    "ORDER_TYPES",
+    "STATUSES",
+    "TRADE_FIELDS",
+    "TouchIndex",
+    "TradeSimulator",
+    "adjust_order_types",
+    "load_signals",
+    "simulate",
+    "summarize",
+]
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main()
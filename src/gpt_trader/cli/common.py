@@ -7,6 +7,8 @@ import logging
 import sys
 from pathlib import Path
 
+from gpt_trader.utils.metrics import span
+
 
 async def _run_step(step: str, script: Path, *args: str) -> None:
     """Run a script as a subprocess and wait for it to finish.
@@ -26,9 +28,10 @@ async def _run_step(step: str, script: Path, *args: str) -> None:
     else:
         cmd = [sys.executable, str(script), *args]
     logging.info("Running %s: %s", step, " ".join(cmd))
-    proc = await asyncio.create_subprocess_exec(*cmd)
-    await proc.communicate()
-    if proc.returncode:
-        raise RuntimeError(f"{step} failed with code {proc.returncode}")
+    with span(step):
+        proc = await asyncio.create_subprocess_exec(*cmd)
+        await proc.communicate()
+        if proc.returncode:
+            raise RuntimeError(f"{step} failed with code {proc.returncode}")
 
 __all__ = ["_run_step"]
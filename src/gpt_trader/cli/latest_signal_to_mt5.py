@@ -4,6 +4,9 @@ import json
 import re
 import MetaTrader5 as mt5
 
+from gpt_trader.utils.mt5_session import get_mt5_session
+from gpt_trader.utils.risk import calculate_lot, risk_percent
+
 # Map signal prefixes to the actual MT5 symbol names.  Brokers sometimes use
 # slightly different naming conventions for the same instrument.  Adjust this
 # mapping to suit your trading terminal.
@@ -80,22 +83,17 @@ class TradeSignalSender:
 
     def calculate_lot(self, balance, tick_value, tick_size, volume_min,
                       volume_max, volume_step):
-        if self.risk_per_trade <= 0:
-            raise ValueError("risk_per_trade must be positive")
-
-        sl_distance = abs(self.entry - self.sl)
-        if sl_distance == 0:
-            raise ValueError("SL must not equal entry")
-
-        pip_value = tick_value / tick_size if tick_size else 10
-        risk_amount = balance * (self.risk_per_trade / 100)
-        lot = risk_amount / (sl_distance * pip_value)
-
-        # align to broker limits
-        lot = max(volume_min, min(volume_max, lot))
-        steps = round(lot / volume_step)
-        lot = steps * volume_step
-        return round(lot, 2)
+        return calculate_lot(
+            balance,
+            self.risk_per_trade,
+            self.entry,
+            self.sl,
+            tick_value,
+            tick_size,
+            volume_min,
+            volume_max,
+            volume_step,
+        )
 
     def prepare_order_type(self):
         type_map = {
@@ -169,30 +167,36 @@ class TradeSignalSender:
             self.order_result = "confidence=0"
             return
 
-        if not mt5.initialize():
-            raise RuntimeError("❌ MT5 initialize failed")
+        session = get_mt5_session(mt5)
+        try:
+            session.acquire()
+        except RuntimeError as exc:
+            raise RuntimeError("❌ MT5 initialize failed") from exc
+        try:
+            with session.lock:
+                self._send_order()
+        finally:
+            session.release()
 
+    def _send_order(self):
+        """Size and send the pending order; the MT5 session must be open."""
         self.symbol = self.find_matching_symbol(self.symbol_base)
         if not self.symbol:
-            mt5.shutdown()
             raise RuntimeError(f"❌ Symbol '{self.symbol_base}' not found!")
 
         if not mt5.symbol_select(self.symbol, True):
-            mt5.shutdown()
             raise RuntimeError(f"❌ Cannot select symbol {self.symbol}")
 
         tick = mt5.symbol_info_tick(self.symbol)
         info = mt5.symbol_info(self.symbol)
         account = mt5.account_info()
         if not tick or not info or not account:
-            mt5.shutdown()
             raise RuntimeError("❌ Cannot retrieve market/account data")
 
         self.balance = account.balance
         self.entry = float(self.signal["entry"])
         self.sl = float(self.signal["sl"])
         if "tp" not in self.signal:
-            mt5.shutdown()
             raise ValueError("❌ 'tp' missing from signal")
         self.tp = float(self.signal["tp"])
         if self.confidence is None:
@@ -200,15 +204,9 @@ class TradeSignalSender:
         else:
             self.confidence = int(self.confidence)
         self.max_drawdown = float(self.signal.get("max_drawdown", 15))
-        if self.max_risk_per_trade is not None:
-            self.risk_per_trade = min(
-                float(self.max_risk_per_trade),
-                (self.confidence / 100) * float(self.max_risk_per_trade),
-            )
-        elif self.risk_per_trade is None:
-            self.risk_per_trade = float(
-                self.signal.get("risk_per_trade", self.max_drawdown / 10)
-            )
+        self.risk_per_trade = risk_percent(
+            self.confidence, self.signal, self.risk_per_trade, self.max_risk_per_trade
+        )
 
         self._adjust_order_type(tick)
         self.prepare_order_type()
@@ -257,5 +255,3 @@ class TradeSignalSender:
         else:
             print(f"✅ Order sent successfully for {self.symbol}")
             self.order_result = "success"
-
-        mt5.shutdown()
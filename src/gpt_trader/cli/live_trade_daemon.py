@@ -0,0 +1,628 @@
+#!/usr/bin/env python
+"""Resident live-trade daemon.
+
+Unlike :mod:`gpt_trader.cli.scheduler_liveTrade`, which starts the
+fetch, send and parse scripts as new interpreters on every tick, the daemon
+imports everything once and keeps the MT5 session, the OpenAI client, the
+incremental indicator state and the bar store alive between ticks. Each
+tick runs the stages as coroutines in this process and logs how long every
+stage took.
+
+With a ``symbols`` list in the config, :class:`MultiSymbolDaemon` runs one
+pipeline per symbol on the same session and sends a single summary.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pandas as pd
+
+from gpt_trader.cli.live_trade_workflow import _post_signal_data
+from gpt_trader.cli.scheduler_liveTrade import (
+    DEFAULT_CFG,
+    LOG_FILE,
+    _load_config,
+    _next_window_run,
+    _parse_day,
+    _parse_time,
+    _place_order,
+    _report_run,
+    _report_sections,
+    _within_window,
+)
+from gpt_trader.fetch.bar_store import BarStore
+from gpt_trader.fetch.tick_stream import CandleAggregator, TickPoller
+from gpt_trader.parse.parse_gpt_response import (
+    _extract_json,
+    _timestamp_code,
+    append_signal_row,
+    make_signal_row,
+    save_signal,
+)
+from gpt_trader.send.payload import prepare_payload
+from gpt_trader.send.response_cache import cache_key, lookup, open_cache, store
+from gpt_trader.send.send_to_gpt import (
+    _build_messages,
+    _call_gpt,
+    _save_prompt_copy,
+    build_prompt,
+    create_client,
+)
+from gpt_trader.utils import atomic_write_csv, atomic_write_text, dumps_no_nulls
+from gpt_trader.utils.artifact_index import record_artifact, signal_symbol
+from gpt_trader.utils.atomic_io import set_fsync_policy
+from gpt_trader.utils.indicators import IndicatorEngine
+from gpt_trader.utils.metrics import configure as configure_metrics, observe, span
+from gpt_trader.utils.mt5_session import get_mt5_session
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LiveTradeDaemon:
+    """Run the live pipeline repeatedly with long-lived clients.
+
+    Parameters
+    ----------
+    config:
+        Settings in the ``setting_live_trade.json`` layout.
+    fetch_module:
+        Module providing ``fetch_multi_tf``, ``_init_mt5``, ``_shutdown_mt5``
+        and ``mt5``; defaults to :mod:`gpt_trader.fetch.fetch_mt5_data`.
+    client:
+        OpenAI client; created from the ``send`` section when omitted.
+    place_order:
+        Callable ``(latest_json, signal, risk_pct, max_risk) -> status``.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        fetch_module: Any = None,
+        client: Any = None,
+        place_order: Callable[..., str] = _place_order,
+    ) -> None:
+        self.config = config
+        self.fetch_cfg = dict(config.get("fetch") or {})
+        self.send_cfg = dict(config.get("send") or {})
+        self.parse_cfg = dict(config.get("parse") or {})
+        self.symbol = self.fetch_cfg.get("symbol", "EURUSD")
+        self.signal_prefix = str(self.fetch_cfg.get("symbol_signal", self.symbol)).lower()
+        self.model = self.send_cfg.get("model", "gpt-4o")
+        self.cache_mode = self.send_cfg.get("cache_mode", "off")
+        self.engine = IndicatorEngine(self.fetch_cfg.get("indicators"))
+        store_path = self.fetch_cfg.get("bar_store")
+        self.store = BarStore(store_path) if store_path else None
+        self.place_order = place_order
+        self.timings: dict[str, float] = {}
+        self._fetch_module = fetch_module
+        self._client = client
+        self.cache = None
+        self.session = None
+
+    # -- lifecycle -------------------------------------------------------
+    def start(self) -> None:
+        """Import the fetcher, open MT5, the client and the response cache."""
+        if self.config.get("fsync_policy"):
+            set_fsync_policy(self.config["fsync_policy"])
+        configure_metrics(self.config.get("metrics"))
+        if self._fetch_module is None:
+            from gpt_trader.fetch import fetch_mt5_data
+
+            self._fetch_module = fetch_mt5_data
+        self._fetch_module._init_mt5()
+        self.session = get_mt5_session(self._fetch_module.mt5)
+        self.session.persistent = True
+        self.session.start_health_check(float(self.config.get("mt5_ping_seconds", 30)))
+        if self._client is None:
+            self._client = create_client(self.send_cfg)
+        self.cache = open_cache(self.send_cfg, self.cache_mode)
+
+    def stop(self) -> None:
+        """Close the MT5 session and the response cache."""
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    # -- stages ----------------------------------------------------------
+    def fetch(self) -> tuple[str, str]:
+        """Return ``(signal_id, json_text)`` for the latest bars."""
+        self.session.ensure()
+        df = self._fetch_module.fetch_multi_tf(
+            self.symbol,
+            self.fetch_cfg,
+            tz_shift=int(self.fetch_cfg.get("tz_shift", 0)),
+            engine=self.engine,
+            store=self.store,
+        )
+        if df.empty:
+            raise RuntimeError("No data available for the requested time_fetch")
+        ts_now = pd.Timestamp.utcnow().floor("min")
+        signal_id = f"{self.signal_prefix}{int(ts_now.timestamp())}"
+        with span("serialize", symbol=self.symbol):
+            json_text = dumps_no_nulls(df)
+        out_dir = Path(self.fetch_cfg.get("save_as_path", "data/live_trade/fetch"))
+        out_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_csv(df, out_dir / f"{signal_id}.csv")
+        atomic_write_text(out_dir / f"{signal_id}.json", json_text)
+        record_artifact(out_dir / f"{signal_id}.json", self.signal_prefix)
+        return signal_id, json_text
+
+    def send(self, signal_id: str, json_text: str) -> str:
+        """Return the GPT response for the fetched data."""
+        prompt = build_prompt(signal_id)
+        save_dir = self.send_cfg.get("save_prompt_dir", "data/live_trade/save_prompt_api")
+        try:
+            _save_prompt_copy(
+                Path(f"{signal_id}.json"), json_text, prompt, Path(save_dir), signal_id
+            )
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.warning("Failed to save prompt copy: %s", exc)
+        messages = _build_messages(prepare_payload(json_text, self.send_cfg), prompt)
+        key = cache_key(self.model, messages)
+        response = lookup(self.cache, self.cache_mode, key)
+        if response is None:
+            response = _call_gpt(
+                messages, self.model, self._client, bool(self.send_cfg.get("stream", False))
+            )
+            store(self.cache, self.cache_mode, key, response, self.model)
+        return response
+
+    def parse(self, response: str) -> dict:
+        """Parse *response*, log it and write the latest signal files."""
+        latest_path = Path(
+            self.parse_cfg.get(
+                "path_latest_response", "data/live_trade/signals/latest_response.txt"
+            )
+        )
+        latest_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(latest_path, response)
+        data = _extract_json(response)
+        tz_shift = int(self.parse_cfg.get("tz_shift", 0))
+        ts = datetime.now(timezone.utc) + timedelta(hours=tz_shift)
+        csv_path = Path(
+            self.parse_cfg.get("path_signals_csv", "data/signals/signals_csv")
+        ) / self.parse_cfg.get("file_signal_report", "csv_signal_report.csv")
+        append_signal_row(csv_path, make_signal_row(data, ts))
+        json_dir = Path(self.parse_cfg.get("path_signals_json", "data/signals/signals_json"))
+        signal_path = json_dir / f"{_timestamp_code(ts)}.json"
+        save_signal(data, signal_path)
+        record_artifact(signal_path, signal_symbol(data.get("signal_id")))
+        save_signal(data, latest_path.with_suffix(".json"))
+        return data
+
+    # -- tick ------------------------------------------------------------
+    async def _timed(self, stage: str, func: Callable[..., Any], *args: Any) -> Any:
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            return await asyncio.to_thread(func, *args)
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.timings[stage] = elapsed = time.perf_counter() - started
+            observe(stage, elapsed, status, symbol=self.symbol)
+
+    @property
+    def latest_json(self) -> Path:
+        """Return the JSON copy of the latest response read by the order step."""
+        return Path(
+            self.parse_cfg.get(
+                "path_latest_response", "data/live_trade/signals/latest_response.txt"
+            )
+        ).with_suffix(".json")
+
+    async def run_pipeline(
+        self,
+        send_gate: Optional[asyncio.Semaphore] = None,
+        parse_lock: Optional[asyncio.Lock] = None,
+    ) -> tuple[dict[str, str], Optional[dict]]:
+        """Fetch, send, parse and post one signal.
+
+        *send_gate* bounds concurrent GPT requests and *parse_lock*
+        serializes writes to the shared signal report when several
+        pipelines run together. Returns ``(results, signal)``.
+        """
+        results: dict[str, str] = {}
+        signal: Optional[dict] = None
+        try:
+            signal_id, json_text = await self._timed("fetch", self.fetch)
+            results["fetch"] = "success"
+            async with send_gate or nullcontext():
+                response = await self._timed("send", self.send, signal_id, json_text)
+            results["send"] = "success"
+            async with parse_lock or nullcontext():
+                signal = await self._timed("parse", self.parse, response)
+            results["parse"] = "success"
+        except Exception as exc:  # noqa: BLE001
+            stage = next(s for s in ("fetch", "send", "parse") if s not in results)
+            LOGGER.error("%s step failed: %s", stage, exc)
+            results[stage] = "error"
+
+        if signal is not None:
+            try:
+                _post_signal_data(self.config, signal)
+                results["post_signal"] = "success"
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.error("post signal failed: %s", exc)
+                results["post_signal"] = "error"
+        return results, signal
+
+    async def place(self, signal: dict) -> str:
+        """Send *signal* to MT5 and return the order status."""
+        try:
+            self.session.ensure()
+            return await self._timed(
+                "order",
+                self.place_order,
+                self.latest_json,
+                signal,
+                self.config.get("risk_per_trade"),
+                self.config.get("max_risk_per_trade"),
+            )
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.warning("Failed to send MT5 signal: %s", exc)
+            return "error"
+
+    def detail_items(self, results: dict[str, str], order_status: Optional[str]) -> list[str]:
+        """Return the summary items for one run, timings last."""
+        items = [f"{k}:{results.get(k, 'n/a')}" for k in ("fetch", "send", "parse")]
+        if "post_signal" in results:
+            items.append(f"post_signal:{results['post_signal']}")
+        if order_status is not None:
+            items.append(f"order:{order_status}")
+        items.append("timing:" + ",".join(f"{k}={v:.2f}s" for k, v in self.timings.items()))
+        return items
+
+    async def run_once(self) -> dict[str, str]:
+        """Run one tick and return the status of every stage."""
+        self.timings = {}
+        tick_start = time.perf_counter()
+        results, signal = await self.run_pipeline()
+        order_status = await self.place(signal) if signal is not None else None
+        self.timings["total"] = time.perf_counter() - tick_start
+
+        status = "error" if "error" in results.values() else "success"
+        observe(
+            "total",
+            self.timings["total"],
+            "ok" if status == "success" else "error",
+            symbol=self.symbol,
+        )
+        detail_items = self.detail_items(results, order_status)
+        LOGGER.info("Stage timings: %s", detail_items[-1])
+        await self._timed(
+            "report",
+            _report_run,
+            self.config,
+            self.config.get("notify", {}),
+            detail_items,
+            status,
+            signal,
+        )
+        return results
+
+    async def serve(
+        self,
+        interval: int,
+        start_day: int,
+        start_time,
+        stop_day: int,
+        stop_time,
+        run_now: bool = True,
+    ) -> None:
+        """Run ticks every *interval* minutes inside the weekly window."""
+        if run_now:
+            await self.run_once()
+        while True:
+            next_run = _next_window_run(
+                datetime.now() + timedelta(seconds=1),
+                interval,
+                start_day,
+                start_time,
+                stop_day,
+                stop_time,
+            )
+            LOGGER.info("Next run at %s", next_run.isoformat(timespec="seconds"))
+            await asyncio.sleep(max(0.0, (next_run - datetime.now()).total_seconds()))
+            if _within_window(datetime.now(), start_day, start_time, stop_day, stop_time):
+                await self.run_once()
+
+    async def serve_ticks(
+        self,
+        timeframe: str,
+        start_day: int,
+        start_time,
+        stop_day: int,
+        stop_time,
+        poll_seconds: float = 0.25,
+    ) -> None:
+        """Run a tick as soon as a *timeframe* candle closes.
+
+        Ticks are polled from MT5 and aggregated by a
+        :class:`~gpt_trader.fetch.tick_stream.CandleAggregator`, so the
+        pipeline starts on the bar close instead of on a wall-clock
+        interval.
+        """
+        aggregator = CandleAggregator([timeframe])
+        poller = TickPoller(
+            self._fetch_module.mt5,
+            self.symbol,
+            aggregator,
+            record_path=self.fetch_cfg.get("tick_record_path"),
+        )
+        while True:
+            try:
+                self.session.ensure()
+                events = await asyncio.to_thread(poller.poll)
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.error("Tick poll failed: %s", exc)
+                events = []
+            if events and _within_window(
+                datetime.now(), start_day, start_time, stop_day, stop_time
+            ):
+                bar = events[-1][1]
+                LOGGER.info(
+                    "%s bar closed at %s", timeframe, pd.Timestamp(bar["time"], unit="s")
+                )
+                await self.run_once()
+            await asyncio.sleep(poll_seconds)
+
+
+# Keys of a ``symbols`` entry that override top-level settings instead of
+# the ``fetch`` section.
+_TOP_LEVEL_KEYS = ("risk_per_trade", "max_risk_per_trade")
+
+
+def symbol_configs(config: dict) -> list[dict]:
+    """Return one pipeline config per entry of ``config["symbols"]``.
+
+    An entry is either a symbol name or a dict whose keys override the
+    ``fetch`` section (``symbol``, ``symbol_signal``, ``timeframes``,
+    ``indicators`` ...). ``risk_per_trade`` and ``max_risk_per_trade``
+    override the top-level risk settings and a nested ``parse`` dict is
+    merged into the ``parse`` section. Signal JSON files and the latest
+    response go to a sub-directory named after ``symbol_signal`` so that
+    symbols do not overwrite each other; the CSV report stays shared.
+    """
+    base_fetch = dict(config.get("fetch") or {})
+    base_parse = dict(config.get("parse") or {})
+    configs = []
+    for entry in config.get("symbols") or []:
+        entry = {"symbol": entry} if isinstance(entry, str) else dict(entry)
+        cfg = {k: v for k, v in config.items() if k != "symbols"}
+        for key in _TOP_LEVEL_KEYS:
+            if key in entry:
+                cfg[key] = entry.pop(key)
+        parse_override = entry.pop("parse", None) or {}
+        fetch = {**base_fetch, **entry}
+        if "symbol" in entry and "symbol_signal" not in entry:
+            fetch["symbol_signal"] = str(entry["symbol"]).lower()
+        prefix = str(fetch.get("symbol_signal", fetch.get("symbol", ""))).lower()
+        parse = dict(base_parse)
+        json_dir = Path(parse.get("path_signals_json", "data/signals/signals_json"))
+        parse["path_signals_json"] = str(json_dir / prefix)
+        latest = Path(
+            parse.get("path_latest_response", "data/live_trade/signals/latest_response.txt")
+        )
+        parse["path_latest_response"] = str(latest.parent / prefix / latest.name)
+        parse.update(parse_override)
+        cfg["fetch"] = fetch
+        cfg["parse"] = parse
+        configs.append(cfg)
+    return configs
+
+
+class OrderQueue:
+    """Place orders one at a time, in the order they are submitted.
+
+    Create it inside the running event loop and :meth:`close` it when the
+    tick is done.
+    """
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            func, args, future = await self._queue.get()
+            try:
+                future.set_result(await func(*args))
+            except Exception as exc:  # noqa: BLE001
+                future.set_exception(exc)
+            finally:
+                self._queue.task_done()
+
+    async def submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Queue ``await func(*args)`` and return its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((func, args, future))
+        return await future
+
+    async def close(self) -> None:
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+
+
+class MultiSymbolDaemon(LiveTradeDaemon):
+    """Run one pipeline per entry of ``config["symbols"]`` on every tick.
+
+    All pipelines share the MT5 session, the OpenAI client and the response
+    cache. Fetches run concurrently, at most ``workflow.gpt_pool.concurrency``
+    GPT requests are in flight, orders go through one :class:`OrderQueue`
+    and the tick ends with a single notification covering every symbol.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        fetch_module: Any = None,
+        client: Any = None,
+        place_order: Callable[..., str] = _place_order,
+    ) -> None:
+        super().__init__(config, fetch_module, client, place_order)
+        pool_cfg = (config.get("workflow") or {}).get("gpt_pool") or {}
+        self.concurrency = max(1, int(pool_cfg.get("concurrency", 4)))
+        self.pipelines = [
+            LiveTradeDaemon(cfg, fetch_module, client, place_order)
+            for cfg in symbol_configs(config)
+        ]
+        if not self.pipelines:
+            raise RuntimeError("No symbols configured")
+
+    def start(self) -> None:
+        """Open the shared resources and hand them to every pipeline."""
+        super().start()
+        for pipeline in self.pipelines:
+            pipeline._fetch_module = self._fetch_module
+            pipeline._client = self._client
+            pipeline.cache = self.cache
+            pipeline.session = self.session
+
+    def stop(self) -> None:
+        for pipeline in self.pipelines:
+            pipeline.cache = None
+            pipeline.session = None
+        super().stop()
+
+    async def run_once(self) -> dict[str, dict[str, str]]:
+        """Run every symbol once; return the stage results per symbol."""
+        tick_start = time.perf_counter()
+        send_gate = asyncio.Semaphore(self.concurrency)
+        parse_lock = asyncio.Lock()
+        orders = OrderQueue()
+
+        async def _run(pipeline: LiveTradeDaemon) -> tuple:
+            pipeline.timings = {}
+            started = time.perf_counter()
+            results, signal = await pipeline.run_pipeline(send_gate, parse_lock)
+            order_status = None
+            if signal is not None:
+                order_status = await orders.submit(pipeline.place, signal)
+            pipeline.timings["total"] = time.perf_counter() - started
+            observe("total", pipeline.timings["total"], symbol=pipeline.symbol)
+            return results, signal, order_status
+
+        try:
+            outcomes = await asyncio.gather(*(_run(p) for p in self.pipelines))
+        finally:
+            await orders.close()
+        self.timings = {"total": time.perf_counter() - tick_start}
+
+        sections = []
+        summary: dict[str, dict[str, str]] = {}
+        for pipeline, (results, signal, order_status) in zip(self.pipelines, outcomes):
+            status = "error" if "error" in results.values() else "success"
+            items = [f"symbol:{pipeline.symbol}"] + pipeline.detail_items(results, order_status)
+            LOGGER.info("%s stage timings: %s", pipeline.symbol, items[-1])
+            sections.append((items, status, signal))
+            summary[pipeline.symbol] = results
+        LOGGER.info("Multi-symbol tick took %.2fs", self.timings["total"])
+        await self._timed(
+            "report",
+            _report_sections,
+            self.config,
+            self.config.get("notify", {}),
+            sections,
+        )
+        return summary
+
+
+async def run_multi_symbol(config: dict) -> dict[str, dict[str, str]]:
+    """Run a single multi-symbol tick with its own MT5 session."""
+    daemon = MultiSymbolDaemon(config)
+    daemon.start()
+    try:
+        return await daemon.run_once()
+    finally:
+        daemon.stop()
+
+
+def main() -> None:
+    """Start the daemon."""
+    parser = argparse.ArgumentParser(description="Run the live trade pipeline as a daemon")
+    parser.add_argument("--config", default=str(DEFAULT_CFG), help="Path to JSON config")
+    parser.add_argument("--interval", type=int, default=30, help="Minutes between runs")
+    parser.add_argument("--start-day", default="mon", help="Day of week to start running")
+    parser.add_argument("--start-time", default="08:10", help="Time of day to start (HH:MM)")
+    parser.add_argument("--stop-day", default="fri", help="Day of week to stop running")
+    parser.add_argument("--stop-time", default="23:35", help="Time of day to stop (HH:MM)")
+    parser.add_argument("--once", action="store_true", help="Run a single tick and exit")
+    parser.add_argument(
+        "--on-bar-close",
+        metavar="TF",
+        help="Run whenever a TF candle built from MT5 ticks closes instead of every --interval",
+    )
+    args = parser.parse_args()
+
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[logging.FileHandler(LOG_FILE), logging.StreamHandler()],
+    )
+
+    try:
+        config = _load_config(Path(args.config))
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.error("%s", exc)
+        raise SystemExit(1)
+
+    daemon_cls = MultiSymbolDaemon if config.get("symbols") else LiveTradeDaemon
+    daemon = daemon_cls(config)
+    try:
+        daemon.start()
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.error("Failed to start daemon: %s", exc)
+        raise SystemExit(1)
+    try:
+        if args.once:
+            asyncio.run(daemon.run_once())
+        elif args.on_bar_close:
+            asyncio.run(
+                daemon.serve_ticks(
+                    args.on_bar_close.upper(),
+                    _parse_day(args.start_day),
+                    _parse_time(args.start_time),
+                    _parse_day(args.stop_day),
+                    _parse_time(args.stop_time),
+                )
+            )
+        else:
+            asyncio.run(
+                daemon.serve(
+                    args.interval,
+                    _parse_day(args.start_day),
+                    _parse_time(args.start_time),
+                    _parse_day(args.stop_day),
+                    _parse_time(args.stop_time),
+                )
+            )
+    except (KeyboardInterrupt, SystemExit):  # pragma: no cover - manual stop
+        LOGGER.info("Daemon stopped")
+    finally:
+        daemon.stop()
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main()
@@ -18,6 +18,7 @@ if str(SRC) not in sys.path:
 
 from gpt_trader.cli.common import _run_step
 from gpt_trader.utils import post_signal
+from gpt_trader.utils.metrics import span
 
 
 def _flag_true(value: object | None) -> bool:
@@ -34,6 +35,26 @@ def _load_config(path: Path) -> dict:
         raise RuntimeError(f"Failed to read config: {exc}") from exc
 
 
+def _post_signal_data(config: dict, signal_data: dict) -> None:
+    """Post *signal_data* to the signal API and Neon when enabled."""
+    api_cfg = config.get("signal_api", {})
+    neon_cfg = config.get("neon", {})
+    if _flag_true(api_cfg.get("enabled")) and api_cfg.get("base_url"):
+        with span("notify", channel="signal_api"):
+            post_signal(
+                api_cfg.get("base_url", ""),
+                api_cfg.get("auth_token", ""),
+                signal_data,
+            )
+    if _flag_true(neon_cfg.get("enabled")) and neon_cfg.get("api_url"):
+        with span("notify", channel="neon"):
+            post_signal(
+                neon_cfg.get("api_url", ""),
+                neon_cfg.get("auth_token", ""),
+                signal_data,
+            )
+
+
 async def main() -> dict[str, str]:
     pre_parser = argparse.ArgumentParser(add_help=False)
 
@@ -60,7 +81,7 @@ async def main() -> dict[str, str]:
 
     parser.add_argument(
         "--fetch-type",
-        choices=["yf", "mt5"],
+        choices=["yf", "mt5", "replay"],
         default=workflow.get("fetch_type", "mt5"),
         help="Select built-in data fetcher (ignored if --fetch-script is set)",
     )
@@ -135,6 +156,7 @@ async def main() -> dict[str, str]:
         fetch_map = {
             "yf": SRC / "gpt_trader" / "fetch" / "fetch_yf_data.py",
             "mt5": SRC / "gpt_trader" / "fetch" / "fetch_mt5_data.py",
+            "replay": SRC / "gpt_trader" / "fetch" / "fetch_replay_data.py",
         }
         args.fetch_script = str(fetch_map[args.fetch_type])
 
@@ -210,20 +232,7 @@ async def main() -> dict[str, str]:
                     cfg_lookup.get("path_latest_response", args.response)
                 ).with_suffix(".json")
                 signal_data = json.loads(latest.read_text(encoding="utf-8"))
-                api_cfg = config.get("signal_api", {})
-                neon_cfg = config.get("neon", {})
-                if _flag_true(api_cfg.get("enabled")) and api_cfg.get("base_url"):
-                    post_signal(
-                        api_cfg.get("base_url", ""),
-                        api_cfg.get("auth_token", ""),
-                        signal_data,
-                    )
-                if _flag_true(neon_cfg.get("enabled")) and neon_cfg.get("api_url"):
-                    post_signal(
-                        neon_cfg.get("api_url", ""),
-                        neon_cfg.get("auth_token", ""),
-                        signal_data,
-                    )
+                _post_signal_data(config, signal_data)
                 results["post_signal"] = "success"
             except Exception as exc:  # noqa: BLE001
                 logging.error("post signal failed: %s", exc)
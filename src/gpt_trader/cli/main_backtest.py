@@ -12,6 +12,8 @@ from datetime import datetime, timedelta
 from pathlib import Path
 
 from gpt_trader.cli.common import _run_step
+from gpt_trader.backtest.engine import BacktestEngine
+from gpt_trader.send.response_cache import CACHE_MODES
 
 
 def _load_config(path: Path) -> dict:
@@ -48,9 +50,35 @@ async def main() -> None:
     scripts_cfg = workflow.get("scripts", {})
     skip_cfg = workflow.get("skip", {})
 
+    parser.add_argument(
+        "--engine",
+        choices=["inprocess", "subprocess"],
+        default=workflow.get("engine", "inprocess"),
+        help="Run steps in this process or spawn one script per stage",
+    )
+    pool_cfg = dict(workflow.get("gpt_pool", {}))
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(pool_cfg.get("concurrency", 1)),
+        help="GPT requests in flight at once for the in-process engine",
+    )
+    pipeline_cfg = dict(workflow.get("pipeline", {}))
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=int(pipeline_cfg.get("prefetch", 0)),
+        help="Steps fetched ahead while GPT answers earlier ones (0 runs steps one by one)",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        choices=CACHE_MODES,
+        default=(config.get("send") or {}).get("cache_mode", "off"),
+        help="GPT response cache behaviour for the in-process engine",
+    )
     parser.add_argument(
         "--fetch-type",
-        choices=["yf", "mt5"],
+        choices=["yf", "mt5", "replay"],
         default=workflow.get("fetch_type", "mt5"),
         help="Select built-in data fetcher (ignored if --fetch-script is set)",
     )
@@ -109,18 +137,62 @@ async def main() -> None:
         "signal_table", "data/back_test/signals/backtest_signals.csv"
     ))
 
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+    )
+
+    if args.engine == "inprocess":
+        if args.fetch_script or args.fetch_type == "yf" or any(
+            (args.skip_fetch, args.skip_send, args.skip_parse)
+        ):
+            logging.info(
+                "Custom scripts, skipped stages or fetch type %s need the subprocess engine",
+                args.fetch_type,
+            )
+        else:
+            if args.fetch_type == "replay":
+                from gpt_trader.fetch.fetch_replay_data import ReplaySource
+
+                # local history only; no terminal to open
+                fetch_module = ReplaySource.from_config(fetch_cfg or {})
+                init = shutdown = None
+            else:
+                from gpt_trader.fetch import fetch_mt5_data
+
+                fetch_module = fetch_mt5_data
+                init, shutdown = fetch_mt5_data._init_mt5, fetch_mt5_data._shutdown_mt5
+            try:
+                if init is not None:
+                    init()
+                engine = BacktestEngine(
+                    config, fetch_module=fetch_module, cache_mode=args.cache_mode
+                )
+                if args.concurrency > 1:
+                    pool_cfg["concurrency"] = args.concurrency
+                    await engine.run_concurrent(pool_cfg)
+                elif args.prefetch > 0:
+                    engine.run_pipelined(
+                        args.prefetch, int(pipeline_cfg.get("send_workers", 1))
+                    )
+                else:
+                    engine.run()
+            except Exception as exc:  # noqa: BLE001
+                logging.error("Backtest failed: %s", exc)
+                raise SystemExit(1)
+            finally:
+                if shutdown is not None:
+                    shutdown()
+            return
+
     if not args.fetch_script:
         fetch_map = {
             "yf": "src/gpt_trader/fetch/fetch_yf_data.py",
             "mt5": "src/gpt_trader/fetch/fetch_mt5_data.py",
+            "replay": "src/gpt_trader/fetch/fetch_replay_data.py",
         }
         args.fetch_script = fetch_map[args.fetch_type]
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-    )
-
     current = start_time
     while current <= end_time:
         logging.info("Backtest step at %s", current.isoformat())
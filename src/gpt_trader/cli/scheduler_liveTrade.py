@@ -5,12 +5,13 @@ import argparse
 import asyncio
 import json
 import math
-from datetime import datetime, timedelta, time as dt_time
+from datetime import datetime, timedelta, time as dt_time, timezone
 import logging
 import threading
 import time
 import re
 
+from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.schedulers.blocking import BlockingScheduler
 
 
@@ -25,6 +26,9 @@ from gpt_trader.cli.live_trade_workflow import main as run_main
 from gpt_trader.notify import send_line, send_telegram
 from gpt_trader.cli.latest_signal_to_mt5 import TradeSignalSender
 from gpt_trader.utils import post_event
+from gpt_trader.utils.artifact_index import latest_artifact
+from gpt_trader.utils.metrics import configure as configure_metrics, observe, span
+from gpt_trader.utils.retention import run_retention
 
 LOGGER = logging.getLogger(__name__)
 
@@ -40,12 +44,9 @@ def _load_config(path: Path) -> dict:
         raise RuntimeError(f"Failed to read config: {exc}") from exc
 
 
-def _load_latest_signal(json_dir: Path) -> dict:
+def _load_latest_signal(json_dir: Path, symbol: str | None = None) -> dict:
     """Return contents of the newest JSON file in *json_dir*."""
-    json_files = list(json_dir.glob("*.json"))
-    if not json_files:
-        raise FileNotFoundError(f"No JSON files found in {json_dir}")
-    latest = max(json_files, key=lambda p: p.stat().st_mtime)
+    latest = latest_artifact(json_dir, symbol)
     return json.loads(latest.read_text(encoding="utf-8"))
 
 
@@ -132,6 +133,101 @@ def _next_window_run(
     return next_run
 
 
+TF_MINUTES = {"M1": 1, "M5": 5, "M15": 15, "M30": 30, "H1": 60, "H4": 240, "D1": 1440}
+TRIGGER_MODES = ("interval", "bar_close", "new_bar")
+
+# Monday midnight; bar boundaries are counted from here (plus an offset).
+_BAR_ANCHOR = datetime(2000, 1, 3)
+
+
+def _next_bar_close(
+    now: datetime,
+    timeframe: str,
+    settle_seconds: float = 0.0,
+    offset_minutes: int = 0,
+) -> datetime:
+    """Return the first *timeframe* candle close plus *settle_seconds* after *now*.
+
+    Boundaries are counted from midnight shifted by *offset_minutes*, which
+    lets H4 and D1 follow a broker clock that differs from the local one.
+    """
+    period = timedelta(minutes=TF_MINUTES[timeframe.upper()])
+    settle = timedelta(seconds=settle_seconds)
+    anchor = _BAR_ANCHOR.replace(tzinfo=now.tzinfo) + timedelta(minutes=offset_minutes)
+    bars = (now - anchor - settle) // period + 1
+    return anchor + bars * period + settle
+
+
+class NewBarDebouncer:
+    """Turn repeated "latest bar" observations into one event per new bar.
+
+    :meth:`feed` is called with the start time of the bar currently being
+    formed. The first value only primes the debouncer. A later, newer value
+    means the previous bar closed; it fires once the value has been seen
+    for *debounce_seconds*, and newer bars seen meanwhile replace it, so a
+    burst of detections results in a single run.
+    """
+
+    def __init__(self, debounce_seconds: float = 0.0, clock=time.monotonic) -> None:
+        self.debounce_seconds = debounce_seconds
+        self._clock = clock
+        self.last: int | None = None
+        self._pending: int | None = None
+        self._seen_at = 0.0
+
+    def feed(self, bar_time: int | None) -> int | None:
+        """Return the new bar time when a run should start, else ``None``."""
+        if bar_time is not None:
+            if self.last is None:
+                self.last = bar_time
+            elif bar_time > self.last and bar_time != self._pending:
+                self._pending = bar_time
+                self._seen_at = self._clock()
+        if (
+            self._pending is not None
+            and self._clock() - self._seen_at >= self.debounce_seconds
+        ):
+            self.last, self._pending = self._pending, None
+            return self.last
+        return None
+
+
+def _latest_bar_time(symbol: str, timeframe: str) -> int | None:
+    """Return the start time of the *timeframe* bar MT5 is forming now."""
+    from gpt_trader.fetch import fetch_mt5_data as fetcher
+    from gpt_trader.utils.mt5_session import get_mt5_session
+
+    session = get_mt5_session(fetcher.mt5)
+    session.ensure()
+    with session.lock:
+        rates = fetcher.mt5.copy_rates_from_pos(symbol, fetcher.TF_MAP[timeframe], 0, 1)
+    if rates is None or not len(rates):
+        return None
+    return int(rates[-1]["time"])
+
+
+def _watch_new_bars(
+    runner,
+    bar_time,
+    debouncer: NewBarDebouncer,
+    poll_seconds: float = 2.0,
+    sleep=time.sleep,
+    should_stop=lambda: False,
+) -> None:
+    """Call *runner* once per new bar reported by *bar_time*."""
+    while not should_stop():
+        try:
+            latest = bar_time()
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.warning("New bar check failed: %s", exc)
+            latest = None
+        fired = debouncer.feed(latest)
+        if fired is not None:
+            LOGGER.info("New bar opened at %s", datetime.fromtimestamp(fired, tz=timezone.utc))
+            runner()
+        sleep(poll_seconds)
+
+
 def _format_summary_message(
     detail: str, status: str, signal: dict | None, account: str | None = None
 ) -> str:
@@ -210,7 +306,8 @@ def _notify_summary(notify_cfg: dict, entry: str) -> None:
     if line_cfg.get("enabled") and line_cfg.get("token"):
         LOGGER.info("Sending LINE notification")
         try:
-            send_line(entry, line_cfg["token"])
+            with span("notify", channel="line"):
+                send_line(entry, line_cfg["token"])
         except Exception as exc:  # noqa: BLE001
             LOGGER.warning("Notification failed: %s", exc)
         else:
@@ -224,19 +321,53 @@ def _notify_summary(notify_cfg: dict, entry: str) -> None:
     ):
         LOGGER.info("Sending Telegram notification")
         try:
-            send_telegram(entry, telegram_cfg["token"], telegram_cfg["chat_id"])
+            with span("notify", channel="telegram"):
+                send_telegram(entry, telegram_cfg["token"], telegram_cfg["chat_id"])
         except Exception as exc:  # noqa: BLE001
             LOGGER.warning("Notification failed: %s", exc)
         else:
             LOGGER.info("Telegram notified")
 
 
+def _place_order(
+    latest_json: Path,
+    signal: dict,
+    risk_pct: float | None,
+    max_risk: float | None,
+) -> str:
+    """Send the signal in *latest_json* to MT5 and return the order status.
+
+    Lot, RR, risk and order status are added to *signal* for the summary.
+    """
+    sender = TradeSignalSender(
+        str(latest_json),
+        risk_per_trade=risk_pct,
+        max_risk_per_trade=max_risk,
+    )
+    signal["lot"] = sender.lot
+    signal["rr"] = sender.rr
+    signal["risk_per_trade"] = sender.risk_per_trade
+    order_status = sender.order_result
+    if getattr(sender, "adjust_note", None):
+        order_status = f"{order_status} {sender.adjust_note}"
+    signal["order_status"] = order_status
+    return order_status
+
+
 def _run_workflow(cfg_path: Path) -> None:
     """Execute the main workflow once."""
     LOGGER.info("Starting scheduled workflow run")
+    try:
+        multi_symbol = bool(_load_config(cfg_path).get("symbols"))
+    except Exception:  # noqa: BLE001
+        multi_symbol = False
+    if multi_symbol:
+        _run_multi_symbol(cfg_path)
+        return
     status = "success"
     results: dict[str, str] | None = None
     order_status: str | None = None
+    started = time.perf_counter()
     try:
         results = asyncio.run(run_main())
         if any(v == "error" for v in results.values()):
@@ -269,18 +400,8 @@ def _run_workflow(cfg_path: Path) -> None:
             )
             latest_json = Path(latest_txt).with_suffix(".json")
             try:
-                sender = TradeSignalSender(
-                    str(latest_json),
-                    risk_per_trade=risk_pct,
-                    max_risk_per_trade=max_risk,
-                )
-                signal["lot"] = sender.lot
-                signal["rr"] = sender.rr
-                signal["risk_per_trade"] = sender.risk_per_trade
-                order_status = sender.order_result
-                if getattr(sender, "adjust_note", None):
-                    order_status = f"{order_status} {sender.adjust_note}"
-                signal["order_status"] = order_status
+                with span("order"):
+                    order_status = _place_order(latest_json, signal, risk_pct, max_risk)
             except Exception as exc:  # noqa: BLE001
                 LOGGER.warning("Failed to send MT5 signal: %s", exc)
                 order_status = "error"
@@ -296,30 +417,76 @@ def _run_workflow(cfg_path: Path) -> None:
             detail_items.append(f"post_signal:{results['post_signal']}")
     if order_status is not None:
         detail_items.append(f"order:{order_status}")
-    detail = " ".join(detail_items)
+    observe("total", time.perf_counter() - started, "ok" if status == "success" else "error")
+
+    _report_run(cfg, notify_cfg, detail_items, status, signal)
 
+
+def _run_multi_symbol(cfg_path: Path) -> None:
+    """Run every configured symbol in-process and report them together."""
+    from gpt_trader.cli.live_trade_daemon import run_multi_symbol
+
+    try:
+        results = asyncio.run(run_multi_symbol(_load_config(cfg_path)))
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.error("Multi-symbol run failed: %s", exc)
+        return
+    LOGGER.info("Multi-symbol run finished: %s", results)
+
+
+def _report_run(
+    cfg: dict,
+    notify_cfg: dict,
+    detail_items: list[str],
+    status: str,
+    signal: dict | None,
+) -> str:
+    """Save the run summary to the event API and run log, then notify.
+
+    Returns the final summary message.
+    """
+    return _report_sections(cfg, notify_cfg, [(detail_items, status, signal)])
+
+
+def _report_sections(
+    cfg: dict,
+    notify_cfg: dict,
+    sections: list[tuple[list[str], str, dict | None]],
+) -> str:
+    """Report several ``(detail_items, status, signal)`` runs as one message.
+
+    Used by multi-symbol runs so that every symbol ends up in a single
+    event, log entry and notification. Returns the final summary message.
+    """
     account_name = cfg.get("account_name")
-    message = _format_summary_message(detail, status, signal, account_name)
+
+    def _format() -> str:
+        return "\n\n".join(
+            _format_summary_message(" ".join(items), status, signal, account_name)
+            for items, status, signal in sections
+        )
+
+    message = _format()
 
     post_event_status: str | None = None
     neon_cfg = cfg.get("neon", {})
     if neon_cfg.get("enabled", True) and neon_cfg.get("api_url"):
         try:
-            post_event(
-                neon_cfg.get("api_url", ""),
-                neon_cfg.get("auth_token", ""),
-                {"message": message},
-            )
+            with span("notify", channel="event_api"):
+                post_event(
+                    neon_cfg.get("api_url", ""),
+                    neon_cfg.get("auth_token", ""),
+                    {"message": message},
+                )
         except Exception as exc:  # noqa: BLE001
             LOGGER.warning("Failed to save notification to DB: %s", exc)
             post_event_status = "error"
         else:
             post_event_status = "success"
 
-    if post_event_status is not None:
-        detail_items.append(f"post_event:{post_event_status}")
-        detail = " ".join(detail_items)
-        message = _format_summary_message(detail, status, signal, account_name)
+    if post_event_status is not None and sections:
+        sections[-1][0].append(f"post_event:{post_event_status}")
+        message = _format()
 
     LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
     try:
@@ -329,6 +496,7 @@ def _run_workflow(cfg_path: Path) -> None:
         LOGGER.warning("Failed to update run log: %s", exc)
 
     _notify_summary(notify_cfg, message)
+    return message
 
 
 def _make_workflow_runner(
@@ -350,6 +518,36 @@ def _make_workflow_runner(
  
 
 
+def _run_retention(cfg_path: Path) -> None:
+    """Archive and prune old artifacts as configured in *cfg_path*."""
+    try:
+        run_retention(_load_config(cfg_path))
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.error("Retention job failed: %s", exc)
+
+
+def _add_retention_job(scheduler, cfg_path: Path):
+    """Schedule :func:`_run_retention` when ``retention.enabled`` is set.
+
+    Returns the job, or ``None`` when retention is disabled.
+    """
+    try:
+        retention_cfg = _load_config(cfg_path).get("retention") or {}
+    except Exception:  # noqa: BLE001
+        return None
+    if not retention_cfg.get("enabled"):
+        return None
+    minutes = float(retention_cfg.get("interval_minutes", 60))
+    LOGGER.info("Retention job every %s minutes", minutes)
+    return scheduler.add_job(
+        _run_retention,
+        "interval",
+        args=[cfg_path],
+        minutes=minutes,
+        next_run_time=datetime.now(),
+    )
+
+
 def _start_countdown(
     job,
     interval: int,
@@ -366,9 +564,11 @@ def _start_countdown(
             if base_run is None:
                 time.sleep(1)
                 continue
-            next_run = _next_window_run(
-                base_run, interval, start_day, start_time, stop_day, stop_time
-            )
+            next_run = base_run
+            if not _within_window(base_run, start_day, start_time, stop_day, stop_time):
+                next_run = _next_window_run(
+                    base_run, interval, start_day, start_time, stop_day, stop_time
+                )
             while True:
                 remaining = next_run - datetime.now(next_run.tzinfo)
                 if remaining.total_seconds() <= 0:
@@ -431,8 +631,34 @@ def main() -> None:
         default=str(DEFAULT_CFG),
         help="Path to JSON config",
     )
+    parser.add_argument(
+        "--trigger",
+        choices=TRIGGER_MODES,
+        help="interval: every --interval minutes; bar_close: on --bar-tf candle "
+        "boundaries; new_bar: when MT5 reports a new --bar-tf bar",
+    )
+    parser.add_argument("--bar-tf", help="Timeframe for bar_close/new_bar triggers")
+    parser.add_argument(
+        "--settle-seconds",
+        type=float,
+        help="Wait this long after the candle close (bar_close) or debounce new bars (new_bar)",
+    )
     args = parser.parse_args()
 
+    try:
+        trigger_cfg = _load_config(Path(args.config)).get("workflow", {}).get("trigger", {})
+    except Exception:  # noqa: BLE001
+        trigger_cfg = {}
+    mode = args.trigger or trigger_cfg.get("mode", "interval")
+    bar_tf = str(args.bar_tf or trigger_cfg.get("timeframe", "M5")).upper()
+    if mode != "interval" and bar_tf not in TF_MINUTES:
+        parser.error(f"Unsupported timeframe: {bar_tf}")
+    settle = (
+        args.settle_seconds
+        if args.settle_seconds is not None
+        else float(trigger_cfg.get("settle_seconds", 5))
+    )
+
     start_day = _parse_day(args.start_day)
     start_time = _parse_time(args.start_time)
     stop_day = _parse_day(args.stop_day)
@@ -446,31 +672,71 @@ def main() -> None:
         handlers=[logging.FileHandler(LOG_FILE), logging.StreamHandler()],
     )
 
+    try:
+        configure_metrics(_load_config(cfg_path).get("metrics"))
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.warning("Metrics not configured: %s", exc)
+
+    runner = _make_workflow_runner(start_day, start_time, stop_day, stop_time, cfg_path)
+
+    if mode == "new_bar":
+        background = BackgroundScheduler()
+        if _add_retention_job(background, cfg_path) is not None:
+            background.start()
+        cfg = _load_config(cfg_path)
+        symbol = cfg.get("fetch", {}).get("symbol", "EURUSD")
+        LOGGER.info(
+            "Watching %s %s bars (debounce %ss); press Ctrl+C to exit", symbol, bar_tf, settle
+        )
+        try:
+            _watch_new_bars(
+                runner,
+                lambda: _latest_bar_time(symbol, bar_tf),
+                NewBarDebouncer(settle),
+                float(trigger_cfg.get("poll_seconds", 2)),
+            )
+        except (KeyboardInterrupt, SystemExit):  # pragma: no cover - manual stop
+            LOGGER.info("Scheduler stopped")
+        return
+
     scheduler = BlockingScheduler()
+    _add_retention_job(scheduler, cfg_path)
     first_run = datetime.now() + timedelta(minutes=args.start_in)
-    next_exec = _next_window_run(
-        first_run, args.interval, start_day, start_time, stop_day, stop_time
-    )
-    job = scheduler.add_job(
-        _make_workflow_runner(start_day, start_time, stop_day, stop_time, cfg_path),
-        "interval",
-        minutes=args.interval,
-        next_run_time=next_exec,
-    )
+    if mode == "bar_close":
+        interval = TF_MINUTES[bar_tf]
+        next_exec = _next_bar_close(
+            first_run, bar_tf, settle, int(trigger_cfg.get("offset_minutes", 0))
+        )
+        # start_date anchors every later run to the same candle boundary
+        job = scheduler.add_job(runner, "interval", minutes=interval, start_date=next_exec)
+    else:
+        interval = args.interval
+        next_exec = _next_window_run(
+            first_run, interval, start_day, start_time, stop_day, stop_time
+        )
+        job = scheduler.add_job(
+            runner,
+            "interval",
+            minutes=interval,
+            next_run_time=next_exec,
+        )
 
-    _start_countdown(job, args.interval, start_day, start_time, stop_day, stop_time)
+    _start_countdown(job, interval, start_day, start_time, stop_day, stop_time)
     LOGGER.info(
-        "Scheduler started (initial run at %s, first scheduled run at %s, interval %s minutes, window %s %s to %s %s); press Ctrl+C to exit",
+        "Scheduler started (initial run at %s, first scheduled run at %s, trigger %s, interval %s minutes, window %s %s to %s %s); press Ctrl+C to exit",
         datetime.now().isoformat(timespec="seconds"),
         next_exec.isoformat(timespec="seconds"),
-        args.interval,
+        mode,
+        interval,
         args.start_day,
         args.start_time,
         args.stop_day,
         args.stop_time,
     )
 
-    _run_workflow(cfg_path)
+    if mode == "interval":
+        # bar_close waits for the first closed candle instead
+        _run_workflow(cfg_path)
 
     try:
         scheduler.start()
@@ -0,0 +1,307 @@
+"""Persistent on-disk OHLCV store keyed by ``(symbol, timeframe)``.
+
+Bars are kept exactly as returned by MetaTrader5 (``time`` in epoch seconds
+plus the OHLCV columns) in one ``.npy`` partition per UTC day::
+
+    <root>/<SYMBOL>/<TF>/20240131.npy
+    <root>/<SYMBOL>/<TF>/coverage.json
+
+``coverage.json`` lists the time spans that were fetched completely, so a
+lookup can tell "no bars because the market was closed" apart from "never
+fetched". Partitions are opened memory-mapped, which keeps reads cheap even
+for months of M1 history.
+
+:class:`BarIndex` keeps whole series in memory for backtests and answers
+"the last N bars at or before T" with a binary search.
+"""
+from __future__ import annotations
+
+import json
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from gpt_trader.utils.atomic_io import atomic_open, atomic_write_text
+
+BAR_DTYPE = np.dtype(
+    [
+        ("time", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("tick_volume", "<i8"),
+        ("spread", "<i4"),
+        ("real_volume", "<i8"),
+    ]
+)
+
+_DAY = 86400
+_EPOCH = pd.Timestamp("1970-01-01")
+_SAFE_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def to_bar_array(rates) -> np.ndarray:
+    """Return *rates* as a sorted structured array of :data:`BAR_DTYPE`.
+
+    *rates* may be the array returned by ``copy_rates_*``, a DataFrame or a
+    list of mappings. Missing optional columns are filled with zero.
+    """
+    if rates is None:
+        return np.empty(0, dtype=BAR_DTYPE)
+    if isinstance(rates, np.ndarray) and rates.dtype.names:
+        src = {name: rates[name] for name in rates.dtype.names}
+        size = len(rates)
+    else:
+        df = pd.DataFrame(rates)
+        src = {name: df[name].to_numpy() for name in df.columns}
+        size = len(df)
+    out = np.zeros(size, dtype=BAR_DTYPE)
+    if size == 0:
+        return out
+    for name in BAR_DTYPE.names:
+        if name in src:
+            out[name] = src[name]
+    # terminal and history data are already sorted; a structured sort is slow
+    if (np.diff(out["time"]) < 0).any():
+        out = out[np.argsort(out["time"], kind="stable")]
+    return out
+
+
+def epoch_seconds(values) -> np.ndarray:
+    """Return timestamps in *values* as epoch seconds on the bar clock.
+
+    Naive times are taken as they are; aware times are converted to UTC
+    first, like the ``time`` column of MT5 rates.
+    """
+    ts = pd.to_datetime(pd.Series(values))
+    if ts.dt.tz is not None:
+        ts = ts.dt.tz_convert(None)
+    return ((ts - _EPOCH) // pd.Timedelta(seconds=1)).to_numpy(dtype="int64")
+
+
+def bars_ending_at(data: np.ndarray, bars: int, end: Optional[int] = None) -> np.ndarray:
+    """Return the last *bars* rows of time-sorted *data* with ``time <= end``.
+
+    Gaps such as weekends do not matter: the rows are counted, not the
+    time span. Fewer rows are returned only when the history starts later.
+    """
+    hi = len(data) if end is None else int(np.searchsorted(data["time"], end, "right"))
+    return data[max(0, hi - bars) : hi]
+
+
+def _merge_spans(spans: Iterable[tuple[int, int]]) -> list[list[int]]:
+    merged: list[list[int]] = []
+    for start, end in sorted((int(s), int(e)) for s, e in spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class BarIndex:
+    """Sorted bars per ``(symbol, timeframe)`` held in memory.
+
+    :meth:`ending_at` results are memoized per ``(symbol, timeframe, bars,
+    T)``, so repeated windows, e.g. from a rerun or several consumers of
+    the same step, cost a dictionary lookup. Instances are callable with
+    the ``rates_source`` signature accepted by ``fetch_multi_tf``.
+    """
+
+    def __init__(self, memo_size: int = 4096) -> None:
+        self.memo_size = memo_size
+        self._bars: dict[tuple[str, str], np.ndarray] = {}
+        self._memo: OrderedDict[tuple, np.ndarray] = OrderedDict()
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._bars
+
+    def add(self, symbol: str, timeframe: str, rates) -> None:
+        """Store *rates* for ``(symbol, timeframe)``, replacing older bars."""
+        self._bars[(symbol, timeframe)] = to_bar_array(rates)
+        self._memo.clear()
+
+    def bars(self, symbol: str, timeframe: str) -> np.ndarray:
+        """Return every stored bar for ``(symbol, timeframe)``."""
+        return self._bars.get((symbol, timeframe), np.empty(0, dtype=BAR_DTYPE))
+
+    def ending_at(
+        self,
+        symbol: str,
+        timeframe: str,
+        bars: int,
+        end_time: Union[pd.Timestamp, int, None] = None,
+    ) -> np.ndarray:
+        """Return the last *bars* bars opened at or before *end_time*."""
+        if end_time is None or isinstance(end_time, (int, np.integer)):
+            end = end_time
+        else:
+            end = int(pd.Timestamp(end_time).timestamp())
+        key = (symbol, timeframe, bars, end)
+        window = self._memo.get(key)
+        if window is not None:
+            self._memo.move_to_end(key)
+            return window
+        window = bars_ending_at(self.bars(symbol, timeframe), bars, end)
+        self._memo[key] = window
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return window
+
+    __call__ = ending_at
+
+
+class BarStore:
+    """Append-only bar cache on the local filesystem."""
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+
+    def _dir(self, symbol: str, timeframe: str) -> Path:
+        return self.root / _SAFE_RE.sub("_", symbol) / _SAFE_RE.sub("_", str(timeframe))
+
+    def _partitions(self, symbol: str, timeframe: str) -> list[Path]:
+        directory = self._dir(symbol, timeframe)
+        if not directory.exists():
+            return []
+        return sorted(directory.glob("*.npy"))
+
+    @staticmethod
+    def _day_of(path: Path) -> int:
+        return int(pd.Timestamp(path.stem).timestamp()) // _DAY
+
+    def _load(self, path: Path) -> np.ndarray:
+        return np.load(path, mmap_mode="r")
+
+    # -- coverage --------------------------------------------------------
+    def coverage(self, symbol: str, timeframe: str) -> list[list[int]]:
+        """Return merged ``[start, end]`` spans (epoch seconds) known complete."""
+        path = self._dir(symbol, timeframe) / "coverage.json"
+        if not path.exists():
+            return []
+        return _merge_spans(json.loads(path.read_text(encoding="utf-8")))
+
+    def _add_coverage(self, symbol: str, timeframe: str, span: tuple[int, int]) -> None:
+        spans = self.coverage(symbol, timeframe)
+        spans.append([int(span[0]), int(span[1])])
+        path = self._dir(symbol, timeframe) / "coverage.json"
+        atomic_write_text(path, json.dumps(_merge_spans(spans)))
+
+    def covers(self, symbol: str, timeframe: str, start: int, end: int) -> bool:
+        """Return ``True`` if ``[start, end]`` lies inside one fetched span."""
+        return any(s <= start and end <= e for s, e in self.coverage(symbol, timeframe))
+
+    # -- writes ----------------------------------------------------------
+    def write(
+        self,
+        symbol: str,
+        timeframe: str,
+        rates,
+        span: Optional[tuple[int, int]] = None,
+    ) -> None:
+        """Merge *rates* into the store, replacing bars with the same time.
+
+        *span* marks ``[start, end]`` as completely fetched; it defaults to
+        the first and last bar time of *rates*.
+        """
+        bars = to_bar_array(rates)
+        directory = self._dir(symbol, timeframe)
+        directory.mkdir(parents=True, exist_ok=True)
+        if len(bars):
+            days = bars["time"] // _DAY
+            for day in np.unique(days):
+                chunk = bars[days == day]
+                name = pd.Timestamp(int(day) * _DAY, unit="s").strftime("%Y%m%d")
+                path = directory / f"{name}.npy"
+                if path.exists():
+                    old = np.load(path)
+                    old = old[~np.isin(old["time"], chunk["time"])]
+                    chunk = np.sort(np.concatenate([old, chunk]), order="time")
+                with atomic_open(path, "wb", encoding=None) as f:
+                    np.save(f, chunk)
+        if span is None and len(bars):
+            span = (int(bars["time"][0]), int(bars["time"][-1]))
+        if span is not None:
+            self._add_coverage(symbol, timeframe, span)
+
+    # -- reads -----------------------------------------------------------
+    def last_time(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Return the time of the newest stored bar or ``None``."""
+        parts = self._partitions(symbol, timeframe)
+        for path in reversed(parts):
+            data = self._load(path)
+            if len(data):
+                return int(data["time"][-1])
+        return None
+
+    def read(
+        self,
+        symbol: str,
+        timeframe: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> np.ndarray:
+        """Return stored bars with ``start <= time <= end``."""
+        chunks = []
+        for path in self._partitions(symbol, timeframe):
+            day = self._day_of(path)
+            if start is not None and (day + 1) * _DAY <= start:
+                continue
+            if end is not None and day * _DAY > end:
+                break
+            data = self._load(path)
+            lo = 0 if start is None else np.searchsorted(data["time"], start, "left")
+            hi = len(data) if end is None else np.searchsorted(data["time"], end, "right")
+            chunks.append(np.asarray(data[lo:hi]))
+        if not chunks:
+            return np.empty(0, dtype=BAR_DTYPE)
+        return np.concatenate(chunks)
+
+    def tail(
+        self,
+        symbol: str,
+        timeframe: str,
+        bars: int,
+        end: Optional[int] = None,
+    ) -> Optional[np.ndarray]:
+        """Return the last *bars* bars at or before *end* if fully covered.
+
+        ``None`` is returned when fewer bars are stored or when the span
+        from the first returned bar to *end* was never fetched completely,
+        in which case the caller has to go to the terminal.
+        """
+        if bars <= 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+        chunks: list[np.ndarray] = []
+        count = 0
+        for path in reversed(self._partitions(symbol, timeframe)):
+            if end is not None and self._day_of(path) * _DAY > end:
+                continue
+            data = self._load(path)
+            hi = len(data) if end is None else np.searchsorted(data["time"], end, "right")
+            chunks.append(np.asarray(data[max(0, hi - (bars - count)):hi]))
+            count += len(chunks[-1])
+            if count >= bars:
+                break
+        if count < bars:
+            return None
+        out = np.concatenate(chunks[::-1])
+        stop = int(out["time"][-1]) if end is None else int(end)
+        if not self.covers(symbol, timeframe, int(out["time"][0]), stop):
+            return None
+        return out
+
+
+__all__ = [
+    "BAR_DTYPE",
+    "BarIndex",
+    "BarStore",
+    "bars_ending_at",
+    "epoch_seconds",
+    "to_bar_array",
+]
@@ -10,13 +10,24 @@ from __future__ import annotations
 import argparse
 import json
 import logging
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
 
 import pandas as pd
 import MetaTrader5 as mt5
-from gpt_trader.utils.indicators import compute_indicators
-from gpt_trader.utils import write_json_no_nulls
+from gpt_trader.fetch.bar_store import BarStore, bars_ending_at, to_bar_array
+from gpt_trader.utils.indicators import IndicatorEngine, compute_indicators
+from gpt_trader.utils.indicator_registry import (
+    output_columns,
+    parse_specs,
+    resolve_fetch_bars,
+)
+from gpt_trader.utils import atomic_write_csv, write_json_no_nulls
+from gpt_trader.utils.artifact_index import record_artifact, signal_symbol
+from gpt_trader.utils.metrics import span
+from gpt_trader.utils.sessions import MT5_SESSIONS, apply_sessions
+from gpt_trader.utils.mt5_session import get_mt5_session
 
 
 LOGGER = logging.getLogger(__name__)
@@ -43,15 +54,22 @@ TF_DELTA: Dict[int, pd.Timedelta] = {
 }
 
 
+# A ``time_fetch`` span that comes back short (weekends, session breaks)
+# is widened this many times, four-fold each time.
+RANGE_RETRIES = 6
+RANGE_MEMO_SIZE = 256
+
+_range_memo: "OrderedDict[tuple, Any]" = OrderedDict()
+
+
 def _init_mt5() -> None:
-    """Initialize connection to MetaTrader5."""
-    if not mt5.initialize():
-        raise RuntimeError(f"MT5 initialize() failed: {mt5.last_error()}")
+    """Open (or reuse) the shared MetaTrader5 session."""
+    get_mt5_session(mt5).acquire()
 
 
 def _shutdown_mt5() -> None:
-    """Shutdown MetaTrader5 connection."""
-    mt5.shutdown()
+    """Release the shared session; the last user closes the terminal link."""
+    get_mt5_session(mt5).release()
 
 
 def _load_config(path: Path) -> Dict[str, Any]:
@@ -89,16 +107,184 @@ def get_session(ts: pd.Timestamp) -> str:
 
 
 
+def _copy_span(symbol: str, timeframe: int, bars: int, end_time: pd.Timestamp):
+    """Return MT5 rates of a span ending at *end_time* that holds *bars* bars.
+
+    The first request spans ``bars - 1`` bar lengths, which is exact when
+    the market traded throughout. When gaps make it come up short the span
+    is widened up to :data:`RANGE_RETRIES` times. Returns every rate of the
+    last request, untrimmed, and the ``(start, end)`` span it covered.
+    """
+    delta = TF_DELTA.get(timeframe)
+    if delta is None:
+        raise ValueError(f"Unknown timeframe constant: {timeframe}")
+    end = pd.Timestamp(end_time)
+    end_s = int(end.timestamp())
+    lookback = delta * max(bars - 1, 1)
+    start = end - delta * (bars - 1)
+    rates = None
+    for attempt in range(RANGE_RETRIES + 1):
+        if attempt:
+            start = end - lookback
+        rates = mt5.copy_rates_range(
+            symbol,
+            timeframe,
+            start.to_pydatetime(),
+            end.to_pydatetime(),
+        )
+        if rates is None:
+            break
+        rates = to_bar_array(rates)
+        if len(rates) >= bars:
+            break
+        lookback *= 4
+    if rates is not None:
+        if len(rates) < bars:
+            LOGGER.warning(
+                "Only %s of %s bars for %s timeframe %s end at %s",
+                len(rates),
+                bars,
+                symbol,
+                timeframe,
+                end,
+            )
+    return rates, (int(start.timestamp()), end_s)
+
+
+def _copy_range(symbol: str, timeframe: int, bars: int, end_time: pd.Timestamp):
+    """Return the last *bars* MT5 rates opened at or before *end_time*."""
+    rates, _ = _copy_span(symbol, timeframe, bars, end_time)
+    if rates is None:
+        return None
+    return bars_ending_at(rates, bars, int(pd.Timestamp(end_time).timestamp()))
+
+
+def _copy_range_memo(symbol: str, timeframe: int, bars: int, end_time: pd.Timestamp):
+    """Return :func:`_copy_range` rates, memoized per ``(symbol, timeframe, bars, T)``."""
+    key = (symbol, timeframe, bars, int(pd.Timestamp(end_time).timestamp()))
+    rates = _range_memo.get(key)
+    if rates is not None:
+        _range_memo.move_to_end(key)
+        return rates
+    rates = _copy_range(symbol, timeframe, bars, end_time)
+    if rates is not None and len(rates):
+        _range_memo[key] = rates
+        if len(_range_memo) > RANGE_MEMO_SIZE:
+            _range_memo.popitem(last=False)
+    return rates
+
+
+def _fetch_stored(
+    store: BarStore,
+    symbol: str,
+    tf_name: str,
+    timeframe: int,
+    bars: int,
+    end_time: Optional[pd.Timestamp] = None,
+):
+    """Return raw rates through *store*, asking MT5 only for missing bars.
+
+    With *end_time* the window is served from disk when it was fetched
+    before. Otherwise the newest bars are probed with a few small
+    ``copy_rates_from_pos`` calls until they overlap the stored tail, and
+    only that tail is appended.
+    """
+    if end_time is not None:
+        end_s = int(pd.Timestamp(end_time).timestamp())
+        cached = store.tail(symbol, tf_name, bars, end_s)
+        if cached is not None:
+            LOGGER.info("Serving %s %s bars for %s from bar store", bars, tf_name, symbol)
+            return cached
+        rates, span = _copy_span(symbol, timeframe, bars, end_time)
+        if rates is None:
+            return None
+        # the whole span was fetched, so store every bar before trimming
+        store.write(symbol, tf_name, rates, span=span)
+        return bars_ending_at(rates, bars, end_s)
+
+    last = store.last_time(symbol, tf_name)
+    count = 2
+    while last is not None and count < bars:
+        probe = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+        if probe is None:
+            break
+        probe = to_bar_array(probe)
+        if len(probe) and int(probe["time"][0]) <= last:
+            store.write(symbol, tf_name, probe, span=(last, int(probe["time"][-1])))
+            cached = store.tail(symbol, tf_name, bars)
+            if cached is not None:
+                LOGGER.info(
+                    "Appended %s new %s bars for %s",
+                    int((probe["time"] > last).sum()),
+                    tf_name,
+                    symbol,
+                )
+                return cached
+            break
+        count *= 4
+
+    rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, bars)
+    if rates is not None and len(rates):
+        store.write(symbol, tf_name, rates)
+    return rates
+
+
+def fetch_range(
+    symbol: str,
+    timeframe: int,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    store: Optional[BarStore] = None,
+    tf_name: Optional[str] = None,
+):
+    """Return every bar between *start* and *end* as a bar array.
+
+    Used to load a whole backtest period in one call. With *store* the span
+    is served from disk when it was fetched before and saved otherwise.
+    """
+    start_s = int(pd.Timestamp(start).timestamp())
+    end_s = int(pd.Timestamp(end).timestamp())
+    key = tf_name or str(timeframe)
+    if store is not None and store.covers(symbol, key, start_s, end_s):
+        LOGGER.info("Serving %s %s history for %s from bar store", key, symbol, start)
+        return store.read(symbol, key, start_s, end_s)
+    with get_mt5_session(mt5).lock:
+        rates = mt5.copy_rates_range(
+            symbol,
+            timeframe,
+            pd.Timestamp(start).to_pydatetime(),
+            pd.Timestamp(end).to_pydatetime(),
+        )
+    if rates is None:
+        raise RuntimeError(f"Failed to fetch data for {symbol} timeframe {timeframe}")
+    if store is not None:
+        store.write(symbol, key, rates, span=(start_s, end_s))
+    return to_bar_array(rates)
+
+
+def _rates_to_frame(rates, tz_shift: int = 0) -> pd.DataFrame:
+    """Return raw MT5 *rates* as a DataFrame with a shifted ``timestamp``."""
+    df = pd.DataFrame(rates)
+    df = df.sort_values("time").reset_index(drop=True)
+    df["timestamp"] = pd.to_datetime(df["time"], unit="s") + pd.Timedelta(hours=tz_shift)
+    df = df.drop(columns=["time", "spread", "real_volume"], errors="ignore")
+    return df
+
+
 def _fetch_rates(
     symbol: str,
     timeframe: int,
     bars: int,
     tz_shift: int = 0,
     end_time: Optional[pd.Timestamp] = None,
+    store: Optional[BarStore] = None,
+    tf_name: Optional[str] = None,
 ) -> pd.DataFrame:
     """Fetch OHLC data from MT5 for a given timeframe.
 
-    If *end_time* is provided the data will end at that timestamp.
+    If *end_time* is provided the data will end at that timestamp. When a
+    *store* is given, bars are read from and appended to it under
+    *tf_name*.
     """
     LOGGER.info(
         "Fetching %s bars for %s timeframe on %s",
@@ -106,36 +292,42 @@ def _fetch_rates(
         timeframe,
         symbol,
     )
-    if end_time is None:
-        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, bars)
-    else:
-        delta = TF_DELTA.get(timeframe)
-        if delta is None:
-            raise ValueError(f"Unknown timeframe constant: {timeframe}")
-        end = pd.Timestamp(end_time)
-        start = end - delta * (bars - 1)
-        rates = mt5.copy_rates_range(
-            symbol,
-            timeframe,
-            start.to_pydatetime(),
-            end.to_pydatetime(),
-        )
+    with get_mt5_session(mt5).lock:
+        if store is not None:
+            key = tf_name or str(timeframe)
+            rates = _fetch_stored(store, symbol, key, timeframe, bars, end_time)
+        elif end_time is None:
+            rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, bars)
+        else:
+            rates = _copy_range_memo(symbol, timeframe, bars, end_time)
     if rates is None:
         raise RuntimeError(f"Failed to fetch data for {symbol} timeframe {timeframe}")
-    df = pd.DataFrame(rates)
-    df = df.sort_values("time").reset_index(drop=True)
-    df["timestamp"] = pd.to_datetime(df["time"], unit="s") + pd.Timedelta(hours=tz_shift)
-    df = df.drop(columns=["time", "spread", "real_volume"], errors="ignore")
-    return df
+    return _rates_to_frame(rates, tz_shift)
 
 
 
 
-def fetch_multi_tf(symbol: str, config: Dict[str, Any], tz_shift: int = 0) -> pd.DataFrame:
-    """Fetch data for several timeframes and merge into one DataFrame."""
+def fetch_multi_tf(
+    symbol: str,
+    config: Dict[str, Any],
+    tz_shift: int = 0,
+    engine: Optional[IndicatorEngine] = None,
+    store: Optional[BarStore] = None,
+    rates_source: Optional[Callable[..., Any]] = None,
+) -> pd.DataFrame:
+    """Fetch data for several timeframes and merge into one DataFrame.
+
+    When *engine* is given, indicators are advanced incrementally from the
+    state kept for each ``(symbol, timeframe)`` instead of being recomputed
+    over the whole frame. When *store* is given, bars are cached on disk and
+    only the missing tail is requested from MT5. *rates_source* replaces the
+    terminal entirely: it is called as ``rates_source(symbol, tf_name, bars,
+    end_time)`` and must return raw rates, e.g. a slice of preloaded history.
+    """
     timeframes_conf = config.get("timeframes", [])
     indicators_conf = config.get("indicators")
-    fetch_bars = int(config.get("fetch_bars", 20))
+    fetch_bars_conf = config.get("fetch_bars", "auto")
+    specs = parse_specs(engine.indicators if engine is not None else indicators_conf)
 
     time_fetch_str = str(config.get("time_fetch", "")).strip()
     if time_fetch_str:
@@ -155,8 +347,21 @@ def fetch_multi_tf(symbol: str, config: Dict[str, Any], tz_shift: int = 0) -> pd
         if tf_const is None:
             raise ValueError(f"Unsupported timeframe: {tf_name}")
         label = _tf_label(tf_name)
-        df = _fetch_rates(symbol, tf_const, fetch_bars, tz_shift, end_time)
-        df = compute_indicators(df, indicators_conf)
+        fetch_bars = resolve_fetch_bars(fetch_bars_conf, specs, keep)
+        with span("rates", symbol=symbol, tf=label):
+            if rates_source is not None:
+                df = _rates_to_frame(
+                    rates_source(symbol, tf_name, fetch_bars, end_time), tz_shift
+                )
+            else:
+                df = _fetch_rates(
+                    symbol, tf_const, fetch_bars, tz_shift, end_time, store=store, tf_name=tf_name
+                )
+        with span("indicators", symbol=symbol, tf=label):
+            if engine is None:
+                df = compute_indicators(df, indicators_conf)
+            else:
+                df = engine.apply(symbol, label, df)
         df = df.tail(keep)
         df["timeframe"] = label
         frames.append(df)
@@ -167,7 +372,7 @@ def fetch_multi_tf(symbol: str, config: Dict[str, Any], tz_shift: int = 0) -> pd
             "Timestamp format must be YYYY-MM-DD HH:MM:SS and the chosen date may not be available"
         )
 
-    combined["session"] = combined["timestamp"].apply(get_session)
+    overlap_cols = apply_sessions(combined, config.get("sessions"), MT5_SESSIONS)
 
     cols = [
         "timestamp",
@@ -178,11 +383,11 @@ def fetch_multi_tf(symbol: str, config: Dict[str, Any], tz_shift: int = 0) -> pd
         "tick_volume",
     ]
 
-    for ind in ["atr14", "rsi14", "sma20", "ema50", "sma200"]:
+    for ind in output_columns(specs):
         if ind in combined.columns:
             cols.append(ind)
 
-    cols += ["timeframe", "session"]
+    cols += ["timeframe", "session"] + overlap_cols
     combined = combined[cols]
     return combined
 
@@ -238,9 +443,12 @@ def main() -> None:
         format="%(asctime)s [%(levelname)s] %(message)s",
     )
 
+    store_path = config.get("bar_store")
+    store = BarStore(store_path) if store_path else None
+
     try:
         _init_mt5()
-        df = fetch_multi_tf(symbol, config, tz_shift=args.tz_shift)
+        df = fetch_multi_tf(symbol, config, tz_shift=args.tz_shift, store=store)
         if df.empty:
             LOGGER.error("No data available for the requested time_fetch")
             raise SystemExit(1)
@@ -249,9 +457,11 @@ def main() -> None:
             name = _timestamp_code(ts_now)
             output = Path(default_save_path) / f"{signal_prefix}{name}.csv"
         output.parent.mkdir(parents=True, exist_ok=True)
-        df.to_csv(output, index=False)
         json_out = output.with_suffix(".json")
-        write_json_no_nulls(df, json_out)
+        with span("serialize", symbol=symbol):
+            atomic_write_csv(df, output)
+            write_json_no_nulls(df, json_out)
+        record_artifact(json_out, signal_symbol(json_out.stem))
         LOGGER.info("Saved data to %s and %s", output, json_out)
     except Exception as exc:
         LOGGER.error("Error fetching data: %s", exc)
@@ -10,19 +10,21 @@ from typing import Any, Dict
 import pandas as pd
 import MetaTrader5 as mt5
 
+from gpt_trader.utils import atomic_write_csv
+from gpt_trader.utils.mt5_session import get_mt5_session
+
 
 LOGGER = logging.getLogger(__name__)
 
 
 def _init_mt5() -> None:
-    """Initialize connection to MetaTrader5."""
-    if not mt5.initialize():
-        raise RuntimeError(f"MT5 initialize() failed: {mt5.last_error()}")
+    """Open (or reuse) the shared MetaTrader5 session."""
+    get_mt5_session(mt5).acquire()
 
 
 def _shutdown_mt5() -> None:
-    """Shutdown MetaTrader5 connection."""
-    mt5.shutdown()
+    """Release the shared session; the last user closes the terminal link."""
+    get_mt5_session(mt5).release()
 
 
 def _load_config(path: Path) -> Dict[str, Any]:
@@ -91,7 +93,7 @@ def main() -> None:
             name = _timestamp_code(ts_now)
             output = Path(default_save_path) / f"history{name}.csv"
         output.parent.mkdir(parents=True, exist_ok=True)
-        df.to_csv(output, index=False)
+        atomic_write_csv(df, output)
         LOGGER.info("Saved history to %s", output)
     except Exception as exc:  # noqa: BLE001
         LOGGER.error("Error fetching history: %s", exc)
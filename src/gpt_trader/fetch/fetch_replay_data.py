@@ -0,0 +1,410 @@
+"""Serve OHLCV data from local history files and compute indicators.
+
+The replay fetcher reads no terminal and no network, so backtests and tests
+run on any machine. The ``replay`` section of the fetch config points at
+the history::
+
+    "replay": {"path": "data/history", "format": "auto",
+               "files": {"M5": "exports/XAUUSD_M5_202401020000_202406282355.csv"}}
+
+For each ``(symbol, timeframe)`` the source is, in order:
+
+* the file listed under ``files``;
+* a :class:`~gpt_trader.fetch.bar_store.BarStore` partition directory
+  ``<path>/<SYMBOL>/<TF>/``;
+* files named ``<SYMBOL>_<TF>.csv`` or ``<SYMBOL>_<TF>_*.csv`` (the name MT5
+  gives exported bars) or the same with ``.parquet``. Several matches are
+  merged, so monthly exports can sit side by side.
+
+CSV files may use the MT5 export layout (``<DATE> <TIME> <OPEN> ...
+<TICKVOL>``, tab separated) or plain columns with ``time`` in epoch seconds
+or a ``timestamp``/``datetime`` column. Times are broker server time, as in
+the bars MetaTrader5 returns. Every series is loaded once into a sorted bar
+array; ``time_fetch`` windows are then cut with a binary search.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from gpt_trader.fetch.bar_store import (
+    BAR_DTYPE,
+    BarIndex,
+    BarStore,
+    epoch_seconds,
+    to_bar_array,
+)
+from gpt_trader.utils.indicators import IndicatorEngine, compute_indicators
+from gpt_trader.utils.indicator_registry import (
+    output_columns,
+    parse_specs,
+    resolve_fetch_bars,
+)
+from gpt_trader.utils import atomic_write_csv, write_json_no_nulls
+from gpt_trader.utils.artifact_index import record_artifact, signal_symbol
+from gpt_trader.utils.metrics import span
+from gpt_trader.utils.sessions import MT5_SESSIONS, apply_sessions
+
+LOGGER = logging.getLogger(__name__)
+
+FORMATS = ("auto", "bar_store", "csv", "mt5", "parquet")
+
+# Timeframes are looked up by name, so the name is its own constant.
+TF_MAP: Dict[str, str] = {
+    "M1": "M1",
+    "M5": "M5",
+    "M15": "M15",
+    "M30": "M30",
+    "H1": "H1",
+    "H4": "H4",
+    "D1": "D1",
+}
+
+TF_DELTA: Dict[str, pd.Timedelta] = {
+    "M1": pd.Timedelta(minutes=1),
+    "M5": pd.Timedelta(minutes=5),
+    "M15": pd.Timedelta(minutes=15),
+    "M30": pd.Timedelta(minutes=30),
+    "H1": pd.Timedelta(hours=1),
+    "H4": pd.Timedelta(hours=4),
+    "D1": pd.Timedelta(days=1),
+}
+
+
+def _load_config(path: Path) -> Dict[str, Any]:
+    """Load JSON configuration from *path*."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception as exc:  # noqa: BLE001
+        raise RuntimeError(f"Failed to read config: {exc}") from exc
+
+
+def _tf_label(tf: str) -> str:
+    """Return a human readable label like '5m' for timeframe name."""
+    digits = "".join(ch for ch in tf if ch.isdigit())
+    letters = "".join(ch for ch in tf if ch.isalpha()).lower()
+    return f"{digits}{letters}"
+
+
+def _timestamp_code(ts: pd.Timestamp) -> str:
+    """Return the UNIX timestamp for *ts* as a string."""
+    return str(int(pd.Timestamp(ts).timestamp()))
+
+
+def bars_from_frame(df: pd.DataFrame) -> np.ndarray:
+    """Return a bar array from a table of exported or saved bars.
+
+    Column names are matched case-insensitively with MT5's ``<...>``
+    brackets removed, so MT5 exports and plain CSV/Parquet tables both work.
+    """
+    df = df.rename(columns={c: str(c).strip().strip("<>").lower() for c in df.columns})
+    if "date" in df.columns:
+        stamp = df["date"].astype(str).str.replace(".", "-", regex=False)
+        if "time" in df.columns:
+            stamp = stamp + " " + df["time"].astype(str)
+        times = epoch_seconds(stamp)
+    elif "time" in df.columns and pd.api.types.is_numeric_dtype(df["time"]):
+        times = df["time"].to_numpy(dtype="int64")
+    else:
+        column = next((c for c in ("time", "timestamp", "datetime") if c in df.columns), None)
+        if column is None:
+            raise ValueError("History table needs a time, timestamp, datetime or date column")
+        times = epoch_seconds(df[column])
+    df = df.rename(columns={"tickvol": "tick_volume", "vol": "real_volume"})
+    if "tick_volume" not in df.columns and "volume" in df.columns:
+        df = df.rename(columns={"volume": "tick_volume"})
+    table = {name: df[name].to_numpy() for name in BAR_DTYPE.names if name in df.columns}
+    table["time"] = times
+    return to_bar_array(table)
+
+
+def read_history_file(path: Path | str, fmt: str = "auto") -> np.ndarray:
+    """Return the bars stored in one CSV, MT5 export or Parquet *path*."""
+    path = Path(path)
+    if fmt == "auto":
+        fmt = "parquet" if path.suffix.lower() == ".parquet" else "csv"
+    if fmt == "parquet":
+        return bars_from_frame(pd.read_parquet(path))
+    with path.open(encoding="utf-8-sig") as f:
+        header = f.readline()
+    sep = "\t" if "\t" in header else ","
+    return bars_from_frame(pd.read_csv(path, sep=sep))
+
+
+def _merge(chunks: list[np.ndarray]) -> np.ndarray:
+    """Concatenate bar arrays, keeping the first bar of each time."""
+    if not chunks:
+        return np.empty(0, dtype=BAR_DTYPE)
+    bars = np.sort(np.concatenate(chunks), order="time", kind="stable")
+    if len(bars) > 1:
+        bars = bars[np.concatenate(([True], np.diff(bars["time"]) != 0))]
+    return bars
+
+
+class ReplaySource:
+    """Local bar history with the interface of a fetch module.
+
+    An instance can be passed as ``fetch_module`` to
+    :class:`~gpt_trader.backtest.engine.BacktestEngine` and is callable with
+    the ``rates_source`` signature of :func:`fetch_multi_tf`.
+
+    Parameters
+    ----------
+    path:
+        Directory holding the history files or a bar store.
+    fmt:
+        One of :data:`FORMATS`. ``"auto"`` tries the bar store first and
+        tells CSV, MT5 exports and Parquet apart by suffix and header.
+    files:
+        Explicit file per timeframe name, relative to *path* or absolute.
+    """
+
+    TF_MAP = TF_MAP
+    TF_DELTA = TF_DELTA
+
+    def __init__(
+        self,
+        path: Path | str = "data/history",
+        fmt: str = "auto",
+        files: Optional[Dict[str, str]] = None,
+    ) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown replay format {fmt!r}; expected one of {FORMATS}")
+        self.path = Path(path)
+        self.fmt = fmt
+        self.files = {str(k).upper(): v for k, v in (files or {}).items()}
+        self.index = BarIndex()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ReplaySource":
+        """Create a source from the ``replay`` section of a fetch *config*."""
+        replay = config.get("replay") or {}
+        path = replay.get("path") or config.get("bar_store") or "data/history"
+        return cls(path, replay.get("format", "auto"), replay.get("files"))
+
+    def _load(self, symbol: str, tf_name: str) -> np.ndarray:
+        fmt = "auto" if self.fmt == "bar_store" else self.fmt
+        if tf_name in self.files:
+            path = Path(self.files[tf_name])
+            return read_history_file(path if path.is_absolute() else self.path / path, fmt)
+        if self.fmt in ("auto", "bar_store"):
+            store = BarStore(self.path)
+            if store.last_time(symbol, tf_name) is not None:
+                return np.asarray(store.read(symbol, tf_name))
+            if self.fmt == "bar_store":
+                return np.empty(0, dtype=BAR_DTYPE)
+        suffixes = (".parquet",) if fmt == "parquet" else (".csv", ".txt", ".parquet")
+        found = [
+            p
+            for pattern in (f"{symbol}_{tf_name}.*", f"{symbol}_{tf_name}_*.*")
+            for p in sorted(self.path.glob(pattern))
+            if p.suffix.lower() in suffixes
+        ]
+        return _merge([read_history_file(p, fmt) for p in found])
+
+    def bars(self, symbol: str, tf_name: str) -> np.ndarray:
+        """Return the whole sorted history of ``(symbol, tf_name)``."""
+        key = (symbol, tf_name.upper())
+        if key not in self.index:
+            bars = self._load(*key)
+            if not len(bars):
+                raise FileNotFoundError(f"No replay history for {symbol} {key[1]} in {self.path}")
+            LOGGER.info("Loaded %s %s replay bars for %s", len(bars), key[1], symbol)
+            self.index.add(*key, bars)
+        return self.index.bars(*key)
+
+    def window(
+        self,
+        symbol: str,
+        tf_name: str,
+        bars: int,
+        end_time: Optional[pd.Timestamp] = None,
+    ) -> np.ndarray:
+        """Return the last *bars* bars opened at or before *end_time*."""
+        self.bars(symbol, tf_name)
+        return self.index.ending_at(symbol, tf_name.upper(), bars, end_time)
+
+    __call__ = window
+
+    def fetch_range(
+        self,
+        symbol: str,
+        timeframe: str,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        store: Optional[BarStore] = None,
+        tf_name: Optional[str] = None,
+    ) -> np.ndarray:
+        """Return every bar between *start* and *end*; *store* is not needed."""
+        data = self.bars(symbol, tf_name or timeframe)
+        lo = np.searchsorted(data["time"], int(pd.Timestamp(start).timestamp()), "left")
+        hi = np.searchsorted(data["time"], int(pd.Timestamp(end).timestamp()), "right")
+        return data[lo:hi]
+
+    def fetch_multi_tf(
+        self,
+        symbol: str,
+        config: Dict[str, Any],
+        tz_shift: int = 0,
+        engine: Optional[IndicatorEngine] = None,
+        rates_source: Optional[Callable[..., Any]] = None,
+    ) -> pd.DataFrame:
+        """Run :func:`fetch_multi_tf` with this source unless another is given."""
+        return fetch_multi_tf(symbol, config, tz_shift, engine, rates_source or self)
+
+
+def _rates_to_frame(rates, tz_shift: int = 0) -> pd.DataFrame:
+    """Return bar *rates* as a DataFrame with a shifted ``timestamp``."""
+    df = pd.DataFrame(rates)
+    df["timestamp"] = pd.to_datetime(df["time"], unit="s") + pd.Timedelta(hours=tz_shift)
+    df = df.drop(columns=["time", "spread", "real_volume"], errors="ignore")
+    return df
+
+
+def fetch_multi_tf(
+    symbol: str,
+    config: Dict[str, Any],
+    tz_shift: int = 0,
+    engine: Optional[IndicatorEngine] = None,
+    rates_source: Optional[Callable[..., Any]] = None,
+) -> pd.DataFrame:
+    """Build the multi-timeframe frame ending at ``time_fetch`` from local history.
+
+    The output matches :func:`gpt_trader.fetch.fetch_mt5_data.fetch_multi_tf`.
+    Without ``time_fetch`` the newest stored bars are used. *rates_source*
+    defaults to a :class:`ReplaySource` built from *config*.
+    """
+    source = rates_source or ReplaySource.from_config(config)
+    timeframes_conf = config.get("timeframes", [])
+    indicators_conf = config.get("indicators")
+    fetch_bars_conf = config.get("fetch_bars", "auto")
+    specs = parse_specs(engine.indicators if engine is not None else indicators_conf)
+
+    time_fetch_str = str(config.get("time_fetch", "")).strip()
+    end_time = pd.to_datetime(time_fetch_str, errors="coerce") if time_fetch_str else None
+    if time_fetch_str and pd.isna(end_time):
+        raise ValueError("Timestamp format must be YYYY-MM-DD HH:MM:SS")
+
+    frames = []
+    for item in timeframes_conf:
+        tf_name = str(item.get("tf", "")).upper()
+        keep = int(item.get("keep", 0))
+        if tf_name not in TF_MAP:
+            raise ValueError(f"Unsupported timeframe: {tf_name}")
+        label = _tf_label(tf_name)
+        fetch_bars = resolve_fetch_bars(fetch_bars_conf, specs, keep)
+        with span("rates", symbol=symbol, tf=label):
+            df = _rates_to_frame(source(symbol, tf_name, fetch_bars, end_time), tz_shift)
+        with span("indicators", symbol=symbol, tf=label):
+            if engine is None:
+                df = compute_indicators(df, indicators_conf)
+            else:
+                df = engine.apply(symbol, label, df)
+        df = df.tail(keep)
+        df["timeframe"] = label
+        frames.append(df)
+
+    combined = pd.concat(frames, ignore_index=True)
+    if combined.empty:
+        raise ValueError(f"No replay bars for {symbol} at or before {time_fetch_str or 'now'}")
+
+    overlap_cols = apply_sessions(combined, config.get("sessions"), MT5_SESSIONS)
+
+    cols = [
+        "timestamp",
+        "open",
+        "high",
+        "low",
+        "close",
+        "tick_volume",
+    ]
+    for ind in output_columns(specs):
+        if ind in combined.columns:
+            cols.append(ind)
+    cols += ["timeframe", "session"] + overlap_cols
+    return combined[cols]
+
+
+def main() -> None:
+    pre_parser = argparse.ArgumentParser(add_help=False)
+    default_cfg = Path(__file__).resolve().parent / "config" / "fetch_replay.json"
+    pre_parser.add_argument(
+        "--config",
+        help="Path to JSON config",
+        default=str(default_cfg),
+    )
+
+    pre_args, remaining = pre_parser.parse_known_args()
+    config = _load_config(Path(pre_args.config))
+    default_tz = int(config.get("tz_shift", 0))
+    default_save_path = config.get("save_as_path", "data/fetch")
+
+    parser = argparse.ArgumentParser(
+        description="Serve OHLC data from local history", parents=[pre_parser]
+    )
+    parser.add_argument("--symbol", help="Symbol to fetch and override config")
+    parser.add_argument("--output", help="Output CSV file", default=None)
+    parser.add_argument(
+        "--tz-shift",
+        type=int,
+        default=default_tz,
+        help="Hours to shift timestamps",
+    )
+    parser.add_argument(
+        "--time-fetch",
+        default=str(config.get("time_fetch", "")),
+        help="Serve bars ending at this time (YYYY-MM-DD HH:MM:SS)",
+    )
+    parser.add_argument("--history", help="History directory overriding replay.path")
+
+    args = parser.parse_args(remaining)
+
+    symbol = args.symbol or config.get("symbol", "EURUSD")
+    signal_prefix = str(config.get("symbol_signal", symbol)).lower()
+    if args.time_fetch:
+        config["time_fetch"] = args.time_fetch
+    if args.history:
+        config["replay"] = dict(config.get("replay") or {}, path=args.history)
+    output = Path(args.output) if args.output else None
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    try:
+        df = fetch_multi_tf(symbol, config, tz_shift=args.tz_shift)
+        if df.empty:
+            LOGGER.error("No data available for the requested time_fetch")
+            raise SystemExit(1)
+        if output is None:
+            ts_now = pd.Timestamp.utcnow().floor("min")
+            name = _timestamp_code(ts_now)
+            output = Path(default_save_path) / f"{signal_prefix}{name}.csv"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        json_out = output.with_suffix(".json")
+        with span("serialize", symbol=symbol):
+            atomic_write_csv(df, output)
+            write_json_no_nulls(df, json_out)
+        record_artifact(json_out, signal_symbol(json_out.stem))
+        LOGGER.info("Saved data to %s and %s", output, json_out)
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.error("Error fetching data: %s", exc)
+        raise SystemExit(1)
+
+
+__all__ = [
+    "FORMATS",
+    "ReplaySource",
+    "TF_DELTA",
+    "TF_MAP",
+    "bars_from_frame",
+    "fetch_multi_tf",
+    "read_history_file",
+]
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main()
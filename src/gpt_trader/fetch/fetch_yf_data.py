@@ -1,29 +1,81 @@
-"""Fetch OHLCV data via yfinance and compute indicators."""
+"""Fetch OHLCV data via yfinance and compute indicators.
+
+Each timeframe is built from the finest configured interval whose history
+limit still covers the bars it needs, so one ``yf.download`` call per
+interval serves every requested symbol and the coarser timeframes are
+resampled from it locally. A timeframe that needs more history, such as
+``H1`` with ``sma200`` next to ``M1`` (Yahoo keeps 7 days of 1m bars), gets
+its own download at a coarser interval. ``D1`` is always downloaded natively.
+"""
 from __future__ import annotations
 
 import argparse
 import json
 import logging
+import math
+import re
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional
 
 import pandas as pd
 import yfinance as yf
-from gpt_trader.utils.indicators import compute_indicators
-from gpt_trader.utils import write_json_no_nulls
+from gpt_trader.utils.indicators import IndicatorEngine, compute_indicators
+from gpt_trader.utils.indicator_registry import (
+    output_columns,
+    parse_specs,
+    resolve_fetch_bars,
+)
+from gpt_trader.utils import atomic_write_csv, write_json_no_nulls
+from gpt_trader.utils.artifact_index import record_artifact, signal_symbol
+from gpt_trader.utils.metrics import span
+from gpt_trader.utils.sessions import YF_SESSIONS, apply_sessions
 
 LOGGER = logging.getLogger(__name__)
 
+# yfinance interval each timeframe is built from. Yahoo has no 4 hour
+# interval, so H4 is resampled from hourly bars.
 TF_MAP: Dict[str, str] = {
     "M1": "1m",
     "M5": "5m",
     "M15": "15m",
     "M30": "30m",
     "H1": "60m",
-    "H4": "240m",
+    "H4": "60m",
     "D1": "1d",
 }
 
+TF_RULES: Dict[str, str] = {
+    "M1": "1min",
+    "M5": "5min",
+    "M15": "15min",
+    "M30": "30min",
+    "H1": "1h",
+    "H4": "4h",
+    "D1": "1D",
+}
+
+INTERVAL_SPANS: Dict[str, pd.Timedelta] = {
+    "1m": pd.Timedelta(minutes=1),
+    "5m": pd.Timedelta(minutes=5),
+    "15m": pd.Timedelta(minutes=15),
+    "30m": pd.Timedelta(minutes=30),
+    "60m": pd.Timedelta(hours=1),
+    "1d": pd.Timedelta(days=1),
+}
+
+# Longest history Yahoo serves for each interval, in days.
+MAX_PERIOD_DAYS: Dict[str, Optional[int]] = {
+    "1m": 7,
+    "5m": 60,
+    "15m": 60,
+    "30m": 60,
+    "60m": 730,
+    "1d": None,
+}
+
+# Calendar days per day of bars, allowing for weekends and session breaks.
+_PERIOD_SLACK = 1.5
+
 
 def _load_config(path: Path) -> Dict[str, Any]:
     """Load JSON configuration from *path*."""
@@ -45,6 +97,11 @@ def _timestamp_code(ts: pd.Timestamp) -> str:
     return str(int(pd.Timestamp(ts).timestamp()))
 
 
+def _signal_prefix(symbol: str) -> str:
+    """Return a file prefix like 'gc_f' for the yfinance ticker *symbol*."""
+    return re.sub(r"[^a-z0-9]+", "_", symbol.lower()).strip("_")
+
+
 def get_session(ts: pd.Timestamp) -> str:
     """Return the trading session name for *ts*."""
     hour = pd.Timestamp(ts).hour
@@ -55,75 +112,213 @@ def get_session(ts: pd.Timestamp) -> str:
     return "newyork"
 
 
-def _fetch_rates(symbol: str, interval: str, bars: int, tz_shift: int = 0) -> pd.DataFrame:
-    """Fetch OHLC data from yfinance."""
-    LOGGER.info(
-        "Fetching %s bars for %s interval on %s",
-        bars,
-        interval,
-        symbol,
-    )
-    df = yf.download(symbol, interval=interval, period="60d", progress=False)
-    if df.empty:
-        raise RuntimeError(f"Failed to fetch data for {symbol} interval {interval}")
-    df = df.tail(bars)
-    idx = pd.to_datetime(df.index)
-    if idx.tzinfo is not None:
-        idx = idx.tz_convert(None)
-    df.index = idx + pd.Timedelta(hours=tz_shift)
-    df.index.name = "timestamp"
-    df = df.rename(
-        columns={
-            "Open": "open",
-            "High": "high",
-            "Low": "low",
-            "Close": "close",
-            "Volume": "tick_volume",
-        }
+def _period_days(span: pd.Timedelta) -> int:
+    """Return the calendar days of history that hold *span* worth of bars."""
+    return math.ceil(span / pd.Timedelta(days=1) * _PERIOD_SLACK) + 3
+
+
+def _download_period(interval: str, spans: Iterable[pd.Timedelta]) -> str:
+    """Return the ``period`` covering the longest of *spans* at *interval*."""
+    days = _period_days(max(spans, default=pd.Timedelta(0)))
+    limit = MAX_PERIOD_DAYS.get(interval)
+    if limit is not None:
+        days = min(days, limit)
+    return f"{days}d"
+
+
+def _split_download(raw: pd.DataFrame, symbols: List[str]) -> Dict[str, pd.DataFrame]:
+    """Return one OHLCV frame per symbol from a ``yf.download`` result."""
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return {symbols[0]: raw} if len(symbols) == 1 else {}
+    frames = {}
+    for symbol in symbols:
+        for level in range(raw.columns.nlevels):
+            if symbol in raw.columns.get_level_values(level):
+                # symbols trade different hours; drop the other symbols' rows
+                frames[symbol] = raw.xs(symbol, axis=1, level=level).dropna(how="all")
+                break
+    return frames
+
+
+def download_rates(
+    symbols: List[str], interval: str, period: str, tz_shift: int = 0
+) -> Dict[str, pd.DataFrame]:
+    """Download *interval* bars for all *symbols* with one ``yf.download`` call.
+
+    Returns frames indexed by ``timestamp`` (UTC shifted by *tz_shift* hours)
+    with ``open``, ``high``, ``low``, ``close`` and ``tick_volume`` columns.
+    """
+    LOGGER.info("Downloading %s of %s bars for %s", period, interval, ", ".join(symbols))
+    tickers = symbols[0] if len(symbols) == 1 else list(symbols)
+    raw = yf.download(tickers, interval=interval, period=period, progress=False)
+    if raw is None or raw.empty:
+        raise RuntimeError(f"Failed to fetch data for {', '.join(symbols)} interval {interval}")
+    frames = {}
+    for symbol, df in _split_download(raw, symbols).items():
+        idx = pd.to_datetime(df.index)
+        if idx.tzinfo is not None:
+            idx = idx.tz_convert(None)
+        df = df.rename(
+            columns={
+                "Open": "open",
+                "High": "high",
+                "Low": "low",
+                "Close": "close",
+                "Volume": "tick_volume",
+            }
+        )
+        df = df[["open", "high", "low", "close", "tick_volume"]]
+        df.index = idx + pd.Timedelta(hours=tz_shift)
+        df.index.name = "timestamp"
+        frames[symbol] = df
+    missing = [s for s in symbols if s not in frames or frames[s].empty]
+    if missing:
+        raise RuntimeError(f"Failed to fetch data for {', '.join(missing)} interval {interval}")
+    return frames
+
+
+def resample_ohlcv(df: pd.DataFrame, rule: str, offset: Optional[str] = None) -> pd.DataFrame:
+    """Aggregate *df* into bars of *rule*.
+
+    Buckets start at midnight of the shifted clock plus *offset*, so the
+    4 hour bars open on the 00/08/16 boundaries of the session table.
+    Buckets without trades (weekends, session breaks) are dropped. The last
+    bar may still be forming, as with the bars Yahoo returns.
+    """
+    bars = df.resample(rule, label="left", closed="left", origin="start_day", offset=offset).agg(
+        {"open": "first", "high": "max", "low": "min", "close": "last", "tick_volume": "sum"}
     )
-    df = df.reset_index()
-    df = df[["timestamp", "open", "high", "low", "close", "tick_volume"]]
-    return df
+    return bars.dropna(subset=["open"])
+
+
+def _source_interval(tf: str, bars: int, intervals: Iterable[str]) -> str:
+    """Return the interval *bars* bars of *tf* are built from.
+
+    That is the finest of *intervals* that divides *tf* and whose history
+    limit covers the bars; otherwise the native interval of *tf*.
+    """
+    native = TF_MAP[tf]
+    if native == "1d":
+        return native
+    tf_span = pd.Timedelta(TF_RULES[tf])
+    days = _period_days(tf_span * bars)
+    for interval in sorted(set(intervals), key=INTERVAL_SPANS.__getitem__):
+        span = INTERVAL_SPANS[interval]
+        if interval == "1d" or span > INTERVAL_SPANS[native] or tf_span % span:
+            continue
+        limit = MAX_PERIOD_DAYS.get(interval)
+        if limit is None or days <= limit:
+            return interval
+    return native
+
+
+def _download_plan(timeframes: Dict[str, int]) -> Dict[str, List[str]]:
+    """Group timeframe names by the yfinance interval they are built from.
 
+    *timeframes* maps each name to the bars it needs. Timeframes share the
+    finest configured interval that still holds their history (see
+    :func:`_source_interval`); ``D1`` keeps its own daily download.
+    """
+    configured = [TF_MAP[tf] for tf in timeframes]
+    plan: Dict[str, List[str]] = {}
+    for tf, bars in timeframes.items():
+        plan.setdefault(_source_interval(tf, bars, configured), []).append(tf)
+    return plan
 
 
+def fetch_symbols(
+    symbols: List[str],
+    config: Dict[str, Any],
+    tz_shift: int = 0,
+    engine: Optional[IndicatorEngine] = None,
+) -> Dict[str, pd.DataFrame]:
+    """Fetch every configured timeframe for *symbols* and merge them per symbol.
 
-def fetch_multi_tf(symbol: str, config: Dict[str, Any], tz_shift: int = 0) -> pd.DataFrame:
-    """Fetch data for several timeframes and merge into one DataFrame."""
+    The bars of each interval in :func:`_download_plan` are downloaded once
+    for all symbols; ``resample_offset`` (e.g. ``"30min"``) shifts the
+    resampling buckets. When *engine* is given, indicators are advanced
+    incrementally from the state kept for each ``(symbol, timeframe)``
+    instead of being recomputed over the whole frame.
+    """
     timeframes_conf: List[Dict[str, Any]] = config.get("timeframes", [])
     indicators_conf = config.get("indicators")
-    fetch_bars = int(config.get("fetch_bars", 20))
+    fetch_bars_conf = config.get("fetch_bars", "auto")
+    offset = config.get("resample_offset")
+    specs = parse_specs(engine.indicators if engine is not None else indicators_conf)
 
-    frames: List[pd.DataFrame] = []
+    needed: Dict[str, int] = {}
     for item in timeframes_conf:
         tf_name = str(item.get("tf", "")).upper()
-        keep = int(item.get("keep", 0))
-        interval = TF_MAP.get(tf_name)
-        if interval is None:
+        if tf_name not in TF_MAP:
             raise ValueError(f"Unsupported timeframe: {tf_name}")
-        label = _tf_label(tf_name)
-        df = _fetch_rates(symbol, interval, fetch_bars, tz_shift)
-        df = compute_indicators(df, indicators_conf)
-        df = df.tail(keep)
-        df["timeframe"] = label
-        frames.append(df)
-
-    combined = pd.concat(frames, ignore_index=True)
-    combined["session"] = combined["timestamp"].apply(get_session)
-
-    cols = [
-        "timestamp",
-        "open",
-        "high",
-        "low",
-        "close",
-        "tick_volume",
-    ]
-    for ind in ["atr14", "rsi14", "sma20", "ema50", "sma200"]:
-        if ind in combined.columns:
-            cols.append(ind)
-    cols += ["timeframe", "session"]
-    return combined[cols]
+        needed[tf_name] = resolve_fetch_bars(fetch_bars_conf, specs, int(item.get("keep", 0)))
+
+    plan = _download_plan(needed)
+    source = {tf: interval for interval, tf_names in plan.items() for tf in tf_names}
+    base: Dict[str, Dict[str, pd.DataFrame]] = {}
+    for interval, tf_names in plan.items():
+        period = config.get("yf_period") or _download_period(
+            interval, (pd.Timedelta(TF_RULES[tf]) * needed[tf] for tf in tf_names)
+        )
+        with span("rates", symbol=",".join(symbols), tf=interval):
+            base[interval] = download_rates(symbols, interval, period, tz_shift)
+
+    results: Dict[str, pd.DataFrame] = {}
+    for symbol in symbols:
+        frames: List[pd.DataFrame] = []
+        for item in timeframes_conf:
+            tf_name = str(item.get("tf", "")).upper()
+            keep = int(item.get("keep", 0))
+            label = _tf_label(tf_name)
+            interval = source[tf_name]
+            df = base[interval][symbol]
+            if pd.Timedelta(TF_RULES[tf_name]) != INTERVAL_SPANS[interval]:
+                df = resample_ohlcv(df, TF_RULES[tf_name], offset)
+            if len(df) < needed[tf_name]:
+                LOGGER.warning(
+                    "Only %s of %s %s bars available for %s",
+                    len(df),
+                    needed[tf_name],
+                    tf_name,
+                    symbol,
+                )
+            df = df.tail(needed[tf_name]).reset_index()
+            with span("indicators", symbol=symbol, tf=label):
+                if engine is None:
+                    df = compute_indicators(df, indicators_conf)
+                else:
+                    df = engine.apply(symbol, label, df)
+            df = df.tail(keep)
+            df["timeframe"] = label
+            frames.append(df)
+
+        combined = pd.concat(frames, ignore_index=True)
+        overlap_cols = apply_sessions(combined, config.get("sessions"), YF_SESSIONS)
+
+        cols = [
+            "timestamp",
+            "open",
+            "high",
+            "low",
+            "close",
+            "tick_volume",
+        ]
+        for ind in output_columns(specs):
+            if ind in combined.columns:
+                cols.append(ind)
+        cols += ["timeframe", "session"] + overlap_cols
+        results[symbol] = combined[cols]
+    return results
+
+
+def fetch_multi_tf(
+    symbol: str,
+    config: Dict[str, Any],
+    tz_shift: int = 0,
+    engine: Optional[IndicatorEngine] = None,
+) -> pd.DataFrame:
+    """Fetch data for several timeframes of *symbol* and merge into one DataFrame."""
+    return fetch_symbols([symbol], config, tz_shift, engine)[symbol]
 
 
 def main() -> None:
@@ -142,6 +337,10 @@ def main() -> None:
 
     parser = argparse.ArgumentParser(description="Fetch yfinance OHLC data", parents=[pre_parser])
     parser.add_argument("--symbol", help="Symbol to fetch and override config")
+    parser.add_argument(
+        "--symbols",
+        help="Comma separated symbols downloaded together, one output file each",
+    )
     parser.add_argument("--output", help="Output CSV file", default=None)
     parser.add_argument(
         "--tz-shift",
@@ -152,26 +351,36 @@ def main() -> None:
 
     args = parser.parse_args(remaining)
 
-    symbol = args.symbol or config.get("symbol", "EURUSD=X")
-    signal_prefix = str(config.get("symbol_signal", symbol)).lower()
+    if args.symbols:
+        symbols = [item.strip() for item in args.symbols.split(",") if item.strip()]
+    else:
+        symbols = [args.symbol or config.get("symbol", "EURUSD=X")]
     output = Path(args.output) if args.output else None
+    if output is not None and len(symbols) > 1:
+        parser.error("--output cannot be used with several --symbols")
 
     logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
     try:
-        df = fetch_multi_tf(symbol, config, tz_shift=args.tz_shift)
-        if df.empty:
+        if len(symbols) == 1:
+            frames = {symbols[0]: fetch_multi_tf(symbols[0], config, tz_shift=args.tz_shift)}
+            prefixes = {symbols[0]: str(config.get("symbol_signal", symbols[0])).lower()}
+        else:
+            frames = fetch_symbols(symbols, config, tz_shift=args.tz_shift)
+            prefixes = {symbol: _signal_prefix(symbol) for symbol in symbols}
+        if any(df.empty for df in frames.values()):
             LOGGER.error("No data available for the requested time_fetch")
             raise SystemExit(1)
-        if output is None:
-            ts_now = pd.Timestamp.utcnow().floor("min")
-            name = _timestamp_code(ts_now)
-            output = Path(default_save_path) / f"{signal_prefix}{name}.csv"
-        output.parent.mkdir(parents=True, exist_ok=True)
-        df.to_csv(output, index=False)
-        json_out = output.with_suffix(".json")
-        write_json_no_nulls(df, json_out)
-        LOGGER.info("Saved data to %s and %s", output, json_out)
+        name = _timestamp_code(pd.Timestamp.utcnow().floor("min"))
+        for symbol, df in frames.items():
+            out = output or Path(default_save_path) / f"{prefixes[symbol]}{name}.csv"
+            out.parent.mkdir(parents=True, exist_ok=True)
+            json_out = out.with_suffix(".json")
+            with span("serialize", symbol=symbol):
+                atomic_write_csv(df, out)
+                write_json_no_nulls(df, json_out)
+            record_artifact(json_out, signal_symbol(json_out.stem))
+            LOGGER.info("Saved data to %s and %s", out, json_out)
     except Exception as exc:  # noqa: BLE001
         LOGGER.error("Error fetching data: %s", exc)
         raise SystemExit(1)
@@ -0,0 +1,360 @@
+"""Build live candles from MT5 ticks.
+
+:class:`CandleAggregator` turns a stream of ticks into M1/M5/M15/H1 (or any
+:data:`TF_SECONDS`) candles in memory and reports every candle as soon as it
+closes, either because a tick of the next candle arrived or because
+:meth:`~CandleAggregator.close_due` was called past its end. It has no MT5
+dependency, so recorded tick files can be replayed through it with
+:func:`replay_ticks`.
+
+:class:`TickPoller` feeds an aggregator from ``copy_ticks_from`` and can
+record the ticks it sees to a CSV file in the format read back by
+:func:`read_tick_csv`.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from gpt_trader.fetch.bar_store import BAR_DTYPE
+from gpt_trader.utils.mt5_session import get_mt5_session
+
+LOGGER = logging.getLogger(__name__)
+
+TF_SECONDS: dict[str, int] = {
+    "M1": 60,
+    "M5": 300,
+    "M15": 900,
+    "M30": 1800,
+    "H1": 3600,
+    "H4": 14400,
+    "D1": 86400,
+}
+
+TICK_COLUMNS = ("time_msc", "bid", "ask", "last", "volume")
+
+BarCallback = Callable[[str, dict], None]
+
+
+class CandleAggregator:
+    """Aggregate ticks into candles for several timeframes.
+
+    Parameters
+    ----------
+    timeframes:
+        Timeframe names from :data:`TF_SECONDS`.
+    on_bar_closed:
+        Called as ``on_bar_closed(timeframe, bar)`` for every closed candle,
+        in closing order. ``bar`` uses the MT5 rate fields (``time`` is the
+        candle start in epoch seconds).
+    max_bars:
+        Closed candles kept per timeframe for :meth:`bars`.
+    """
+
+    def __init__(
+        self,
+        timeframes: Iterable[str] = ("M1", "M5", "M15", "H1"),
+        on_bar_closed: Optional[BarCallback] = None,
+        max_bars: int = 500,
+    ) -> None:
+        self.seconds: dict[str, int] = {}
+        for tf in timeframes:
+            name = str(tf).upper()
+            if name not in TF_SECONDS:
+                raise ValueError(f"Unsupported timeframe: {tf}")
+            self.seconds[name] = TF_SECONDS[name]
+        self.on_bar_closed = on_bar_closed
+        self.last_time_msc: Optional[int] = None
+        self._open: dict[str, Optional[list]] = {tf: None for tf in self.seconds}
+        self._closed_start: dict[str, int] = {}
+        self._closed: dict[str, deque] = {tf: deque(maxlen=max_bars) for tf in self.seconds}
+
+    def current(self, timeframe: str) -> Optional[dict]:
+        """Return the candle still being built for *timeframe*."""
+        row = self._open[timeframe]
+        return _bar_dict(row) if row is not None else None
+
+    def bars(self, timeframe: str) -> np.ndarray:
+        """Return the closed candles of *timeframe* as a bar array."""
+        return np.array(list(self._closed[timeframe]), dtype=BAR_DTYPE)
+
+    def add_ticks(
+        self,
+        time_msc: Iterable[int],
+        price: Iterable[float],
+        volume: Optional[Iterable[float]] = None,
+    ) -> list[tuple[str, dict]]:
+        """Add a batch of ticks and return the candles they closed.
+
+        Ticks must be in time order; ticks older than the last one seen and
+        ticks without a price (``0``) are ignored.
+        """
+        t = np.asarray(time_msc, dtype=np.int64)
+        p = np.asarray(price, dtype=np.float64)
+        v = np.zeros(len(t)) if volume is None else np.asarray(volume, dtype=np.float64)
+        keep = p > 0
+        if self.last_time_msc is not None:
+            keep &= t >= self.last_time_msc
+        t, p, v = t[keep], p[keep], v[keep]
+        if not len(t):
+            return []
+        self.last_time_msc = int(t[-1])
+
+        closed: list[tuple[int, int, str, tuple]] = []
+        seconds = t // 1000
+        for tf, secs in self.seconds.items():
+            bucket = seconds // secs * secs
+            starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+            ends = np.r_[starts[1:], len(t)]
+            highs = np.maximum.reduceat(p, starts)
+            lows = np.minimum.reduceat(p, starts)
+            vols = np.add.reduceat(v, starts)
+            row = self._open[tf]
+            for i, start in enumerate(starts):
+                seg = [
+                    int(bucket[start]),
+                    float(p[start]),
+                    float(highs[i]),
+                    float(lows[i]),
+                    float(p[ends[i] - 1]),
+                    int(ends[i] - start),
+                    float(vols[i]),
+                ]
+                if seg[0] <= self._closed_start.get(tf, -1):
+                    continue  # late tick for a candle closed by close_due()
+                if row is not None and row[0] == seg[0]:
+                    row[2] = max(row[2], seg[2])
+                    row[3] = min(row[3], seg[3])
+                    row[4] = seg[4]
+                    row[5] += seg[5]
+                    row[6] += seg[6]
+                    continue
+                if row is not None:
+                    closed.append(self._close(tf, row))
+                row = seg
+            self._open[tf] = row
+        return self._emit(closed)
+
+    def close_due(self, now_s: float) -> list[tuple[str, dict]]:
+        """Close every open candle whose period ended before *now_s*.
+
+        Lets quiet markets close a candle without waiting for the next tick.
+        *now_s* is in the same clock as the tick times.
+        """
+        closed = []
+        for tf, secs in self.seconds.items():
+            row = self._open[tf]
+            if row is not None and now_s >= row[0] + secs:
+                closed.append(self._close(tf, row))
+                self._open[tf] = None
+        return self._emit(closed)
+
+    def _close(self, tf: str, row: list) -> tuple[int, int, str, tuple]:
+        record = (row[0], row[1], row[2], row[3], row[4], row[5], 0, int(row[6]))
+        self._closed_start[tf] = row[0]
+        self._closed[tf].append(record)
+        return (row[0] + self.seconds[tf], self.seconds[tf], tf, record)
+
+    def _emit(self, closed: list) -> list[tuple[str, dict]]:
+        events = [(tf, _bar_dict(record)) for _, _, tf, record in sorted(closed)]
+        if self.on_bar_closed is not None:
+            for tf, bar in events:
+                self.on_bar_closed(tf, bar)
+        return events
+
+
+def _bar_dict(row) -> dict:
+    return {
+        "time": int(row[0]),
+        "open": float(row[1]),
+        "high": float(row[2]),
+        "low": float(row[3]),
+        "close": float(row[4]),
+        "tick_volume": int(row[5]),
+        "spread": 0,
+        "real_volume": int(row[7] if len(row) > 7 else row[6]),
+    }
+
+
+def read_tick_csv(path: Path | str) -> pd.DataFrame:
+    """Load recorded ticks with at least ``time_msc`` (or ``time``) and ``bid``."""
+    df = pd.read_csv(path)
+    if "time_msc" not in df.columns:
+        if "time" not in df.columns:
+            raise ValueError(f"Tick file needs a time_msc or time column: {path}")
+        df["time_msc"] = df["time"].astype("int64") * 1000
+    for column in TICK_COLUMNS:
+        if column not in df.columns:
+            df[column] = 0.0
+    return df.sort_values("time_msc", kind="stable").reset_index(drop=True)
+
+
+def write_tick_csv(path: Path | str, ticks: Any) -> None:
+    """Append *ticks* (MT5 tick array or DataFrame) to the CSV at *path*."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    new = not path.exists()
+    with path.open("a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(TICK_COLUMNS)
+        columns = [np.asarray(ticks[name]) for name in TICK_COLUMNS]
+        writer.writerows(zip(*(c.tolist() for c in columns)))
+
+
+def replay_ticks(
+    path: Path | str,
+    aggregator: CandleAggregator,
+    price: str = "bid",
+    chunk: int = 100_000,
+) -> list[tuple[str, dict]]:
+    """Feed the ticks recorded at *path* through *aggregator*.
+
+    Returns every candle closed by the replay. The last, still open candle
+    of each timeframe is not closed.
+    """
+    df = read_tick_csv(path)
+    events: list[tuple[str, dict]] = []
+    for start in range(0, len(df), chunk):
+        part = df.iloc[start : start + chunk]
+        events += aggregator.add_ticks(part["time_msc"], part[price], part["volume"])
+    return events
+
+
+class TickPoller:
+    """Poll ``copy_ticks_from`` for *symbol* and feed an aggregator.
+
+    Parameters
+    ----------
+    mt5:
+        The ``MetaTrader5`` module.
+    lookback:
+        Seconds of ticks requested on the first poll.
+    record_path:
+        Optional CSV receiving every new tick for later replay.
+    """
+
+    def __init__(
+        self,
+        mt5: Any,
+        symbol: str,
+        aggregator: CandleAggregator,
+        price: str = "bid",
+        lookback: int = 60,
+        record_path: Optional[Path | str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.mt5 = mt5
+        self.symbol = symbol
+        self.aggregator = aggregator
+        self.price = price
+        self.lookback = lookback
+        self.record_path = Path(record_path) if record_path else None
+        self._clock = clock
+        self._last_msc: Optional[int] = None
+        self._seen_at_last = 0
+        self._anchor: Optional[tuple[float, float]] = None
+
+    def server_now(self) -> Optional[float]:
+        """Estimate the broker clock from the last tick and the local clock."""
+        if self._anchor is None:
+            return None
+        tick_s, local = self._anchor
+        return tick_s + (self._clock() - local)
+
+    def _since(self) -> datetime:
+        if self._last_msc is not None:
+            seconds = self._last_msc // 1000
+        else:
+            info = self.mt5.symbol_info_tick(self.symbol)
+            if info is None:
+                raise RuntimeError(f"No tick data for {self.symbol}")
+            seconds = int(info.time) - self.lookback
+        return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+    def _new_ticks(self, ticks: np.ndarray) -> np.ndarray:
+        if self._last_msc is None:
+            return ticks
+        msc = ticks["time_msc"]
+        at_last = np.flatnonzero(msc == self._last_msc)
+        fresh = msc > self._last_msc
+        fresh[at_last[self._seen_at_last :]] = True
+        return ticks[fresh]
+
+    def poll(self, count: int = 100_000) -> list[tuple[str, dict]]:
+        """Fetch new ticks once and return the candles that closed."""
+        session = get_mt5_session(self.mt5)
+        with session.lock:
+            since = self._since()
+            ticks = self.mt5.copy_ticks_from(
+                self.symbol, since, count, self.mt5.COPY_TICKS_ALL
+            )
+        events: list[tuple[str, dict]] = []
+        if ticks is not None and len(ticks):
+            new = self._new_ticks(ticks)
+            if len(new):
+                events += self.aggregator.add_ticks(
+                    new["time_msc"], new[self.price], new["volume"]
+                )
+                if self.record_path is not None:
+                    write_tick_csv(self.record_path, new)
+                last = int(ticks["time_msc"][-1])
+                self._last_msc = last
+                self._seen_at_last = int((ticks["time_msc"] == last).sum())
+                self._anchor = (last / 1000, self._clock())
+        now = self.server_now()
+        if now is not None:
+            events += self.aggregator.close_due(now)
+        return events
+
+    def run(
+        self,
+        interval: float = 0.25,
+        should_stop: Callable[[], bool] = lambda: False,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Poll every *interval* seconds until *should_stop* returns ``True``."""
+        while not should_stop():
+            try:
+                self.poll()
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.error("Tick poll failed: %s", exc)
+            sleep(interval)
+
+
+__all__ = [
+    "CandleAggregator",
+    "TF_SECONDS",
+    "TickPoller",
+    "read_tick_csv",
+    "replay_ticks",
+    "write_tick_csv",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded ticks into candles")
+    parser.add_argument("ticks", help="CSV file with time_msc,bid,ask,last,volume")
+    parser.add_argument("--timeframes", default="M1,M5,M15,H1", help="Comma separated")
+    parser.add_argument("--price", default="bid", help="Tick column used as price")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    aggregator = CandleAggregator(args.timeframes.split(","))
+    events = replay_ticks(args.ticks, aggregator, price=args.price)
+    for tf, bar in events:
+        LOGGER.info("%s bar closed at %s: %s", tf, pd.Timestamp(bar["time"], unit="s"), bar)
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main()
+
@@ -17,6 +17,8 @@ import re
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+from gpt_trader.utils.artifact_index import record_artifact, signal_symbol
+from gpt_trader.utils.atomic_io import atomic_write_json, atomic_write_text
 
 LOGGER = logging.getLogger(__name__)
 
@@ -56,6 +58,40 @@ def _timestamp_code(ts: datetime) -> str:
     return ts.strftime("%d%m%y_%H%M%S")
 
 
+SIGNAL_FIELDS = [
+    "timestamp",
+    "signal_id",
+    "entry",
+    "sl",
+    "tp",
+    "pending_order_type",
+    "confidence",
+]
+
+
+def make_signal_row(data: dict, ts: datetime) -> dict:
+    """Return the CSV log row for parsed signal *data* recorded at *ts*."""
+    row = {"timestamp": ts.isoformat()}
+    row.update({field: data.get(field) for field in SIGNAL_FIELDS[1:]})
+    return row
+
+
+def append_signal_row(csv_path: Path, row: dict) -> None:
+    """Append *row* to *csv_path*, writing the header for a new file."""
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    is_new = not csv_path.exists()
+    with csv_path.open("a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SIGNAL_FIELDS)
+        if is_new:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def save_signal(data: dict, output: Path) -> None:
+    """Write parsed signal *data* to *output* as indented JSON."""
+    atomic_write_json(output, data, indent=2)
+
+
 def main() -> None:
     pre_parser = argparse.ArgumentParser(add_help=False)
     default_cfg = Path(__file__).resolve().parent / "config" / "parse.json"
@@ -119,7 +155,7 @@ def main() -> None:
     latest_path = Path(args.latest_response)
     latest_path.parent.mkdir(parents=True, exist_ok=True)
     try:
-        latest_path.write_text(text, encoding="utf-8")
+        atomic_write_text(latest_path, text)
     except Exception as exc:  # noqa: BLE001
         LOGGER.warning("Failed to update %s: %s", latest_path, exc)
 
@@ -132,35 +168,9 @@ def main() -> None:
         raise SystemExit(1)
 
     csv_path = Path(args.csv_log)
-    csv_path.parent.mkdir(parents=True, exist_ok=True)
     ts = datetime.now(timezone.utc) + timedelta(hours=args.tz_shift)
-    row = {
-        "timestamp": ts.isoformat(),
-        "signal_id": data.get("signal_id"),
-        "entry": data.get("entry"),
-        "sl": data.get("sl"),
-        "tp": data.get("tp"),
-        "pending_order_type": data.get("pending_order_type"),
-        "confidence": data.get("confidence"),
-    }
-    is_new = not csv_path.exists()
     try:
-        with csv_path.open("a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(
-                f,
-                fieldnames=[
-                    "timestamp",
-                    "signal_id",
-                    "entry",
-                    "sl",
-                    "tp",
-                    "pending_order_type",
-                    "confidence",
-                ],
-            )
-            if is_new:
-                writer.writeheader()
-            writer.writerow(row)
+        append_signal_row(csv_path, make_signal_row(data, ts))
     except Exception as exc:  # noqa: BLE001
         LOGGER.error("Failed to write CSV log: %s", exc)
 
@@ -170,21 +180,18 @@ def main() -> None:
         name = _timestamp_code(ts)
         output = Path(args.json_dir) / f"{name}.json"
 
-    output.parent.mkdir(parents=True, exist_ok=True)
     try:
-        with output.open("w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        save_signal(data, output)
     except Exception as exc:  # noqa: BLE001
         LOGGER.error("Failed to write output file: %s", exc)
         raise SystemExit(1)
 
+    record_artifact(output, signal_symbol(data.get("signal_id")))
     LOGGER.info("Saved signal to %s", output)
 
     latest_json = Path(args.latest_response).with_suffix(".json")
-    latest_json.parent.mkdir(parents=True, exist_ok=True)
     try:
-        with latest_json.open("w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        save_signal(data, latest_json)
     except Exception as exc:  # noqa: BLE001
         LOGGER.warning("Failed to update %s: %s", latest_json, exc)
 
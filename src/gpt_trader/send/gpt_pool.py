@@ -0,0 +1,265 @@
+"""Concurrent GPT requests with rate-limit aware scheduling.
+
+:class:`GptPool` sends many independent chat requests through a fixed
+number of asyncio workers. Every request first takes one slot from the
+requests-per-minute budget and its estimated tokens from the
+tokens-per-minute budget; the token budget is corrected with the real
+``usage`` once the response arrives. 429 and 5xx responses as well as
+connection errors are retried with jittered exponential backoff.
+
+Results are handed to a callback strictly in submission order through
+:class:`OrderedWriter`, so a CSV written from the callback has the same
+row order as a sequential run.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover - only for type hints
+    from openai import AsyncOpenAI
+
+LOGGER = logging.getLogger(__name__)
+
+Messages = list[dict[str, str]]
+
+
+def estimate_tokens(messages: Messages) -> int:
+    """Return a rough token count for *messages* (about 4 characters each)."""
+    chars = sum(len(m.get("content", "")) for m in messages)
+    return chars // 4 + 4 * len(messages) + 1
+
+
+class RateBudget:
+    """Token bucket refilled continuously to *per_minute* units a minute.
+
+    ``None`` disables the budget. Debts from :meth:`adjust` are paid back
+    before new requests go through.
+    """
+
+    def __init__(
+        self,
+        per_minute: Optional[float],
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Any] = asyncio.sleep,
+    ) -> None:
+        self.capacity = float(per_minute) if per_minute else None
+        self.available = self.capacity or 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._stamp = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        if self.capacity is not None:
+            rate = self.capacity / 60.0
+            self.available = min(self.capacity, self.available + (now - self._stamp) * rate)
+        self._stamp = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until *amount* units are available and take them."""
+        if self.capacity is None:
+            return
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) * 60.0 / self.capacity
+                await self._sleep(wait)
+
+    def adjust(self, amount: float) -> None:
+        """Take *amount* extra units (negative to give some back)."""
+        if self.capacity is None:
+            return
+        self._refill()
+        self.available = min(self.capacity, self.available - amount)
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Return ``True`` for 429, 5xx, timeouts and connection errors."""
+    status = _status_code(exc)
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError") or isinstance(
+        exc, (ConnectionError, asyncio.TimeoutError)
+    )
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 1.0,
+    cap: float = 60.0,
+    rng: Optional[random.Random] = None,
+) -> float:
+    """Return a "full jitter" delay for retry number *attempt* (from 0)."""
+    rng = rng or random
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class OrderedWriter:
+    """Release results to *callback* in index order.
+
+    Results pushed out of order are buffered until every earlier index has
+    arrived.
+    """
+
+    def __init__(self, callback: Callable[[int, Any], None], start: int = 0) -> None:
+        self._callback = callback
+        self._next = start
+        self._pending: dict[int, Any] = {}
+
+    @property
+    def pending(self) -> int:
+        """Number of results waiting for an earlier index."""
+        return len(self._pending)
+
+    def push(self, index: int, result: Any) -> None:
+        self._pending[index] = result
+        while self._next in self._pending:
+            self._callback(self._next, self._pending.pop(self._next))
+            self._next += 1
+
+
+class GptPool:
+    """Send chat requests concurrently within rate limits.
+
+    Parameters
+    ----------
+    client:
+        ``AsyncOpenAI`` compatible client. Its own retries should be
+        disabled (``max_retries=0``) so the pool owns the backoff.
+    model:
+        Model name for every request.
+    concurrency:
+        Number of requests in flight at once.
+    rpm, tpm:
+        Requests and tokens per minute; ``None`` means unlimited.
+    max_retries:
+        Retries per request after the first attempt.
+    base_delay, max_delay:
+        Backoff parameters in seconds.
+    """
+
+    def __init__(
+        self,
+        client: "AsyncOpenAI",
+        model: str,
+        concurrency: int = 8,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.client = client
+        self.model = model
+        self.concurrency = int(concurrency)
+        self.max_retries = int(max_retries)
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self._rpm_limit = rpm
+        self._tpm_limit = tpm
+        self._rng = rng or random.Random()
+        self.retries = 0
+
+    async def complete(self, messages: Messages, rpm: RateBudget, tpm: RateBudget) -> str:
+        """Send *messages* once budgets allow, retrying transient errors."""
+        estimate = estimate_tokens(messages)
+        attempt = 0
+        while True:
+            await rpm.acquire(1)
+            await tpm.acquire(estimate)
+            try:
+                resp = await self.client.chat.completions.create(
+                    model=self.model, messages=messages
+                )
+            except Exception as exc:  # noqa: BLE001
+                if attempt >= self.max_retries or not is_retryable(exc):
+                    raise
+                delay = _retry_after(exc)
+                if delay is None:
+                    delay = backoff_delay(attempt, self.base_delay, self.max_delay, self._rng)
+                LOGGER.warning(
+                    "GPT request failed (%s); retry %s in %.2fs", exc, attempt + 1, delay
+                )
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            usage = getattr(getattr(resp, "usage", None), "total_tokens", None)
+            if isinstance(usage, int):
+                tpm.adjust(usage - estimate)
+            return resp.choices[0].message.content.strip()
+
+    async def map(
+        self,
+        requests: Sequence[Messages],
+        on_result: Optional[Callable[[int, Any], None]] = None,
+    ) -> list[Any]:
+        """Send every item of *requests* and return responses in order.
+
+        Failed requests yield their exception instead of a string. When
+        *on_result* is given it is called as ``on_result(index, result)``
+        in index order while the pool is still running.
+        """
+        results: list[Any] = [None] * len(requests)
+        writer = OrderedWriter(on_result or (lambda i, r: None))
+        rpm = RateBudget(self._rpm_limit)
+        tpm = RateBudget(self._tpm_limit)
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for index in range(len(requests)):
+            queue.put_nowait(index)
+
+        async def _worker() -> None:
+            while True:
+                try:
+                    index = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    result: Any = await self.complete(requests[index], rpm, tpm)
+                except Exception as exc:  # noqa: BLE001
+                    LOGGER.error("GPT request %s failed: %s", index, exc)
+                    result = exc
+                results[index] = result
+                writer.push(index, result)
+
+        workers = min(self.concurrency, len(requests))
+        await asyncio.gather(*(_worker() for _ in range(workers)))
+        return results
+
+
+__all__ = [
+    "GptPool",
+    "OrderedWriter",
+    "RateBudget",
+    "backoff_delay",
+    "estimate_tokens",
+    "is_retryable",
+]
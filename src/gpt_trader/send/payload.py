@@ -0,0 +1,179 @@
+"""Compact encodings of the bar data embedded in the GPT prompt.
+
+The fetchers write one JSON object per bar, repeating every key and
+printing floats at full precision. :func:`encode_compact` turns the same
+rows into a columnar document with one block per timeframe::
+
+    {"format": "columnar-v1",
+     "legend": {"t": "seconds since previous bar (first bar at t0)", ...},
+     "timeframes": {"5m": {"t0": "2024-01-01T08:00:00",
+                           "cols": ["t", "o", "h", "l", "c", "v", "rsi14"],
+                           "rows": [[0, 2034.5, ...], [300, ...]],
+                           "session": [[0, "asia"], [14, "london"]]}}}
+
+Prices are rounded to the symbol's digits and indicators to a configurable
+precision; the session label is only listed where it changes. The result
+is still JSON, so prompt copies and the response cache work unchanged.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from decimal import Decimal
+from typing import Any, Iterable, Mapping, Optional
+
+import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+
+PAYLOAD_FORMATS = ("json", "compact")
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+SHORT_NAMES = {
+    "open": "o",
+    "high": "h",
+    "low": "l",
+    "close": "c",
+    "tick_volume": "v",
+}
+# Columns copied without rounding.
+_PLAIN_COLUMNS = ("tick_volume",)
+_MAX_DIGITS = 5
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Return the token count of *text*, using ``tiktoken`` when installed."""
+    try:
+        import tiktoken
+    except ImportError:
+        return len(text) // 4 + 1
+    try:
+        encoding = tiktoken.get_encoding("o200k_base")
+    except Exception:  # noqa: BLE001
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def infer_digits(values: Iterable[Any], limit: int = _MAX_DIGITS) -> int:
+    """Return the decimals needed to print every price in *values* exactly."""
+    digits = 0
+    for value in values:
+        if value is None or pd.isna(value):
+            continue
+        exponent = Decimal(repr(float(value))).normalize().as_tuple().exponent
+        digits = max(digits, -int(exponent))
+        if digits >= limit:
+            return limit
+    return digits
+
+
+def _round(value: Any, digits: int) -> Any:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, float):
+        rounded = round(value, digits)
+        return int(rounded) if digits == 0 else rounded
+    return value
+
+
+def _epoch(value: str) -> int:
+    return int(pd.Timestamp(value).value // 1_000_000_000)
+
+
+def encode_compact(
+    records: list[Mapping[str, Any]],
+    price_digits: Optional[int] = None,
+    indicator_digits: Optional[int] = None,
+) -> str:
+    """Return *records* (bar dicts as written by the fetchers) in columnar form.
+
+    *price_digits* defaults to the decimals the prices already use and
+    *indicator_digits* to *price_digits*.
+    """
+    if price_digits is None:
+        price_digits = infer_digits(r.get(c) for r in records for c in PRICE_COLUMNS)
+    if indicator_digits is None:
+        indicator_digits = price_digits
+
+    groups: dict[str, list[Mapping[str, Any]]] = {}
+    for record in records:
+        groups.setdefault(str(record.get("timeframe", "")), []).append(record)
+
+    blocks: dict[str, Any] = {}
+    for label, rows in groups.items():
+        columns: list[str] = []
+        for row in rows:
+            for name in row:
+                if name not in ("timestamp", "timeframe", "session") and name not in columns:
+                    columns.append(name)
+        block: dict[str, Any] = {
+            "t0": rows[0].get("timestamp"),
+            "cols": ["t"] + [SHORT_NAMES.get(c, c) for c in columns],
+            "rows": [],
+        }
+        previous: Optional[int] = None
+        changes: list[list[Any]] = []
+        for index, row in enumerate(rows):
+            session = row.get("session")
+            if session is not None and (not changes or changes[-1][1] != session):
+                changes.append([index, session])
+            ts = row.get("timestamp")
+            current = _epoch(ts) if ts is not None else previous
+            delta = 0 if previous is None or current is None else current - previous
+            previous = current
+            values: list[Any] = [delta]
+            for name in columns:
+                value = row.get(name)
+                if name in PRICE_COLUMNS:
+                    value = _round(value, price_digits)
+                elif name not in _PLAIN_COLUMNS:
+                    value = _round(value, indicator_digits)
+                values.append(value)
+            block["rows"].append(values)
+        if changes:
+            block["session"] = changes
+        blocks[label] = block
+
+    legend = {
+        "t": "seconds since previous bar (first bar at t0)",
+        "session": "[first row index, session] at every session change",
+    }
+    legend.update({short: name for name, short in SHORT_NAMES.items()})
+    document = {"format": "columnar-v1", "legend": legend, "timeframes": blocks}
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":"))
+
+
+def prepare_payload(json_text: str, config: Optional[Mapping[str, Any]] = None) -> str:
+    """Return the data text to embed in the prompt for the ``send`` *config*.
+
+    ``payload_format`` selects ``json`` (unchanged, the default) or
+    ``compact``; ``payload_price_digits`` and ``payload_indicator_digits``
+    fix the rounding. The token estimate before and after is logged.
+    """
+    config = config or {}
+    fmt = config.get("payload_format", "json")
+    if fmt not in PAYLOAD_FORMATS:
+        raise ValueError(f"Unknown payload format: {fmt}")
+    if fmt == "json":
+        return json_text
+    records = json.loads(json_text)
+    encoded = encode_compact(
+        records,
+        price_digits=config.get("payload_price_digits"),
+        indicator_digits=config.get("payload_indicator_digits"),
+    )
+    before = estimate_text_tokens(json_text)
+    after = estimate_text_tokens(encoded)
+    LOGGER.info(
+        "Payload tokens ~%s -> ~%s (%.1fx smaller)", before, after, before / max(1, after)
+    )
+    return encoded
+
+
+__all__ = [
+    "PAYLOAD_FORMATS",
+    "encode_compact",
+    "estimate_text_tokens",
+    "infer_digits",
+    "prepare_payload",
+]
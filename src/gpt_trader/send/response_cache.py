@@ -0,0 +1,218 @@
+"""Content-addressed cache for GPT responses.
+
+Responses are stored in a local SQLite file keyed by a SHA-256 hash of the
+model name and the chat messages, i.e. the system message, the prompt and
+the JSON data. Sending the same payload again, for instance when a backtest
+is re-run, is then answered from disk.
+
+Cache modes:
+
+``off``
+    Always call the API; the cache is not opened.
+``read-write``
+    Serve hits from the cache and store new responses.
+``read-only``
+    Serve hits from the cache but never write to it.
+``refresh``
+    Always call the API and overwrite the cached response.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+CACHE_MODES = ("off", "read-write", "read-only", "refresh")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+
+# Evict after this many writes instead of after each one.
+_EVICT_EVERY = 100
+
+
+def cache_key(model: str, messages: list[dict[str, str]]) -> str:
+    """Return the hex digest identifying a request for *model*."""
+    blob = json.dumps(
+        {"model": model, "messages": messages},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response store with TTL and size limits.
+
+    Parameters
+    ----------
+    path:
+        SQLite file, created with its parent directory when missing.
+    ttl:
+        Seconds after which an entry expires; ``None`` keeps entries forever.
+    max_entries, max_bytes:
+        Upper bounds enforced by evicting the least recently used entries.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._writes = 0
+        # several pipelines may share one cache from worker threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for *key* or ``None``."""
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT response, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        now = self._clock()
+        if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+            self.misses += 1
+            return None
+        self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, response: str, model: str = "") -> None:
+        """Store *response* under *key*, replacing an older entry."""
+        with self._lock:
+            self._put(key, response, model)
+        if self._writes % _EVICT_EVERY == 0:
+            self.evict()
+
+    def _put(self, key: str, response: str, model: str) -> None:
+        now = self._clock()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, response, now, now, len(response.encode("utf-8"))),
+        )
+        self._conn.commit()
+        self._writes += 1
+
+    def evict(self) -> int:
+        """Drop expired entries and enforce the size limits.
+
+        Returns the number of removed entries.
+        """
+        with self._lock:
+            return self._evict()
+
+    def _evict(self) -> int:
+        before = self._conn.total_changes
+        if self.ttl is not None:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created < ?", (self._clock() - self.ttl,)
+            )
+        if self.max_entries is not None:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY accessed DESC LIMIT ?)",
+                (int(self.max_entries),),
+            )
+        if self.max_bytes is not None:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed DESC"
+            ).fetchall()
+            total = 0
+            drop = []
+            for key, size in rows:
+                total += size
+                if total > self.max_bytes:
+                    drop.append((key,))
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", drop)
+        self._conn.commit()
+        return self._conn.total_changes - before
+
+    def close(self) -> None:
+        self.evict()
+        self._conn.close()
+
+
+def open_cache(config: dict, mode: str) -> Optional[ResponseCache]:
+    """Return the cache configured in *config* or ``None`` when *mode* is off.
+
+    Recognised keys are ``cache_path``, ``cache_ttl_hours``,
+    ``cache_max_entries`` and ``cache_max_mb``.
+    """
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode: {mode}")
+    if mode == "off":
+        return None
+    ttl_hours = config.get("cache_ttl_hours")
+    max_mb = config.get("cache_max_mb")
+    max_entries = config.get("cache_max_entries")
+    return ResponseCache(
+        config.get("cache_path", "data/cache/gpt_responses.sqlite"),
+        ttl=float(ttl_hours) * 3600 if ttl_hours else None,
+        max_entries=int(max_entries) if max_entries else None,
+        max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else None,
+    )
+
+
+def lookup(cache: Optional[ResponseCache], mode: str, key: str) -> Optional[str]:
+    """Return a cached response when *mode* allows reading."""
+    if cache is None or mode not in ("read-write", "read-only"):
+        return None
+    return cache.get(key)
+
+
+def store(
+    cache: Optional[ResponseCache], mode: str, key: str, response: str, model: str = ""
+) -> None:
+    """Save *response* when *mode* allows writing."""
+    if cache is not None and mode in ("read-write", "refresh"):
+        cache.put(key, response, model)
+
+
+__all__ = [
+    "CACHE_MODES",
+    "ResponseCache",
+    "cache_key",
+    "lookup",
+    "open_cache",
+    "store",
+]
@@ -5,12 +5,25 @@ import argparse
 import json
 import logging
 import os
+import time
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING
 
+from gpt_trader.send.payload import PAYLOAD_FORMATS, prepare_payload
+from gpt_trader.send.response_cache import (
+    CACHE_MODES,
+    cache_key,
+    lookup,
+    open_cache,
+    store,
+)
+from gpt_trader.utils.artifact_index import latest_artifact
+from gpt_trader.utils.atomic_io import atomic_write_json, atomic_write_text
+from gpt_trader.utils.metrics import observe, span
+
 if TYPE_CHECKING:  # pragma: no cover - only for type hints
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
 
 
 LOGGER = logging.getLogger(__name__)
@@ -55,12 +68,13 @@ def _load_config(path: Path) -> dict:
         raise RuntimeError(f"Failed to read config: {exc}") from exc
 
 
-def _find_latest_json(directory: Path) -> Path:
-    """Return the most recently modified JSON file in *directory*."""
-    json_files = list(directory.glob("*.json"))
-    if not json_files:
-        raise FileNotFoundError(f"No JSON files found in {directory}")
-    return max(json_files, key=lambda p: p.stat().st_mtime)
+def _find_latest_json(directory: Path, symbol: str | None = None) -> Path:
+    """Return the most recently written JSON file in *directory*.
+
+    The directory's artifact index answers the lookup; directories without
+    one are scanned once.
+    """
+    return latest_artifact(directory, symbol)
 
 
 def _timestamp_code(ts: datetime) -> str:
@@ -84,9 +98,7 @@ def _save_prompt_copy(
         "json": json.loads(json_text),
         "prompt": prompt,
     }
-    (out_dir / f"{base}.json").write_text(
-        json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-    )
+    atomic_write_json(out_dir / f"{base}.json", data, ensure_ascii=False, indent=2)
 
 
 def _build_messages(json_text: str, prompt: str) -> list[dict[str, str]]:
@@ -100,10 +112,72 @@ def _build_messages(json_text: str, prompt: str) -> list[dict[str, str]]:
     ]
 
 
-def _call_gpt(messages: list[dict[str, str]], model: str, client: "OpenAI") -> str:
-    """Send *messages* to the GPT API and return the response text."""
-    resp = client.chat.completions.create(model=model, messages=messages)
-    return resp.choices[0].message.content.strip()
+def build_prompt(signal_id: str, prompt: str | None = None) -> str:
+    """Return *prompt* or the default prompt filled in with *signal_id*."""
+    if prompt is None:
+        return DEFAULT_PROMPT % signal_id
+    return prompt
+
+
+def _client_kwargs(config: dict) -> dict:
+    api_key = os.getenv("OPENAI_API_KEY") or config.get("openai_api_key")
+    if not api_key:
+        raise RuntimeError(
+            "OPENAI_API_KEY environment variable is not set and no api key in config"
+        )
+    kwargs = {"api_key": api_key}
+    if config.get("base_url"):
+        kwargs["base_url"] = config["base_url"]
+    return kwargs
+
+
+def create_client(config: dict) -> "OpenAI":
+    """Return an OpenAI client using ``OPENAI_API_KEY`` or the config key.
+
+    ``base_url`` in *config* points the client at another compatible
+    endpoint, e.g. a local fake server for tests.
+    """
+    from openai import OpenAI  # imported here to avoid mandatory dependency for tests
+
+    return OpenAI(**_client_kwargs(config))
+
+
+def create_async_client(config: dict) -> "AsyncOpenAI":
+    """Return an ``AsyncOpenAI`` client with its built-in retries disabled.
+
+    Retries are left to :class:`gpt_trader.send.gpt_pool.GptPool`.
+    """
+    from openai import AsyncOpenAI  # imported here to avoid mandatory dependency for tests
+
+    return AsyncOpenAI(max_retries=0, **_client_kwargs(config))
+
+
+def _call_gpt(
+    messages: list[dict[str, str]], model: str, client: "OpenAI", stream: bool = False
+) -> str:
+    """Send *messages* to the GPT API and return the response text.
+
+    The call is recorded as the ``gpt`` metrics span. With *stream* the reply
+    is read as it is generated and the time to the first token is recorded
+    as ``gpt_ttft``.
+    """
+    with span("gpt", model=model):
+        if not stream:
+            resp = client.chat.completions.create(model=model, messages=messages)
+            return resp.choices[0].message.content.strip()
+        started = time.perf_counter()
+        parts: list[str] = []
+        for chunk in client.chat.completions.create(
+            model=model, messages=messages, stream=True
+        ):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not parts:
+                    observe("gpt_ttft", time.perf_counter() - started, model=model)
+                parts.append(delta)
+        return "".join(parts).strip()
 
 
 def main() -> None:
@@ -145,6 +219,18 @@ def main() -> None:
         help="Directory to save JSON and prompt copies",
     )
     parser.add_argument("--output", help="Save raw response to file")
+    parser.add_argument(
+        "--cache-mode",
+        choices=CACHE_MODES,
+        default=config.get("cache_mode", "off"),
+        help="Response cache behaviour",
+    )
+    parser.add_argument(
+        "--payload-format",
+        choices=PAYLOAD_FORMATS,
+        default=config.get("payload_format", "json"),
+        help="Encoding of the bar data in the prompt",
+    )
 
     args = parser.parse_args(remaining)
     config_json = config.get("json_file") or None
@@ -187,8 +273,7 @@ def main() -> None:
             LOGGER.error("Failed to read prompt file: %s", exc)
             raise SystemExit(1)
 
-    if prompt is None:
-        prompt = DEFAULT_PROMPT % json_path.stem
+    prompt = build_prompt(json_path.stem, prompt)
 
     signal_id = json_path.stem
     try:
@@ -196,28 +281,42 @@ def main() -> None:
     except Exception as exc:  # noqa: BLE001
         LOGGER.warning("Failed to save prompt copy: %s", exc)
 
-    from openai import OpenAI  # imported here to avoid mandatory dependency for tests
-
-    api_key = os.getenv("OPENAI_API_KEY") or config.get("openai_api_key")
-    if not api_key:
-        LOGGER.error(
-            "OPENAI_API_KEY environment variable is not set and no api key in config"
-        )
-        raise SystemExit(1)
-    client = OpenAI(api_key=api_key)
-
-    messages = _build_messages(json_text, prompt)
-
+    payload_cfg = dict(config, payload_format=args.payload_format)
     try:
-        response = _call_gpt(messages, args.model, client)
+        payload = prepare_payload(json_text, payload_cfg)
     except Exception as exc:  # noqa: BLE001
-        LOGGER.error("GPT API request failed: %s", exc)
+        LOGGER.error("Failed to encode payload: %s", exc)
         raise SystemExit(1)
+    messages = _build_messages(payload, prompt)
+    key = cache_key(args.model, messages)
+    cache = open_cache(config, args.cache_mode)
+    try:
+        response = lookup(cache, args.cache_mode, key)
+        if response is not None:
+            LOGGER.info("Using cached GPT response %s", key[:12])
+        else:
+            # the client is only needed on a cache miss
+            try:
+                client = create_client(config)
+            except RuntimeError as exc:
+                LOGGER.error("%s", exc)
+                raise SystemExit(1)
+            try:
+                response = _call_gpt(
+                    messages, args.model, client, bool(config.get("stream", False))
+                )
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.error("GPT API request failed: %s", exc)
+                raise SystemExit(1)
+            store(cache, args.cache_mode, key, response, args.model)
+    finally:
+        if cache is not None:
+            cache.close()
 
     if args.output:
         output = Path(args.output)
         output.parent.mkdir(parents=True, exist_ok=True)
-        output.write_text(response, encoding="utf-8")
+        atomic_write_text(output, response)
         LOGGER.info("Saved response to %s", output)
     else:
         print(response)
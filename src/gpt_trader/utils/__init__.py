@@ -1,4 +1,13 @@
-from .json_io import write_json_no_nulls
+from .atomic_io import atomic_write_csv, atomic_write_json, atomic_write_text
+from .json_io import dumps_no_nulls, write_json_no_nulls
 from .api_client import post_signal, post_event
 
-__all__ = ["write_json_no_nulls", "post_signal", "post_event"]
+__all__ = [
+    "atomic_write_csv",
+    "atomic_write_json",
+    "atomic_write_text",
+    "dumps_no_nulls",
+    "write_json_no_nulls",
+    "post_signal",
+    "post_event",
+]
@@ -0,0 +1,285 @@
+"""Index of the artifacts written to a directory.
+
+The fetch and signal directories grow by one JSON file per run. Finding
+the newest one used to mean globbing the directory and calling ``stat()``
+on every file. Writers now record each artifact in a small SQLite file,
+``.artifact_index.sqlite``, that lives inside the same directory. The
+index stores the file name, the symbol and the timestamp, so "latest
+for symbol X" is one indexed query.
+
+:func:`latest_artifact` falls back to the old directory scan when a
+directory has no index yet, and then builds the index from the scan.
+Not every writer records its files (custom fetch scripts, files copied in
+by hand), so the index also stores the directory's mtime. When a lookup
+finds it changed, the directory is listed once and unindexed files are
+added; stat is only called on those. :func:`record_artifact` stores the
+mtime its own write left behind, so a writer and its readers do not list
+the directory on every tick. A file that lands at the same moment, or
+within the filesystem's timestamp granularity, can hide behind that mtime;
+the directory is therefore also listed every :data:`SYNC_INTERVAL`
+seconds. Files that were indexed but later deleted are dropped the same
+way, or when a lookup finds them missing.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_NAME = ".artifact_index.sqlite"
+
+# Seconds between full listings of a directory whose mtime did not change.
+SYNC_INTERVAL = 300.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    name TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    ts REAL NOT NULL
+)
+"""
+
+_META_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+)
+"""
+
+
+def signal_symbol(signal_id: Optional[str]) -> str:
+    """Return the lower-case symbol prefix of *signal_id* (``xauusd1718...``)."""
+    match = re.match(r"^([A-Za-z]+)", str(signal_id or ""))
+    return match.group(1).lower() if match else ""
+
+
+class ArtifactIndex:
+    """SQLite index of the artifacts in one directory.
+
+    Parameters
+    ----------
+    directory:
+        Directory holding the artifacts; the index file is created in it.
+    pattern:
+        Glob of the artifact files, used by :meth:`sync` and :meth:`rebuild`.
+    """
+
+    def __init__(self, directory: Path | str, pattern: str = "*.json") -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / INDEX_NAME
+        self.pattern = pattern
+        # scheduler subprocesses may write while another process reads
+        self._conn = sqlite3.connect(str(self.path), timeout=10)
+        # keep the journal file (``<INDEX_NAME>-journal``) between commits so
+        # they do not change the directory mtime that sync() compares
+        self._conn.execute("PRAGMA journal_mode=PERSIST")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute(_META_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_symbol_ts ON artifacts(symbol, ts)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ts ON artifacts(ts)")
+        self._conn.commit()
+
+    def __enter__(self) -> "ArtifactIndex":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def add(self, path: Path | str, symbol: str = "", ts: Optional[float] = None) -> None:
+        """Record *path* for *symbol*; *ts* defaults to the file's mtime."""
+        path = Path(path)
+        if ts is None:
+            ts = path.stat().st_mtime
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (name, symbol, ts) VALUES (?, ?, ?)",
+                (path.name, symbol.lower(), float(ts)),
+            )
+
+    def remove(self, *paths: Path | str) -> None:
+        """Forget *paths*."""
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM artifacts WHERE name = ?", [(Path(p).name,) for p in paths]
+            )
+
+    def _dir_mtime(self) -> int:
+        return self.directory.stat().st_mtime_ns
+
+    def _meta(self, key: str) -> Optional[int]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def _set_meta(self, **values: int) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", values.items()
+            )
+
+    def mark_synced(self) -> None:
+        """Accept the directory's current mtime without listing it.
+
+        Called after recording a file this process wrote, whose own write
+        changed the mtime.
+        """
+        self._set_meta(dir_mtime_ns=self._dir_mtime())
+
+    def sync(self, force: bool = False) -> int:
+        """Reconcile the index with the directory if it changed since the last sync.
+
+        The directory is also listed when the last listing is older than
+        :data:`SYNC_INTERVAL`, or always with *force*. Returns the number of
+        files added or dropped.
+        """
+        mtime_ns = self._dir_mtime()
+        listed_ns = self._meta("listed_ns")
+        due = force or listed_ns is None or time.time_ns() - listed_ns >= SYNC_INTERVAL * 1e9
+        if not due and self._meta("dir_mtime_ns") == mtime_ns:
+            return 0
+        # the mtime is read before listing, so a file added during the
+        # listing changes it again and is picked up by the next sync
+        on_disk = {p.name: p for p in self.directory.glob(self.pattern)}
+        indexed = {name for (name,) in self._conn.execute("SELECT name FROM artifacts")}
+        rows = []
+        for name in on_disk.keys() - indexed:
+            try:
+                rows.append((name, signal_symbol(Path(name).stem), on_disk[name].stat().st_mtime))
+            except OSError:  # removed while listing
+                continue
+        gone = indexed - on_disk.keys()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO artifacts (name, symbol, ts) VALUES (?, ?, ?)", rows
+            )
+            self._conn.executemany(
+                "DELETE FROM artifacts WHERE name = ?", [(name,) for name in gone]
+            )
+        self._set_meta(dir_mtime_ns=mtime_ns, listed_ns=time.time_ns())
+        if rows or gone:
+            LOGGER.debug(
+                "Synced artifact index in %s: %s added, %s dropped",
+                self.directory,
+                len(rows),
+                len(gone),
+            )
+        return len(rows) + len(gone)
+
+    def latest(self, symbol: Optional[str] = None) -> Optional[Path]:
+        """Return the newest existing artifact, for *symbol* when given."""
+        self.sync()
+        while True:
+            if symbol:
+                row = self._conn.execute(
+                    "SELECT name FROM artifacts WHERE symbol = ? ORDER BY ts DESC LIMIT 1",
+                    (symbol.lower(),),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT name FROM artifacts ORDER BY ts DESC LIMIT 1"
+                ).fetchone()
+            if row is None:
+                return None
+            path = self.directory / row[0]
+            if path.exists():
+                return path
+            LOGGER.debug("Dropping missing artifact %s from the index", path)
+            self.remove(path)
+
+    def rebuild(self, pattern: Optional[str] = None) -> int:
+        """Index every file matching *pattern*; return the number of files.
+
+        *pattern* defaults to the index's own. The symbol is taken from the
+        file name prefix.
+        """
+        mtime_ns = self._dir_mtime()
+        pattern = pattern or self.pattern
+        rows = [
+            (p.name, signal_symbol(p.stem), p.stat().st_mtime)
+            for p in self.directory.glob(pattern)
+        ]
+        with self._conn:
+            self._conn.execute("DELETE FROM artifacts")
+            self._conn.executemany(
+                "INSERT INTO artifacts (name, symbol, ts) VALUES (?, ?, ?)", rows
+            )
+        self._set_meta(dir_mtime_ns=mtime_ns, listed_ns=time.time_ns())
+        return len(rows)
+
+
+def record_artifact(
+    path: Path | str, symbol: str = "", ts: Optional[float] = None
+) -> None:
+    """Add *path* to the index of its directory.
+
+    The first record in a directory also indexes the files already there.
+    Later records do not list the directory; files other writers added are
+    picked up by :meth:`ArtifactIndex.sync`. Failures are logged, not
+    raised: the artifact itself is already written and readers fall back
+    to scanning the directory.
+    """
+    path = Path(path)
+    try:
+        fresh = not (path.parent / INDEX_NAME).exists()
+        with ArtifactIndex(path.parent, f"*{path.suffix}") as index:
+            if fresh:
+                index.rebuild()
+            index.add(path, symbol, ts)
+            index.mark_synced()
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.warning("Failed to index %s: %s", path, exc)
+
+
+def _scan_latest(directory: Path, pattern: str) -> Path:
+    files = list(directory.glob(pattern))
+    if not files:
+        raise FileNotFoundError(f"No JSON files found in {directory}")
+    return max(files, key=lambda p: p.stat().st_mtime)
+
+
+def latest_artifact(
+    directory: Path | str, symbol: Optional[str] = None, pattern: str = "*.json"
+) -> Path:
+    """Return the newest artifact in *directory*, using its index when present.
+
+    Without an index the directory is scanned once and an index is built
+    from the scan; an existing index is synced when the directory changed.
+    Raises :class:`FileNotFoundError` when nothing is found.
+    """
+    directory = Path(directory)
+    fresh = not (directory / INDEX_NAME).exists()
+    if fresh:
+        # raises before an empty index is created for a missing directory
+        _scan_latest(directory, pattern)
+    try:
+        with ArtifactIndex(directory, pattern) as index:
+            if fresh:
+                index.rebuild()
+            latest = index.latest(symbol)
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.warning("Artifact index in %s unusable, scanning: %s", directory, exc)
+        return _scan_latest(directory, pattern)
+    if latest is None:
+        raise FileNotFoundError(f"No JSON files found in {directory}")
+    return latest
+
+
+__all__ = [
+    "INDEX_NAME",
+    "SYNC_INTERVAL",
+    "ArtifactIndex",
+    "latest_artifact",
+    "record_artifact",
+    "signal_symbol",
+]
@@ -0,0 +1,183 @@
+"""Write pipeline artifacts atomically.
+
+Every artifact is first written to a temporary file in the target
+directory and then moved over the destination with :func:`os.replace`.
+A reader polling the path therefore sees either the previous file or the
+complete new one, never a partly written JSON or CSV.
+
+How much is flushed to disk before the rename is set by the fsync policy:
+
+``always``
+    fsync the file and, after the rename, its directory. Survives a power
+    loss at the cost of a few milliseconds per artifact.
+``file``
+    fsync the file only (the default).
+``never``
+    rely on the operating system. Readers are still protected from torn
+    files, but a crash may leave an empty or old artifact behind.
+
+The process-wide policy comes from the ``GPT_TRADER_FSYNC`` environment
+variable and can be changed with :func:`set_fsync_policy`.
+
+On Windows the rename fails with :class:`PermissionError` while a reader
+has the destination open, so it is retried for about half a second.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Iterator, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "file", "never")
+TEMP_SUFFIX = ".tmp"
+
+# os.replace attempts; the delay between them doubles up to REPLACE_MAX_DELAY
+REPLACE_ATTEMPTS = 7
+REPLACE_DELAY = 0.01
+REPLACE_MAX_DELAY = 0.2
+
+
+def _check_policy(policy: str) -> str:
+    if policy not in FSYNC_POLICIES:
+        raise ValueError(f"Unknown fsync policy: {policy}")
+    return policy
+
+
+_fsync_policy = _check_policy(os.getenv("GPT_TRADER_FSYNC", "file"))
+
+
+def get_fsync_policy() -> str:
+    """Return the process-wide fsync policy."""
+    return _fsync_policy
+
+
+def set_fsync_policy(policy: str) -> None:
+    """Set the process-wide fsync *policy* (one of :data:`FSYNC_POLICIES`)."""
+    global _fsync_policy
+    _fsync_policy = _check_policy(policy)
+
+
+def _fsync_dir(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # e.g. directories cannot be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _replace(src: Path, dst: Path) -> None:
+    delay = REPLACE_DELAY
+    for attempt in range(1, REPLACE_ATTEMPTS + 1):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError as exc:
+            if attempt == REPLACE_ATTEMPTS:
+                raise
+            LOGGER.debug("Replacing %s failed (attempt %s): %s", dst, attempt, exc)
+            time.sleep(delay)
+            delay = min(delay * 2, REPLACE_MAX_DELAY)
+
+
+@contextmanager
+def atomic_open(
+    path: Path | str,
+    mode: str = "w",
+    encoding: Optional[str] = "utf-8",
+    newline: Optional[str] = None,
+    fsync: Optional[str] = None,
+) -> Iterator[IO[Any]]:
+    """Open a temporary file that replaces *path* when the block succeeds.
+
+    The parent directory is created when missing. If the block raises, the
+    temporary file is removed and *path* is left untouched. *fsync*
+    overrides the process-wide policy for this write.
+    """
+    if mode not in ("w", "wb"):
+        raise ValueError(f"atomic_open only supports 'w' and 'wb', got {mode!r}")
+    policy = _check_policy(fsync or _fsync_policy)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f".{path.name}.", suffix=TEMP_SUFFIX, dir=path.parent
+    )
+    tmp = Path(tmp_name)
+    try:
+        if "b" in mode:
+            f = os.fdopen(fd, mode)
+        else:
+            f = os.fdopen(fd, mode, encoding=encoding, newline=newline)
+        with f:
+            yield f
+            f.flush()
+            if policy != "never":
+                os.fsync(f.fileno())
+        _replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    if policy == "always":
+        _fsync_dir(path.parent)
+
+
+def atomic_write_text(
+    path: Path | str,
+    text: str,
+    encoding: str = "utf-8",
+    fsync: Optional[str] = None,
+) -> None:
+    """Atomically replace *path* with *text*."""
+    with atomic_open(path, "w", encoding=encoding, fsync=fsync) as f:
+        f.write(text)
+
+
+def atomic_write_bytes(path: Path | str, data: bytes, fsync: Optional[str] = None) -> None:
+    """Atomically replace *path* with *data*."""
+    with atomic_open(path, "wb", encoding=None, fsync=fsync) as f:
+        f.write(data)
+
+
+def atomic_write_json(
+    path: Path | str,
+    data: Any,
+    fsync: Optional[str] = None,
+    **dump_kwargs: Any,
+) -> None:
+    """Atomically replace *path* with *data* dumped by :func:`json.dump`."""
+    with atomic_open(path, "w", fsync=fsync) as f:
+        json.dump(data, f, **dump_kwargs)
+
+
+def atomic_write_csv(df: Any, path: Path | str, fsync: Optional[str] = None, **kwargs: Any) -> None:
+    """Atomically replace *path* with ``df.to_csv(**kwargs)``."""
+    kwargs.setdefault("index", False)
+    with atomic_open(path, "w", newline="", fsync=fsync) as f:
+        df.to_csv(f, **kwargs)
+
+
+__all__ = [
+    "FSYNC_POLICIES",
+    "TEMP_SUFFIX",
+    "atomic_open",
+    "atomic_write_bytes",
+    "atomic_write_csv",
+    "atomic_write_json",
+    "atomic_write_text",
+    "get_fsync_policy",
+    "set_fsync_policy",
+]
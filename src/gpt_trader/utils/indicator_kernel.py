@@ -0,0 +1,214 @@
+"""Vectorized indicator kernel for many series at once.
+
+The functions here operate on stacked 2-D ``float64`` arrays where each row is
+a bar and each column is one ``symbol x timeframe`` series. All indicators
+spec kinds from :mod:`gpt_trader.utils.indicator_registry` are computed
+with a handful of NumPy passes and no intermediate DataFrames.
+Series of different length are aligned on their last bar and padded with NaN
+at the top.
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from gpt_trader.utils.indicator_registry import parse_specs
+
+
+def _rolling_mean(values: np.ndarray, window: int, center: bool = False) -> np.ndarray:
+    """Return the column-wise rolling mean of *values* over *window* rows.
+
+    Windows containing NaN, or not yet full, yield NaN like pandas does with
+    ``min_periods=window``. With *center* the first valid value of each
+    column is subtracted before the cumulative sum, which limits round-off
+    for price levels over long series. Leave it off for non-negative inputs
+    such as gains so that windows of zeros stay exactly zero.
+    """
+    rows, cols = values.shape
+    out = np.full((rows, cols), np.nan)
+    if rows < window:
+        return out
+    isnan = np.isnan(values)
+    first = np.zeros(cols)
+    if center:
+        has_valid = ~isnan.all(axis=0)
+        first_idx = np.argmax(~isnan, axis=0)
+        first[has_valid] = values[first_idx[has_valid], np.nonzero(has_valid)[0]]
+    shifted = np.where(isnan, 0.0, values - first)
+
+    csum = np.zeros((rows + 1, cols))
+    np.cumsum(shifted, axis=0, out=csum[1:])
+    nan_count = np.zeros((rows + 1, cols), dtype=np.int64)
+    np.cumsum(isnan, axis=0, out=nan_count[1:])
+
+    sums = csum[window:] - csum[:-window]
+    nans = nan_count[window:] - nan_count[:-window]
+    means = sums / window + first
+    means[nans > 0] = np.nan
+    out[window - 1 :] = means
+    return out
+
+
+def _ema(values: np.ndarray, span: int) -> np.ndarray:
+    """Return ``ewm(span, adjust=False).mean()`` for each column.
+
+    The recurrence runs once over the rows and is vectorized across the
+    columns. Leading NaN are skipped per column.
+    """
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty_like(values)
+    prev = np.full(values.shape[1], np.nan)
+    for i, row in enumerate(values):
+        blended = alpha * row + (1.0 - alpha) * prev
+        np.copyto(blended, row, where=np.isnan(prev))
+        np.copyto(blended, prev, where=np.isnan(row))
+        out[i] = blended
+        prev = blended
+    return out
+
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """Return the true range, falling back to ``high - low`` on the first bar."""
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    tr = high - low
+    with np.errstate(invalid="ignore"):
+        tr = np.fmax(tr, np.abs(high - prev_close))
+        tr = np.fmax(tr, np.abs(low - prev_close))
+    return tr
+
+
+def _rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Return the column-wise sample standard deviation over *window* rows."""
+    rows, cols = values.shape
+    first = np.zeros(cols)
+    isnan = np.isnan(values)
+    has_valid = ~isnan.all(axis=0)
+    first_idx = np.argmax(~isnan, axis=0)
+    first[has_valid] = values[first_idx[has_valid], np.nonzero(has_valid)[0]]
+    centered = values - first
+    mean = _rolling_mean(centered, window)
+    mean_sq = _rolling_mean(centered * centered, window)
+    if window < 2:
+        return np.full((rows, cols), np.nan)
+    var = (mean_sq - mean * mean) * window / (window - 1)
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def compute_indicators_batch(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    indicators: dict[str, bool] | list | None = None,
+) -> dict[str, np.ndarray]:
+    """Return indicator arrays for stacked *high*, *low* and *close* series.
+
+    Parameters
+    ----------
+    high, low, close:
+        Arrays of shape ``(bars, series)``.
+    indicators:
+        Same value as accepted by ``compute_indicators``.
+
+    Returns
+    -------
+    dict
+        Maps column names such as ``"atr14"`` to arrays of the input shape.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    if not (high.shape == low.shape == close.shape) or close.ndim != 2:
+        raise ValueError("high, low and close must be 2-D arrays of the same shape")
+
+    out: dict[str, np.ndarray] = {}
+    means: dict[int, np.ndarray] = {}
+    tr: np.ndarray | None = None
+    gain = loss = None
+
+    def _close_mean(window: int) -> np.ndarray:
+        if window not in means:
+            means[window] = _rolling_mean(close, window, center=True)
+        return means[window]
+
+    for spec in parse_specs(indicators):
+        w = spec.window
+        cols = spec.columns
+        if spec.kind == "sma":
+            out[cols[0]] = _close_mean(w)
+        elif spec.kind == "ema":
+            out[cols[0]] = _ema(close, w)
+        elif spec.kind == "atr":
+            if tr is None:
+                tr = _true_range(high, low, close)
+            out[cols[0]] = _rolling_mean(tr, w)
+        elif spec.kind == "rsi":
+            if gain is None:
+                delta = np.full_like(close, np.nan)
+                delta[1:] = close[1:] - close[:-1]
+                gain = np.where(delta > 0, delta, 0.0)
+                loss = np.where(delta < 0, -delta, 0.0)
+                gain[np.isnan(delta)] = np.nan
+                loss[np.isnan(delta)] = np.nan
+            avg_gain = _rolling_mean(gain, w)
+            avg_loss = _rolling_mean(loss, w)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[cols[0]] = 100 - 100 / (1 + avg_gain / avg_loss)
+        elif spec.kind == "bollinger":
+            mid = _close_mean(w)
+            width = float(spec.params.get("k", 2)) * _rolling_std(close, w)
+            out[cols[0]] = mid
+            out[cols[1]] = mid + width
+            out[cols[2]] = mid - width
+        else:
+            raise ValueError(f"Indicator kind '{spec.kind}' is not supported by the batch kernel")
+
+    return out
+
+
+def stack_frames(
+    frames: Sequence[pd.DataFrame],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Stack the OHLC columns of *frames* into ``(high, low, close)`` arrays.
+
+    Frames are aligned on their last row; shorter frames are padded with NaN
+    at the top.
+    """
+    rows = max((len(df) for df in frames), default=0)
+    arrays = []
+    for col in ("high", "low", "close"):
+        arr = np.full((rows, len(frames)), np.nan)
+        for j, df in enumerate(frames):
+            if len(df):
+                arr[rows - len(df) :, j] = df[col].to_numpy(dtype=np.float64)
+        arrays.append(arr)
+    return arrays[0], arrays[1], arrays[2]
+
+
+def unstack_indicators(
+    frames: Sequence[pd.DataFrame],
+    results: dict[str, np.ndarray],
+) -> list[pd.DataFrame]:
+    """Return copies of *frames* with the columns from *results* attached."""
+    out: list[pd.DataFrame] = []
+    for j, df in enumerate(frames):
+        df = df.copy()
+        for name, arr in results.items():
+            df[name] = arr[arr.shape[0] - len(df) :, j]
+        out.append(df)
+    return out
+
+
+def compute_indicators_many(
+    frames: Sequence[pd.DataFrame],
+    indicators: dict[str, bool] | None = None,
+) -> list[pd.DataFrame]:
+    """Batched equivalent of calling ``compute_indicators`` on each frame."""
+    if not frames:
+        return []
+    high, low, close = stack_frames(frames)
+    results = compute_indicators_batch(high, low, close, indicators)
+    return unstack_indicators(frames, results)
@@ -0,0 +1,305 @@
+"""Declarative indicator specs and the registry that computes them.
+
+An indicator is described by a small mapping such as ``{"kind": "ema",
+"window": 21}`` or ``{"kind": "bollinger", "window": 20, "k": 2}``. The
+registry knows, for every kind, which output columns it produces and how
+many bars it needs before the first valid value. Specs sharing a window
+reuse the same rolling pass over the data.
+
+The legacy ``indicators`` mapping of five on/off flags is still accepted and
+translated to specs by :func:`parse_specs`.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from typing import Any, Callable, Iterable
+
+import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+
+LEGACY_DEFAULTS: dict[str, bool] = {
+    "atr14": True,
+    "rsi14": True,
+    "sma20": True,
+    "ema50": False,
+    "sma200": False,
+}
+
+_NAME_RE = re.compile(r"^(sma|ema|rsi|atr)(\d+)$")
+
+
+class IndicatorSpec:
+    """One configured indicator instance."""
+
+    __slots__ = ("kind", "window", "params")
+
+    def __init__(self, kind: str, window: int, **params: Any) -> None:
+        kind = str(kind).lower()
+        if kind not in REGISTRY:
+            raise ValueError(f"Unknown indicator kind: {kind}")
+        window = int(window)
+        if window < 1:
+            raise ValueError(f"Indicator window must be positive: {window}")
+        self.kind = kind
+        self.window = window
+        self.params = params
+
+    def __repr__(self) -> str:
+        extra = "".join(f", {k}={v!r}" for k, v in sorted(self.params.items()))
+        return f"IndicatorSpec({self.kind!r}, {self.window}{extra})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IndicatorSpec):
+            return NotImplemented
+        return (self.kind, self.window, self.params) == (
+            other.kind,
+            other.window,
+            other.params,
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.kind, self.window, tuple(sorted(self.params.items()))))
+
+    @property
+    def columns(self) -> list[str]:
+        """Output column names produced by this spec."""
+        return REGISTRY[self.kind].columns(self)
+
+    @property
+    def warmup(self) -> int:
+        """Bars required before the first non-NaN value."""
+        return REGISTRY[self.kind].warmup(self)
+
+
+class IndicatorKind:
+    """Registry entry describing how to name, size and compute a kind."""
+
+    def __init__(
+        self,
+        columns: Callable[[IndicatorSpec], list[str]],
+        warmup: Callable[[IndicatorSpec], int],
+        compute: Callable[["_Context", IndicatorSpec], dict[str, pd.Series]],
+    ) -> None:
+        self.columns = columns
+        self.warmup = warmup
+        self.compute = compute
+
+
+REGISTRY: dict[str, IndicatorKind] = {}
+
+
+def register_indicator(
+    kind: str,
+    columns: Callable[[IndicatorSpec], list[str]],
+    warmup: Callable[[IndicatorSpec], int],
+) -> Callable[[Callable[["_Context", IndicatorSpec], dict[str, pd.Series]]], Callable]:
+    """Register *kind*; use as a decorator on its compute function.
+
+    The compute function receives a :class:`_Context` with cached
+    intermediates (rolling means, true range, ...) and the spec, and returns
+    a mapping of column name to Series.
+    """
+
+    def _decorator(func):
+        REGISTRY[kind] = IndicatorKind(columns, warmup, func)
+        return func
+
+    return _decorator
+
+
+class _Context:
+    """Per-frame cache so specs that share a window share the rolling pass."""
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.df = df
+        self._cache: dict[tuple, pd.Series] = {}
+
+    def _cached(self, key: tuple, func: Callable[[], pd.Series]) -> pd.Series:
+        if key not in self._cache:
+            self._cache[key] = func()
+        return self._cache[key]
+
+    def close_rolling(self, window: int) -> Any:
+        return self._cached(("roll", window), lambda: self.df["close"].rolling(window=window))
+
+    def close_mean(self, window: int) -> pd.Series:
+        return self._cached(("mean", window), lambda: self.close_rolling(window).mean())
+
+    def close_std(self, window: int) -> pd.Series:
+        return self._cached(("std", window), lambda: self.close_rolling(window).std())
+
+    def true_range(self) -> pd.Series:
+        def _tr() -> pd.Series:
+            df = self.df
+            prev_close = df["close"].shift(1)
+            return pd.concat(
+                [
+                    df["high"] - df["low"],
+                    (df["high"] - prev_close).abs(),
+                    (df["low"] - prev_close).abs(),
+                ],
+                axis=1,
+            ).max(axis=1)
+
+        return self._cached(("tr",), _tr)
+
+    def delta(self) -> pd.Series:
+        return self._cached(("delta",), lambda: self.df["close"].diff())
+
+
+@register_indicator("sma", lambda s: [f"sma{s.window}"], lambda s: s.window)
+def _sma(ctx: _Context, spec: IndicatorSpec) -> dict[str, pd.Series]:
+    return {f"sma{spec.window}": ctx.close_mean(spec.window)}
+
+
+@register_indicator("ema", lambda s: [f"ema{s.window}"], lambda s: s.window)
+def _ema(ctx: _Context, spec: IndicatorSpec) -> dict[str, pd.Series]:
+    return {f"ema{spec.window}": ctx.df["close"].ewm(span=spec.window, adjust=False).mean()}
+
+
+@register_indicator("rsi", lambda s: [f"rsi{s.window}"], lambda s: s.window + 1)
+def _rsi(ctx: _Context, spec: IndicatorSpec) -> dict[str, pd.Series]:
+    delta = ctx.delta()
+    gain = delta.clip(lower=0)
+    loss = -delta.clip(upper=0)
+    avg_gain = gain.rolling(window=spec.window).mean()
+    avg_loss = loss.rolling(window=spec.window).mean()
+    rs = avg_gain / avg_loss
+    return {f"rsi{spec.window}": 100 - 100 / (1 + rs)}
+
+
+@register_indicator("atr", lambda s: [f"atr{s.window}"], lambda s: s.window)
+def _atr(ctx: _Context, spec: IndicatorSpec) -> dict[str, pd.Series]:
+    return {f"atr{spec.window}": ctx.true_range().rolling(window=spec.window).mean()}
+
+
+def _bollinger_columns(spec: IndicatorSpec) -> list[str]:
+    w = spec.window
+    return [f"bb{w}_mid", f"bb{w}_upper", f"bb{w}_lower"]
+
+
+@register_indicator("bollinger", _bollinger_columns, lambda s: s.window)
+def _bollinger(ctx: _Context, spec: IndicatorSpec) -> dict[str, pd.Series]:
+    mid = ctx.close_mean(spec.window)
+    width = float(spec.params.get("k", 2)) * ctx.close_std(spec.window)
+    mid_col, upper_col, lower_col = spec.columns
+    return {mid_col: mid, upper_col: mid + width, lower_col: mid - width}
+
+
+def _spec_from_mapping(item: dict[str, Any]) -> IndicatorSpec:
+    params = {k: v for k, v in item.items() if k not in ("kind", "window")}
+    if "kind" not in item or "window" not in item:
+        raise ValueError(f"Indicator spec needs 'kind' and 'window': {item}")
+    return IndicatorSpec(item["kind"], item["window"], **params)
+
+
+def _spec_from_name(name: str) -> IndicatorSpec:
+    match = _NAME_RE.match(name.strip().lower())
+    if not match:
+        raise ValueError(f"Unknown indicator name: {name}")
+    return IndicatorSpec(match.group(1), int(match.group(2)))
+
+
+def parse_specs(indicators: Any = None) -> list[IndicatorSpec]:
+    """Return indicator specs from an ``indicators`` config value.
+
+    Accepted forms:
+
+    * ``None`` or a mapping of names to booleans, e.g. ``{"rsi14": False}``.
+      Names follow ``<kind><window>`` and the five legacy names keep their
+      old defaults when missing. Enabled names that match no indicator are
+      skipped with a warning, as the old flag handling ignored them.
+    * A list whose items are spec mappings such as
+      ``{"kind": "bollinger", "window": 20, "k": 2}`` or names like
+      ``"ema21"``.
+
+    Duplicates are removed while keeping the first occurrence.
+    """
+    specs: list[IndicatorSpec] = []
+    if indicators is None or isinstance(indicators, dict):
+        flags = {**LEGACY_DEFAULTS, **(indicators or {})}
+        for name, enabled in flags.items():
+            if not enabled:
+                continue
+            try:
+                specs.append(_spec_from_name(name))
+            except ValueError as exc:
+                LOGGER.warning("Ignoring indicator %r: %s", name, exc)
+    elif isinstance(indicators, (list, tuple)):
+        for item in indicators:
+            if isinstance(item, IndicatorSpec):
+                specs.append(item)
+            elif isinstance(item, dict):
+                specs.append(_spec_from_mapping(item))
+            else:
+                specs.append(_spec_from_name(str(item)))
+    else:
+        raise ValueError(f"Unsupported indicators config: {indicators!r}")
+    return list(dict.fromkeys(specs))
+
+
+def output_columns(specs: Iterable[IndicatorSpec]) -> list[str]:
+    """Return the indicator columns produced by *specs* in order."""
+    cols: list[str] = []
+    for spec in specs:
+        cols.extend(c for c in spec.columns if c not in cols)
+    return cols
+
+
+def required_bars(specs: Iterable[IndicatorSpec], keep: int) -> int:
+    """Return bars to fetch so the last *keep* rows have every indicator."""
+    warmup = max((spec.warmup for spec in specs), default=1)
+    return max(1, int(keep)) + warmup - 1
+
+
+def resolve_fetch_bars(fetch_bars: Any, specs: Iterable[IndicatorSpec], keep: int) -> int:
+    """Return how many bars to fetch for a timeframe keeping *keep* rows.
+
+    ``fetch_bars`` of ``None``, ``""`` or ``"auto"`` derives the count from
+    the specs' warm-up. An explicit number is honoured, with a warning when
+    it is too small for every kept row to carry all indicators.
+    """
+    needed = required_bars(specs, keep)
+    if fetch_bars is None or str(fetch_bars).strip().lower() in ("", "auto"):
+        return needed
+    bars = int(fetch_bars)
+    if bars < needed:
+        LOGGER.warning(
+            "fetch_bars=%s is below the %s bars needed for keep=%s; "
+            "the oldest kept rows will have NaN indicators",
+            bars,
+            needed,
+            keep,
+        )
+    return bars
+
+
+def compute_specs(df: pd.DataFrame, specs: Iterable[IndicatorSpec]) -> pd.DataFrame:
+    """Return a copy of *df* with the columns of every spec added.
+
+    Specs are grouped by window so intermediates such as the rolling mean of
+    ``close`` are computed once per window.
+    """
+    df = df.copy()
+    ctx = _Context(df)
+    ordered = list(specs)
+    results: dict[str, pd.Series] = {}
+    for spec in sorted(ordered, key=lambda s: s.window):
+        results.update(REGISTRY[spec.kind].compute(ctx, spec))
+    for col in output_columns(ordered):
+        df[col] = results[col]
+    return df
+
+
+__all__ = [
+    "IndicatorSpec",
+    "REGISTRY",
+    "compute_specs",
+    "output_columns",
+    "parse_specs",
+    "register_indicator",
+    "required_bars",
+    "resolve_fetch_bars",
+]
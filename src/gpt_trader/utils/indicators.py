@@ -1,12 +1,24 @@
 """Common financial indicator calculations."""
 from __future__ import annotations
 
+import math
+from collections import deque
+from typing import Iterable
+
+import numpy as np
 import pandas as pd
 
+from gpt_trader.utils.indicator_registry import (
+    IndicatorSpec,
+    compute_specs,
+    output_columns,
+    parse_specs,
+)
+
 
 def compute_indicators(
     df: pd.DataFrame,
-    indicators: dict[str, bool] | None = None,
+    indicators: dict[str, bool] | list | None = None,
 ) -> pd.DataFrame:
     """Return a copy of *df* with indicator columns added.
 
@@ -15,45 +27,373 @@ def compute_indicators(
     df:
         Input OHLCV DataFrame.
     indicators:
-        Optional mapping controlling which indicators to compute. Supported keys
-        are ``"atr14"``, ``"rsi14"``, ``"sma20"``, ``"ema50"`` and ``"sma200"``.
-        Missing keys default to ``True``.
+        Either a mapping of indicator names to booleans or a list of specs
+        understood by :func:`gpt_trader.utils.indicator_registry.parse_specs`.
+        In the mapping form ``"atr14"``, ``"rsi14"`` and ``"sma20"`` default
+        to ``True`` while ``"ema50"`` and ``"sma200"`` default to ``False``;
+        other ``<kind><window>`` names such as ``"ema21"`` may be enabled too.
+    """
+
+    return compute_specs(df, parse_specs(indicators))
+
+
+# ---------------------------------------------------------------------------
+# Incremental engine
+# ---------------------------------------------------------------------------
+
+
+class _RollingMean:
+    """Fixed-window mean over a stream, updated in O(1) per value.
+
+    The running sum is Kahan-compensated and the window keeps track of how
+    many values are non-zero or negative so that windows of zeros return an
+    exact ``0.0`` like the pandas rolling kernel does.
     """
 
-    if indicators is None:
-        indicators = {}
+    __slots__ = ("window", "_buf", "_sum", "_comp", "_nonzero", "_negative", "_nan")
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self._buf: deque[float] = deque()
+        self._sum = 0.0
+        self._comp = 0.0
+        self._nonzero = 0
+        self._negative = 0
+        self._nan = 0
+
+    def _add(self, value: float, sign: int) -> None:
+        if math.isnan(value):
+            self._nan += sign
+            return
+        y = sign * value - self._comp
+        t = self._sum + y
+        self._comp = (t - self._sum) - y
+        self._sum = t
+        if value != 0.0:
+            self._nonzero += sign
+        if value < 0.0:
+            self._negative += sign
+
+    def _mean(self, total: float, nonzero: int, negative: int, nan: int) -> float:
+        if nan or nonzero == 0:
+            return math.nan if nan else 0.0
+        mean = total / self.window
+        if negative == 0 and mean < 0.0:
+            return 0.0
+        return mean
+
+    def push(self, value: float) -> float:
+        """Append *value* and return the mean of the window (NaN until full)."""
+        self._buf.append(value)
+        self._add(value, 1)
+        if len(self._buf) > self.window:
+            self._add(self._buf.popleft(), -1)
+        if len(self._buf) < self.window:
+            return math.nan
+        return self._mean(self._sum, self._nonzero, self._negative, self._nan)
+
+    def peek(self, value: float) -> float:
+        """Return the mean the window would have after ``push(value)``."""
+        count = len(self._buf) + 1
+        total, nonzero, negative, nan = self._sum, self._nonzero, self._negative, self._nan
+        values = [(value, 1)]
+        if count > self.window:
+            values.append((self._buf[0], -1))
+            count -= 1
+        if count < self.window:
+            return math.nan
+        for v, sign in values:
+            if math.isnan(v):
+                nan += sign
+                continue
+            total += sign * v
+            nonzero += sign * (v != 0.0)
+            negative += sign * (v < 0.0)
+        return self._mean(total, nonzero, negative, nan)
+
+    def seed(self, values: Iterable[float]) -> None:
+        """Reset the window to the last ``window`` entries of *values*."""
+        self.__init__(self.window)
+        for v in list(values)[-self.window:]:
+            self._buf.append(v)
+        for v in self._buf:
+            if math.isnan(v):
+                self._nan += 1
+                continue
+            self._nonzero += v != 0.0
+            self._negative += v < 0.0
+        self._sum = math.fsum(v for v in self._buf if not math.isnan(v))
+
+
+class _Ema:
+    """Exponential moving average matching ``ewm(span, adjust=False)``."""
+
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, span: int) -> None:
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = math.nan
+
+    def peek(self, x: float) -> float:
+        if math.isnan(self.value):
+            return x
+        return self.alpha * x + (1.0 - self.alpha) * self.value
+
+    def push(self, x: float) -> float:
+        self.value = self.peek(x)
+        return self.value
+
+
+def _rsi(avg_gain: float, avg_loss: float) -> float:
+    """Return the RSI for the given averages using pandas' division rules."""
+    if math.isnan(avg_gain) or math.isnan(avg_loss):
+        return math.nan
+    if avg_loss == 0.0:
+        return math.nan if avg_gain == 0.0 else 100.0
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+class _Stream:
+    """Incremental state for one :class:`IndicatorSpec`."""
+
+    def __init__(self, spec: IndicatorSpec) -> None:
+        self.spec = spec
+        self.columns = spec.columns
+        w = spec.window
+        if spec.kind in ("sma", "atr"):
+            self.mean = _RollingMean(w)
+        elif spec.kind == "ema":
+            self.ema = _Ema(w)
+        elif spec.kind == "rsi":
+            self.gain = _RollingMean(w)
+            self.loss = _RollingMean(w)
+        elif spec.kind == "bollinger":
+            self.ref = math.nan
+            self.mean = _RollingMean(w)
+            self.sq = _RollingMean(w)
+        else:
+            raise ValueError(f"Indicator kind '{spec.kind}' has no incremental form")
+
+    def _bollinger(self, close: float, op: str) -> list[float]:
+        if math.isnan(self.ref):
+            self.ref = close
+        x = close - self.ref
+        mean = getattr(self.mean, op)(x)
+        mean_sq = getattr(self.sq, op)(x * x)
+        w = self.spec.window
+        if math.isnan(mean) or w < 2:
+            return [math.nan, math.nan, math.nan]
+        var = max(0.0, (mean_sq - mean * mean) * w / (w - 1))
+        width = float(self.spec.params.get("k", 2)) * math.sqrt(var)
+        mid = mean + self.ref
+        return [mid, mid + width, mid - width]
+
+    def step(self, high: float, low: float, close: float, prev: float, op: str) -> list[float]:
+        kind = self.spec.kind
+        if kind == "sma":
+            return [getattr(self.mean, op)(close)]
+        if kind == "ema":
+            return [getattr(self.ema, op)(close)]
+        if kind == "atr":
+            if math.isnan(prev):
+                tr = high - low
+            else:
+                tr = max(high - low, abs(high - prev), abs(low - prev))
+            return [getattr(self.mean, op)(tr)]
+        if kind == "rsi":
+            if math.isnan(prev):
+                return [math.nan]
+            delta = close - prev
+            gain = getattr(self.gain, op)(max(delta, 0.0))
+            loss = getattr(self.loss, op)(max(-delta, 0.0))
+            return [_rsi(gain, loss)]
+        return self._bollinger(close, op)
+
+    def seed(self, high: pd.Series, low: pd.Series, close: pd.Series, out: pd.DataFrame) -> None:
+        kind = self.spec.kind
+        if kind == "sma":
+            self.mean.seed(close.tolist())
+        elif kind == "ema":
+            self.ema.value = float(out[self.columns[0]].iloc[-1])
+        elif kind == "atr":
+            prev_close = close.shift(1)
+            tr = pd.concat(
+                [high - low, (high - prev_close).abs(), (low - prev_close).abs()],
+                axis=1,
+            ).max(axis=1)
+            self.mean.seed(tr.tolist())
+        elif kind == "rsi":
+            delta = close.diff().iloc[1:]
+            self.gain.seed(delta.clip(lower=0).tolist())
+            self.loss.seed((-delta.clip(upper=0)).tolist())
+        else:
+            tail = close.iloc[-self.spec.window:]
+            self.ref = float(tail.iloc[0])
+            centered = tail - self.ref
+            self.mean.seed(centered.tolist())
+            self.sq.seed((centered * centered).tolist())
+
+
+class IncrementalIndicators:
+    """Stateful counterpart of :func:`compute_indicators` for one series.
+
+    Each appended bar is processed in constant time using rolling sums for
+    the window averages (SMA, ATR, RSI, Bollinger) and a recurrence for EMA.
+    Values agree with the batch implementation to floating point precision.
+    """
+
+    def __init__(self, indicators: dict[str, bool] | list | None = None) -> None:
+        self.specs = parse_specs(indicators)
+        self.columns = output_columns(self.specs)
+        self._streams = [_Stream(spec) for spec in self.specs]
+        self.prev_close = math.nan
+
+    def _step(self, high: float, low: float, close: float, commit: bool) -> dict[str, float]:
+        op = "push" if commit else "peek"
+        out: dict[str, float] = {}
+        for stream in self._streams:
+            values = stream.step(high, low, close, self.prev_close, op)
+            out.update(zip(stream.columns, values))
+        if commit:
+            self.prev_close = close
+        return out
+
+    def update(self, high: float, low: float, close: float) -> dict[str, float]:
+        """Append a completed bar and return its indicator values."""
+        return self._step(float(high), float(low), float(close), commit=True)
+
+    def peek(self, high: float, low: float, close: float) -> dict[str, float]:
+        """Return indicator values for a bar without appending it.
+
+        Used for the bar that is still forming so that the next call can
+        revise it instead of double counting.
+        """
+        return self._step(float(high), float(low), float(close), commit=False)
+
+    def warm_up(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Seed the state from *df* in one vectorized pass.
+
+        Returns the same frame as :func:`compute_indicators`. All rows are
+        committed, so the caller should pass completed bars only.
+        """
+        out = compute_specs(df, self.specs)
+        if df.empty:
+            return out
+        high = df["high"].astype(float)
+        low = df["low"].astype(float)
+        close = df["close"].astype(float)
+        for stream in self._streams:
+            stream.seed(high, low, close, out)
+        self.prev_close = float(close.iloc[-1])
+        return out
+
+
+class IndicatorEngine:
+    """Keep :class:`IncrementalIndicators` state per ``(symbol, timeframe)``.
+
+    :meth:`apply` is a drop-in replacement for :func:`compute_indicators` on
+    frames with a ``timestamp`` column. Bars already seen are served from a
+    bounded history, only newer bars advance the state and the final bar is
+    treated as still forming so it can change on the next call.
+
+    Results equal :func:`compute_indicators` run over every bar the engine
+    has seen for the series, so EMA50 keeps its history across calls rather
+    than restarting from the first bar of each fetched window.
+    """
+
+    def __init__(
+        self,
+        indicators: dict[str, bool] | list | None = None,
+        history: int = 1000,
+    ) -> None:
+        self.indicators = indicators
+        self.history = history
+        self._states: dict[tuple[str, str], _SeriesState] = {}
+
+    def reset(self, symbol: str | None = None, timeframe: str | None = None) -> None:
+        """Drop cached state for one series or, without arguments, all series."""
+        if symbol is None:
+            self._states.clear()
+        else:
+            self._states.pop((symbol, str(timeframe)), None)
 
-    df = df.copy()
+    def apply(self, symbol: str, timeframe: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Return a copy of *df* with indicator columns for *symbol*/*timeframe*."""
+        key = (symbol, str(timeframe))
+        if df.empty:
+            return compute_indicators(df, self.indicators)
+        times = pd.to_datetime(df["timestamp"]).to_numpy(dtype="datetime64[ns]").astype("int64")
+        state = self._states.get(key)
+        if state is None or not state.covers(times):
+            state = _SeriesState(IncrementalIndicators(self.indicators), self.history)
+            self._states[key] = state
+            return state.warm_up(df, times)
+        return state.advance(df, times)
 
-    if indicators.get("atr14", True):
-        prev_close = df["close"].shift(1)
-        tr = pd.concat(
-            [
-                df["high"] - df["low"],
-                (df["high"] - prev_close).abs(),
-                (df["low"] - prev_close).abs(),
-            ],
-            axis=1,
-        ).max(axis=1)
-        df["atr14"] = tr.rolling(window=14).mean()
 
-    if indicators.get("rsi14", True):
-        delta = df["close"].diff()
-        gain = delta.clip(lower=0)
-        loss = -delta.clip(upper=0)
-        avg_gain = gain.rolling(window=14).mean()
-        avg_loss = loss.rolling(window=14).mean()
-        rs = avg_gain / avg_loss
-        df["rsi14"] = 100 - 100 / (1 + rs)
+class _SeriesState:
+    """Indicator state plus recent per-bar output for one series."""
 
-    if indicators.get("sma20", True):
-        df["sma20"] = df["close"].rolling(window=20).mean()
+    def __init__(self, calc: IncrementalIndicators, history: int) -> None:
+        self.calc = calc
+        self.history = max(1, history)
+        self.rows: dict[int, tuple[float, ...]] = {}
+        self.order: deque[int] = deque()
+        self.last_committed: int | None = None
 
-    if indicators.get("ema50", False):
-        df["ema50"] = df["close"].ewm(span=50, adjust=False).mean()
+    def _remember(self, ts: int, values: tuple[float, ...]) -> None:
+        if ts not in self.rows:
+            self.order.append(ts)
+        self.rows[ts] = values
+        while len(self.order) > self.history:
+            self.rows.pop(self.order.popleft(), None)
 
-    if indicators.get("sma200", False):
-        df["sma200"] = df["close"].rolling(window=200).mean()
+    def covers(self, times: np.ndarray) -> bool:
+        """Return ``True`` if *times* continue from the committed state."""
+        if self.last_committed is None:
+            return False
+        known = [t for t in times if t <= self.last_committed]
+        if not known or known[-1] != self.last_committed:
+            return False
+        return all(int(t) in self.rows for t in known)
 
-    return df
+    def warm_up(self, df: pd.DataFrame, times: np.ndarray) -> pd.DataFrame:
+        cols = self.calc.columns
+        committed = self.calc.warm_up(df.iloc[:-1])
+        values = committed[cols].to_numpy(dtype=float).reshape(len(committed), len(cols))
+        for ts, row in zip(times[:-1][-self.history:], values[-self.history:]):
+            self._remember(int(ts), tuple(row))
+        if len(times) > 1:
+            self.last_committed = int(times[-2])
+        last = df.iloc[-1]
+        forming = self.calc.peek(last["high"], last["low"], last["close"])
+        self._remember(int(times[-1]), tuple(forming[c] for c in cols))
+        out = df.copy()
+        for j, col in enumerate(cols):
+            out[col] = np.append(values[:, j], forming[col])
+        return out
 
+    def advance(self, df: pd.DataFrame, times: np.ndarray) -> pd.DataFrame:
+        cols = self.calc.columns
+        high = df["high"].to_numpy(dtype=float)
+        low = df["low"].to_numpy(dtype=float)
+        close = df["close"].to_numpy(dtype=float)
+        last = len(df) - 1
+        result = np.empty((len(df), len(cols)))
+        for i, ts in enumerate(times):
+            ts = int(ts)
+            if self.last_committed is not None and ts <= self.last_committed:
+                result[i] = self.rows[ts]
+                continue
+            if i == last:
+                values = self.calc.peek(high[i], low[i], close[i])
+            else:
+                values = self.calc.update(high[i], low[i], close[i])
+                self.last_committed = ts
+            row = tuple(values[c] for c in cols)
+            self._remember(ts, row)
+            result[i] = row
+        out = df.copy()
+        for j, col in enumerate(cols):
+            out[col] = result[:, j]
+        return out
@@ -2,26 +2,149 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, Optional
 
+import numpy as np
 import pandas as pd
 
+from .atomic_io import atomic_open
+
+try:  # optional speed-up for string columns
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# Rows joined per write when streaming to a file.
+_CHUNK_ROWS = 5000
+
+
+def _encode_generic(value: Any) -> str:
+    if isinstance(value, pd.Timestamp):
+        value = value.isoformat()
+    elif isinstance(value, np.generic):
+        value = value.item()
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _encode_str(value: str) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:  # e.g. lone surrogates
+            pass
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _encode_float(value: float) -> str:
+    # json.dumps spells the non-finite values this way
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "Infinity" if value > 0 else "-Infinity"
+    return float.__repr__(value)
+
+
+def _iso_strings(series: pd.Series, mask: np.ndarray) -> list[str]:
+    """Return ``Timestamp.isoformat()`` for a naive datetime64 *series*."""
+    values = series.to_numpy()
+    seconds = values.astype("datetime64[s]")
+    if ((seconds == values) | mask).all():
+        # whole seconds: isoformat() has no fractional part
+        text = np.datetime_as_string(seconds, unit="s")
+        return ['"' + s + '"' for s in text.tolist()]
+    return [_encode_generic(v) for v in series.tolist()]
 
-def write_json_no_nulls(df: pd.DataFrame, path: Path) -> None:
-    """Write *df* to *path* as JSON omitting null values.
+
+def _column_values(series: pd.Series) -> tuple[list[Optional[str]], bool]:
+    """Return the JSON text of every cell (``None`` for nulls) and whether any is null."""
+    mask = series.isna().to_numpy()
+    has_null = bool(mask.any())
+    dtype = series.dtype
+    values = series.to_numpy()
+    if not isinstance(dtype, np.dtype):
+        kind = "M" if isinstance(dtype, pd.DatetimeTZDtype) else "O"
+    else:
+        kind = dtype.kind
+    if kind == "f":
+        floats = values.astype(float)
+        if np.isinf(floats).any():
+            encoded = list(map(_encode_float, floats.tolist()))
+        else:
+            # nulls come out as "nan" here and are dropped below
+            encoded = list(map(float.__repr__, floats.tolist()))
+    elif kind in "iu":
+        encoded = list(map(int.__repr__, values.tolist()))
+    elif kind == "b":
+        encoded = ["true" if v else "false" for v in values.tolist()]
+    elif kind == "M" and isinstance(dtype, np.dtype):
+        encoded = _iso_strings(series, mask) if len(values) else []
+    elif pd.api.types.infer_dtype(series, skipna=True) == "string":
+        # labels such as timeframe/session repeat, so encode each distinct value once
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        table = [_encode_str(v) for v in uniques]
+        table.append(None)  # code -1 marks nulls
+        encoded = [table[c] for c in codes.tolist()]
+    else:
+        encoded = [
+            None if null else _encode_generic(v)
+            for v, null in zip(series.astype(object).tolist(), mask.tolist())
+        ]
+    if has_null:
+        encoded = [None if null else v for v, null in zip(encoded, mask.tolist())]
+    return encoded, has_null
+
+
+def _iter_rows(df: pd.DataFrame) -> Iterator[str]:
+    """Yield every row of *df* as a JSON object without its null cells."""
+    columns = []
+    any_null = False
+    for name in df.columns:
+        encoded, has_null = _column_values(df[name])
+        prefix = json.dumps(str(name), ensure_ascii=False) + ": "
+        columns.append([None if v is None else prefix + v for v in encoded])
+        any_null = any_null or has_null
+    if not columns:
+        for _ in range(len(df)):
+            yield "{}"
+        return
+    if any_null:
+        for parts in zip(*columns):
+            yield "{" + ", ".join([p for p in parts if p is not None]) + "}"
+    else:
+        for parts in zip(*columns):
+            yield "{" + ", ".join(parts) + "}"
+
+
+def _iter_chunks(df: pd.DataFrame) -> Iterator[str]:
+    rows = _iter_rows(df)
+    yield "["
+    first = True
+    while True:
+        chunk = [row for _, row in zip(range(_CHUNK_ROWS), rows)]
+        if not chunk:
+            break
+        yield ("" if first else ", ") + ", ".join(chunk)
+        first = False
+    yield "]"
+
+
+def dumps_no_nulls(df: pd.DataFrame) -> str:
+    """Return *df* as the JSON text written by :func:`write_json_no_nulls`.
 
     ``pandas.Timestamp`` values are converted to ISO formatted strings so that
-    ``json.dumps`` receives only serializable objects.
+    the output matches ``json.dumps(records, ensure_ascii=False)``.
+    Cells are encoded column by column, so no per-cell null checks run in
+    Python.
     """
+    return "".join(_iter_chunks(df))
+
+
+def write_json_no_nulls(df: pd.DataFrame, path: Path) -> None:
+    """Write *df* to *path* as JSON omitting null values.
 
-    records: list[dict[str, Any]] = []
-    for record in df.to_dict(orient="records"):
-        clean: dict[str, Any] = {}
-        for k, v in record.items():
-            if pd.isna(v):
-                continue
-            if isinstance(v, pd.Timestamp):
-                v = v.isoformat()
-            clean[k] = v
-        records.append(clean)
-    path.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+    Rows are streamed in chunks to a temporary file that then replaces
+    *path*, so readers never see a partly written file.
+    """
+    with atomic_open(path) as f:
+        for chunk in _iter_chunks(df):
+            f.write(chunk)
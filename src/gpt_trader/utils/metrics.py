@@ -0,0 +1,349 @@
+"""Latency spans for the live workflow.
+
+Each stage of a run is wrapped in :func:`span` (or reported with
+:func:`observe`). The stages are fetch, indicators, serialize, gpt,
+gpt_ttft, parse, order and notify. Every observation goes to two places:
+
+* the in-process :data:`REGISTRY`. It keeps a histogram, a last-value
+  gauge and a status counter per stage, and renders them in the
+  Prometheus text format, served by :func:`start_http_server`;
+* a JSON Lines file, one record per span, when ``GPT_TRADER_METRICS_JSONL``
+  names one.
+
+:func:`configure` reads the ``metrics`` section of the workflow config::
+
+    "metrics": {"enabled": true, "port": 9108, "host": "127.0.0.1",
+                "jsonl": "logs/metrics.jsonl", "gpt_warn_seconds": 30}
+
+It also exports the JSONL path to the environment. The fetch, send and
+parse scripts started by the scheduler therefore append their spans to
+the same file. :func:`ingest_jsonl` folds those spans into the
+scheduler's registry. Spans already in the file when the endpoint is
+configured belong to earlier processes and are skipped.
+
+:func:`gauge` sets point-in-time values such as queue depths. Gauges are
+only rendered by the registry; they are not written to the JSON Lines file.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator, Mapping, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+JSONL_ENV = "GPT_TRADER_METRICS_JSONL"
+PREFIX = "gpt_trader"
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+def _label_text(labels: tuple[tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Series:
+    __slots__ = ("buckets", "total", "count", "last")
+
+    def __init__(self, size: int) -> None:
+        self.buckets = [0] * size
+        self.total = 0.0
+        self.count = 0
+        self.last = 0.0
+
+
+class MetricsRegistry:
+    """Thread-safe store of stage durations, rendered for Prometheus."""
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS) -> None:
+        self.bucket_bounds = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: dict[tuple[tuple[str, str], ...], _Series] = {}
+        self._status: dict[tuple[tuple[str, str], ...], int] = {}
+        self._gauges: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+
+    def observe(self, stage: str, seconds: float, status: str = "ok", **labels: Any) -> None:
+        """Add one *seconds* observation for *stage*."""
+        key = (("stage", stage),) + tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.bucket_bounds))
+            for i, bound in enumerate(self.bucket_bounds):
+                if seconds <= bound:
+                    series.buckets[i] += 1
+            series.total += seconds
+            series.count += 1
+            series.last = seconds
+            status_key = key + (("status", status),)
+            self._status[status_key] = self._status.get(status_key, 0) + 1
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set the gauge ``gpt_trader_<name>`` for *labels* to *value*."""
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            self._gauges[(name, key)] = float(value)
+
+    def gauges(self) -> dict[str, float]:
+        """Return ``{"name[label=value,...]": value}`` for every gauge."""
+        with self._lock:
+            return {
+                name + "".join(f"[{k}={v}]" for k, v in key): value
+                for (name, key), value in self._gauges.items()
+            }
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        """Return ``{"stage[label=value,...]": {"count", "sum", "last"}}``."""
+        with self._lock:
+            return {
+                key[0][1] + "".join(f"[{k}={v}]" for k, v in key[1:]): {
+                    "count": s.count,
+                    "sum": s.total,
+                    "last": s.last,
+                }
+                for key, s in self._series.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._status.clear()
+            self._gauges.clear()
+
+    def render(self) -> str:
+        """Return every series in the Prometheus text exposition format."""
+        name = f"{PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Duration of live workflow stages in seconds.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+            status = sorted(self._status.items())
+            gauges = sorted(self._gauges.items())
+        for key, s in series:
+            for bound, count in zip(self.bucket_bounds, s.buckets):
+                le = 'le="%g"' % bound
+                lines.append(f"{name}_bucket{_label_text(key, le)} {count}")
+            le = 'le="+Inf"'
+            lines.append(f"{name}_bucket{_label_text(key, le)} {s.count}")
+            lines.append(f"{name}_sum{_label_text(key)} {s.total:.6f}")
+            lines.append(f"{name}_count{_label_text(key)} {s.count}")
+        last = f"{PREFIX}_stage_last_seconds"
+        lines += [
+            f"# HELP {last} Duration of the most recent run of each stage.",
+            f"# TYPE {last} gauge",
+        ]
+        lines += [f"{last}{_label_text(key)} {s.last:.6f}" for key, s in series]
+        runs = f"{PREFIX}_stage_runs_total"
+        lines += [
+            f"# HELP {runs} Stage runs by outcome.",
+            f"# TYPE {runs} counter",
+        ]
+        lines += [f"{runs}{_label_text(key)} {count}" for key, count in status]
+        typed = set()
+        for (gauge_name, key), value in gauges:
+            full = f"{PREFIX}_{gauge_name}"
+            if full not in typed:
+                lines.append(f"# TYPE {full} gauge")
+                typed.add(full)
+            lines.append(f"{full}{_label_text(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+_state_lock = threading.Lock()
+_warn_seconds: dict[str, float] = {}
+_server: Optional[ThreadingHTTPServer] = None
+_ingest_offsets: dict[str, int] = {}
+
+
+def _jsonl_path() -> Optional[Path]:
+    value = os.environ.get(JSONL_ENV)
+    return Path(value) if value else None
+
+
+def _write_jsonl(record: Mapping[str, Any]) -> None:
+    path = _jsonl_path()
+    if path is None:
+        return
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # one short append per span; concurrent writers do not interleave lines
+        with path.open("a", encoding="utf-8") as f:
+            f.write(line)
+    except OSError as exc:
+        LOGGER.warning("Failed to write metrics to %s: %s", path, exc)
+
+
+def observe(stage: str, seconds: float, status: str = "ok", **labels: Any) -> None:
+    """Record that *stage* took *seconds* and log it as a JSON line."""
+    REGISTRY.observe(stage, seconds, status, **labels)
+    record = {
+        "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "stage": stage,
+        "seconds": round(seconds, 6),
+        "status": status,
+        "pid": os.getpid(),
+    }
+    record.update({k: str(v) for k, v in labels.items()})
+    _write_jsonl(record)
+    limit = _warn_seconds.get(stage)
+    if limit is not None and seconds > limit:
+        LOGGER.warning("%s took %.2fs (limit %.2fs) %s", stage, seconds, limit, labels or "")
+
+
+def gauge(name: str, value: float, **labels: Any) -> None:
+    """Set the gauge *name* of :data:`REGISTRY` to *value*."""
+    REGISTRY.set_gauge(name, value, **labels)
+
+
+@contextmanager
+def span(stage: str, **labels: Any) -> Iterator[None]:
+    """Time the enclosed block as *stage*; exceptions mark it ``error``."""
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        observe(stage, time.perf_counter() - started, status, **labels)
+
+
+def _ingest_from_end(path: Optional[Path]) -> None:
+    """Skip the spans already in *path*; call with ``_state_lock`` held."""
+    if path is None or str(path) in _ingest_offsets:
+        return
+    try:
+        _ingest_offsets[str(path)] = path.stat().st_size
+    except OSError:  # not written yet
+        _ingest_offsets[str(path)] = 0
+
+
+def ingest_jsonl(path: Optional[Path | str] = None) -> int:
+    """Add the spans other processes appended to *path* since the last call.
+
+    Spans written by this process are already in :data:`REGISTRY` and are
+    skipped. Returns the number of spans added.
+    """
+    path = Path(path) if path is not None else _jsonl_path()
+    if path is None or not path.exists():
+        return 0
+    # scrapes run in parallel; each line must be read and counted once
+    with _state_lock:
+        return _ingest_locked(path)
+
+
+def _ingest_locked(path: Path) -> int:
+    key = str(path)
+    offset = _ingest_offsets.get(key, 0)
+    if path.stat().st_size < offset:  # rotated or truncated
+        offset = 0
+    added = 0
+    pid = os.getpid()
+    with path.open("rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # a writer is still appending this line
+            offset += len(raw)
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                continue
+            if record.get("pid") == pid:
+                continue
+            labels = {
+                k: v
+                for k, v in record.items()
+                if k not in ("time", "stage", "seconds", "status", "pid")
+            }
+            REGISTRY.observe(record["stage"], float(record["seconds"]), record["status"], **labels)
+            added += 1
+    _ingest_offsets[key] = offset
+    return added
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        ingest_jsonl()
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        LOGGER.debug("metrics http: " + format, *args)
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve :data:`REGISTRY` at ``http://host:port/metrics`` from a daemon thread."""
+    global _server
+    with _state_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+            LOGGER.info("Serving metrics on http://%s:%s/metrics", host, _server.server_port)
+            _ingest_from_end(_jsonl_path())
+        return _server
+
+
+def configure(config: Optional[Mapping[str, Any]]) -> None:
+    """Apply the ``metrics`` section of a workflow config.
+
+    Sets the JSON Lines path for this process and its children, the
+    per-stage warning thresholds and, when ``port`` is given, starts the
+    Prometheus endpoint.
+    """
+    config = config or {}
+    if not config.get("enabled", True):
+        return
+    if config.get("jsonl"):
+        os.environ[JSONL_ENV] = str(Path(config["jsonl"]).resolve())
+        with _state_lock:
+            _ingest_from_end(_jsonl_path())
+    if config.get("gpt_warn_seconds") is not None:
+        _warn_seconds["gpt"] = float(config["gpt_warn_seconds"])
+    for stage, seconds in (config.get("warn_seconds") or {}).items():
+        _warn_seconds[stage] = float(seconds)
+    if config.get("port") is not None:
+        try:
+            start_http_server(int(config["port"]), str(config.get("host", "127.0.0.1")))
+        except OSError as exc:
+            LOGGER.error("Failed to start metrics endpoint: %s", exc)
+
+
+__all__ = [
+    "BUCKETS",
+    "JSONL_ENV",
+    "MetricsRegistry",
+    "REGISTRY",
+    "configure",
+    "gauge",
+    "ingest_jsonl",
+    "observe",
+    "span",
+    "start_http_server",
+]
@@ -0,0 +1,205 @@
+"""Shared MetaTrader5 terminal session.
+
+The MetaTrader5 package talks to a single terminal per process, so every
+module that needs it goes through one :class:`Mt5Session` per ``mt5``
+module object. The session
+
+* counts users with :meth:`~Mt5Session.acquire` / :meth:`~Mt5Session.release`
+  and only calls ``mt5.shutdown()`` when the last one is gone and the
+  session is not marked ``persistent``,
+* serializes calls from several threads or tasks with a re-entrant lock,
+* reconnects with exponential backoff when ``initialize()`` fails or
+  ``terminal_info()`` stops answering, and
+* can ping ``terminal_info()`` on a background timer.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Mt5Session:
+    """Reference-counted, self-healing connection to the MT5 terminal.
+
+    Parameters
+    ----------
+    mt5:
+        The ``MetaTrader5`` module (or a stand-in with the same functions).
+    max_attempts:
+        ``initialize()`` attempts per connect before giving up.
+    base_delay, max_delay:
+        Backoff between attempts in seconds, doubled after each failure.
+    init_kwargs:
+        Keyword arguments for ``initialize()``, e.g. ``path`` or ``login``.
+    """
+
+    def __init__(
+        self,
+        mt5: Any,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        init_kwargs: Optional[Dict[str, Any]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.mt5 = mt5
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.init_kwargs = dict(init_kwargs or {})
+        self.persistent = False
+        self.lock = threading.RLock()
+        self.reconnects = 0
+        self._sleep = sleep
+        self._users = 0
+        self._connected = False
+        self._timer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    # -- connection ------------------------------------------------------
+    def _initialize(self) -> bool:
+        if self.init_kwargs:
+            return bool(self.mt5.initialize(**self.init_kwargs))
+        return bool(self.mt5.initialize())
+
+    def connect(self) -> None:
+        """Open the terminal connection, retrying with backoff.
+
+        Raises ``RuntimeError`` with the last MT5 error when every attempt
+        fails.
+        """
+        with self.lock:
+            delay = self.base_delay
+            for attempt in range(1, self.max_attempts + 1):
+                if self._initialize():
+                    self._connected = True
+                    return
+                error = self._last_error()
+                LOGGER.warning("MT5 initialize() failed (attempt %s): %s", attempt, error)
+                if attempt < self.max_attempts:
+                    self._sleep(delay)
+                    delay = min(self.max_delay, delay * 2)
+            self._connected = False
+            raise RuntimeError(f"MT5 initialize() failed: {error}")
+
+    def _last_error(self) -> Any:
+        last_error = getattr(self.mt5, "last_error", None)
+        return last_error() if last_error is not None else None
+
+    def healthy(self) -> bool:
+        """Return ``True`` if the terminal answers ``terminal_info()``."""
+        if not self._connected:
+            return False
+        terminal_info = getattr(self.mt5, "terminal_info", None)
+        if terminal_info is None:
+            return True
+        try:
+            return terminal_info() is not None
+        except Exception:  # noqa: BLE001
+            return False
+
+    def ensure(self) -> None:
+        """Connect, or reconnect when the terminal stopped answering."""
+        with self.lock:
+            if self.healthy():
+                return
+            if self._connected:
+                LOGGER.warning("MT5 terminal not responding; reconnecting")
+                self.reconnects += 1
+                self._shutdown()
+            self.connect()
+
+    def _shutdown(self) -> None:
+        try:
+            self.mt5.shutdown()
+        finally:
+            self._connected = False
+
+    # -- users -----------------------------------------------------------
+    def acquire(self) -> Any:
+        """Register a user, connecting if needed, and return the module."""
+        with self.lock:
+            self.ensure()
+            self._users += 1
+            return self.mt5
+
+    def release(self) -> None:
+        """Unregister a user; shut down when it was the last one."""
+        with self.lock:
+            self._users = max(0, self._users - 1)
+            if self._users == 0 and not self.persistent and self._connected:
+                self._shutdown()
+
+    @contextmanager
+    def use(self) -> Iterator[Any]:
+        """Hold the lock and a connection for the duration of the block."""
+        with self.lock:
+            mt5 = self.acquire()
+            try:
+                yield mt5
+            finally:
+                self.release()
+
+    # -- health check ----------------------------------------------------
+    def start_health_check(self, interval: float = 30.0) -> None:
+        """Ping the terminal every *interval* seconds on a daemon thread."""
+        if self._timer is not None:
+            return
+        self._stop.clear()
+
+        def _loop() -> None:
+            while not self._stop.wait(interval):
+                with self.lock:
+                    if self._users == 0 and not self.persistent:
+                        continue
+                    try:
+                        self.ensure()
+                    except Exception as exc:  # noqa: BLE001
+                        LOGGER.error("MT5 health check failed: %s", exc)
+
+        self._timer = threading.Thread(target=_loop, name="mt5-health", daemon=True)
+        self._timer.start()
+
+    def stop_health_check(self) -> None:
+        if self._timer is None:
+            return
+        self._stop.set()
+        self._timer.join(timeout=5)
+        self._timer = None
+
+    def close(self) -> None:
+        """Stop the health check and shut the terminal connection down."""
+        self.stop_health_check()
+        with self.lock:
+            self.persistent = False
+            self._users = 0
+            if self._connected:
+                self._shutdown()
+
+
+_SESSIONS: Dict[int, Mt5Session] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def get_mt5_session(mt5: Any = None) -> Mt5Session:
+    """Return the shared session for *mt5* (the real module by default)."""
+    if mt5 is None:
+        import MetaTrader5 as mt5
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(id(mt5))
+        if session is None or session.mt5 is not mt5:
+            session = Mt5Session(mt5)
+            _SESSIONS[id(mt5)] = session
+        return session
+
+
+__all__ = ["Mt5Session", "get_mt5_session"]
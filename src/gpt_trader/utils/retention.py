@@ -0,0 +1,283 @@
+"""Age and count limits for the artifact directories.
+
+Every live run adds a fetch CSV/JSON pair, a prompt copy and a signal
+JSON. A retention rule keeps the newest files of one directory. Files
+that are older than ``max_age_days``, or beyond the newest ``max_files``,
+are compacted into daily archives and then removed::
+
+    "retention": {
+        "enabled": true,
+        "interval_minutes": 60,
+        "dirs": [
+            {"path": "data/live_trade/fetch", "max_age_days": 7, "max_files": 2000},
+            {"path": "data/live_trade/save_prompt_api", "max_age_days": 3, "archive": false}
+        ]
+    }
+
+Without ``dirs`` the fetch, prompt and signal directories of the config
+are used with ``max_age_days`` (default 14) and ``max_files``.
+
+An archive is one gzip-compressed JSON Lines file per day (UTC date of the
+file's mtime) at ``<archive_dir>/<YYYYMMDD>.jsonl.gz``. By default,
+``<archive_dir>`` is ``archive`` inside the directory. Each line holds
+``name``, ``mtime`` and the original ``text``. :func:`iter_archive` and
+:func:`read_archived` read them back. ``"archive": false`` deletes
+expired files instead. Files whose names start with a dot, such as the
+artifact index and temporary files, are never touched.
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Mapping, Optional
+
+from gpt_trader.utils.artifact_index import INDEX_NAME, ArtifactIndex
+
+LOGGER = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIX = ".jsonl.gz"
+DEFAULT_MAX_AGE_DAYS = 14
+_DAY = 86400
+
+
+class RetentionRule:
+    """Limits for the files matching *pattern* directly inside *path*."""
+
+    __slots__ = ("path", "pattern", "max_age_days", "max_files", "archive_dir")
+
+    def __init__(
+        self,
+        path: Path | str,
+        pattern: str = "*",
+        max_age_days: Optional[float] = DEFAULT_MAX_AGE_DAYS,
+        max_files: Optional[int] = None,
+        archive: bool = True,
+        archive_dir: Optional[Path | str] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.pattern = pattern
+        self.max_age_days = None if max_age_days is None else float(max_age_days)
+        self.max_files = None if max_files is None else int(max_files)
+        if not archive:
+            self.archive_dir = None
+        else:
+            self.archive_dir = Path(archive_dir) if archive_dir else self.path / "archive"
+
+    def __repr__(self) -> str:
+        return (
+            f"RetentionRule({str(self.path)!r}, max_age_days={self.max_age_days}, "
+            f"max_files={self.max_files}, archive_dir={self.archive_dir})"
+        )
+
+
+def retention_rules(config: Mapping[str, Any]) -> list[RetentionRule]:
+    """Return the rules of the ``retention`` section of a workflow *config*."""
+    section = config.get("retention") or {}
+    entries = section.get("dirs")
+    if entries is None:
+        defaults = {
+            "max_age_days": section.get("max_age_days", DEFAULT_MAX_AGE_DAYS),
+            "max_files": section.get("max_files"),
+        }
+        paths = [
+            (config.get("fetch") or {}).get("save_as_path"),
+            (config.get("send") or {}).get("save_prompt_dir"),
+            (config.get("parse") or {}).get("path_signals_json"),
+        ]
+        entries = [dict(defaults, path=p) for p in paths if p]
+    rules = []
+    for entry in entries:
+        if "path" not in entry:
+            raise ValueError(f"Retention entry needs 'path': {entry}")
+        rules.append(
+            RetentionRule(
+                entry["path"],
+                pattern=entry.get("pattern", "*"),
+                max_age_days=entry.get("max_age_days", DEFAULT_MAX_AGE_DAYS),
+                max_files=entry.get("max_files"),
+                archive=entry.get("archive", True),
+                archive_dir=entry.get("archive_dir"),
+            )
+        )
+    return rules
+
+
+def _list_files(rule: RetentionRule) -> list[tuple[float, str]]:
+    files = []
+    with os.scandir(rule.path) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            if fnmatch.fnmatch(entry.name, rule.pattern):
+                files.append((entry.stat().st_mtime, entry.name))
+    files.sort()
+    return files
+
+
+def expired_files(rule: RetentionRule, now: Optional[float] = None) -> list[Path]:
+    """Return the files of *rule* that exceed its age or count limit, oldest first."""
+    if not rule.path.is_dir():
+        return []
+    now = time.time() if now is None else now
+    files = _list_files(rule)
+    cut = 0
+    if rule.max_files is not None:
+        cut = max(0, len(files) - rule.max_files)
+    if rule.max_age_days is not None:
+        limit = now - rule.max_age_days * _DAY
+        while cut < len(files) and files[cut][0] < limit:
+            cut += 1
+    return [rule.path / name for _, name in files[:cut]]
+
+
+def _day_code(mtime: float) -> str:
+    return datetime.fromtimestamp(mtime, timezone.utc).strftime("%Y%m%d")
+
+
+def compact_files(files: list[Path], archive_dir: Path) -> list[Path]:
+    """Append *files* to the daily archives in *archive_dir*.
+
+    Returns the archived files; files that are not UTF-8 text are skipped.
+    Each run adds one gzip member per day, which gzip readers treat as one
+    continuous stream.
+    """
+    days: dict[str, list[str]] = {}
+    archived = []
+    for path in files:
+        stat = path.stat()
+        try:
+            text = path.read_text(encoding="utf-8")
+        except UnicodeDecodeError:
+            LOGGER.warning("Skipping non-text file %s", path)
+            continue
+        record = {"name": path.name, "mtime": stat.st_mtime, "text": text}
+        days.setdefault(_day_code(stat.st_mtime), []).append(
+            json.dumps(record, ensure_ascii=False)
+        )
+        archived.append(path)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    for day, lines in days.items():
+        member = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+        with (archive_dir / f"{day}{ARCHIVE_SUFFIX}").open("ab") as f:
+            f.write(member)
+            f.flush()
+            os.fsync(f.fileno())
+    return archived
+
+
+def apply_rule(rule: RetentionRule, now: Optional[float] = None) -> dict[str, int]:
+    """Archive and remove the expired files of *rule*."""
+    expired = expired_files(rule, now)
+    stats = {"archived": 0, "deleted": 0}
+    if not expired:
+        return stats
+    if rule.archive_dir is not None:
+        # the sources are only removed once their archive is on disk
+        expired = compact_files(expired, rule.archive_dir)
+        stats["archived"] = len(expired)
+    removed = []
+    for path in expired:
+        try:
+            path.unlink()
+        except OSError as exc:
+            LOGGER.warning("Failed to remove %s: %s", path, exc)
+            continue
+        removed.append(path)
+    stats["deleted"] = len(removed)
+    if removed and (rule.path / INDEX_NAME).exists():
+        try:
+            with ArtifactIndex(rule.path) as index:
+                index.remove(*removed)
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.warning("Failed to update artifact index in %s: %s", rule.path, exc)
+    return stats
+
+
+def run_retention(
+    config: Mapping[str, Any], now: Optional[float] = None
+) -> dict[str, dict[str, int]]:
+    """Apply every rule of *config*; return the stats per directory."""
+    results = {}
+    for rule in retention_rules(config):
+        try:
+            stats = apply_rule(rule, now)
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.error("Retention failed for %s: %s", rule.path, exc)
+            continue
+        if stats["archived"] or stats["deleted"]:
+            LOGGER.info(
+                "Retention %s: archived %s, deleted %s",
+                rule.path,
+                stats["archived"],
+                stats["deleted"],
+            )
+        results[str(rule.path)] = stats
+    return results
+
+
+def iter_archive(
+    archive_dir: Path | str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    pattern: str = "*",
+) -> Iterator[dict[str, Any]]:
+    """Yield the archived records of the days ``start``..``end`` (``YYYYMMDD``).
+
+    Only records whose ``name`` matches *pattern* are returned.
+    """
+    for path in sorted(Path(archive_dir).glob(f"*{ARCHIVE_SUFFIX}")):
+        day = path.name[: -len(ARCHIVE_SUFFIX)]
+        if (start and day < start) or (end and day > end):
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if fnmatch.fnmatch(record["name"], pattern):
+                    yield record
+
+
+def read_archived(archive_dir: Path | str, name: str) -> Optional[str]:
+    """Return the text of the archived file *name*, or ``None``."""
+    found = None
+    for record in iter_archive(archive_dir, pattern=name):
+        found = record["text"]  # the last copy wins
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive and prune old artifacts")
+    parser.add_argument(
+        "--config", default="config/setting_live_trade.json", help="Workflow config"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    config = json.loads(Path(args.config).read_text(encoding="utf-8"))
+    for path, stats in run_retention(config).items():
+        LOGGER.info("%s: archived %s, deleted %s", path, stats["archived"], stats["deleted"])
+
+
+__all__ = [
+    "ARCHIVE_SUFFIX",
+    "RetentionRule",
+    "apply_rule",
+    "compact_files",
+    "expired_files",
+    "iter_archive",
+    "read_archived",
+    "retention_rules",
+    "run_retention",
+]
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main()
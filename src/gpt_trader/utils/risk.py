@@ -0,0 +1,105 @@
+"""Position sizing shared by the MT5 order sender and the trade simulator.
+
+:func:`calculate_lot` holds the lot formula of
+:meth:`~gpt_trader.cli.latest_signal_to_mt5.TradeSignalSender.calculate_lot`
+without the MetaTrader5 import. :func:`calculate_lots` applies the same
+formula to arrays so thousands of simulated orders are sized at once.
+"""
+from __future__ import annotations
+
+from typing import Mapping, Optional
+
+import numpy as np
+
+DEFAULT_MAX_DRAWDOWN = 15.0
+
+
+def risk_percent(
+    confidence: float,
+    signal: Optional[Mapping] = None,
+    risk_per_trade: Optional[float] = None,
+    max_risk_per_trade: Optional[float] = None,
+) -> float:
+    """Return the percent of the balance risked on one order.
+
+    Follows the order sender: with *max_risk_per_trade* the risk scales with
+    *confidence*; otherwise a fixed *risk_per_trade*, the signal's own
+    ``risk_per_trade`` or a tenth of its ``max_drawdown`` is used.
+    """
+    if max_risk_per_trade is not None:
+        return min(float(max_risk_per_trade), (confidence / 100) * float(max_risk_per_trade))
+    if risk_per_trade is not None:
+        return float(risk_per_trade)
+    signal = signal or {}
+    max_drawdown = float(signal.get("max_drawdown", DEFAULT_MAX_DRAWDOWN))
+    return float(signal.get("risk_per_trade", max_drawdown / 10))
+
+
+def calculate_lot(
+    balance: float,
+    risk_per_trade: float,
+    entry: float,
+    sl: float,
+    tick_value: float,
+    tick_size: float,
+    volume_min: float,
+    volume_max: float,
+    volume_step: float,
+) -> float:
+    """Return the lot that loses *risk_per_trade* percent of *balance* at *sl*.
+
+    The lot is clamped to ``[volume_min, volume_max]`` and rounded to a
+    multiple of *volume_step*.
+
+    Raises
+    ------
+    ValueError
+        If *risk_per_trade* is not positive or *sl* equals *entry*.
+    """
+    if risk_per_trade <= 0:
+        raise ValueError("risk_per_trade must be positive")
+
+    sl_distance = abs(entry - sl)
+    if sl_distance == 0:
+        raise ValueError("SL must not equal entry")
+
+    pip_value = tick_value / tick_size if tick_size else 10
+    risk_amount = balance * (risk_per_trade / 100)
+    lot = risk_amount / (sl_distance * pip_value)
+
+    # align to broker limits
+    lot = max(volume_min, min(volume_max, lot))
+    steps = round(lot / volume_step)
+    lot = steps * volume_step
+    return round(lot, 2)
+
+
+def calculate_lots(
+    balance: float,
+    risk_per_trade: np.ndarray,
+    entry: np.ndarray,
+    sl: np.ndarray,
+    tick_value: float,
+    tick_size: float,
+    volume_min: float,
+    volume_max: float,
+    volume_step: float,
+) -> np.ndarray:
+    """Vectorized :func:`calculate_lot`.
+
+    Rows with a non-positive risk or a zero SL distance get ``nan`` instead
+    of raising.
+    """
+    risk = np.asarray(risk_per_trade, dtype=float)
+    sl_distance = np.abs(np.asarray(entry, dtype=float) - np.asarray(sl, dtype=float))
+    valid = (risk > 0) & (sl_distance > 0)
+    pip_value = tick_value / tick_size if tick_size else 10
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lot = balance * (risk / 100) / (sl_distance * pip_value)
+    lot = np.clip(lot, volume_min, volume_max)
+    # np.round and round() both round halves to even
+    lot = np.round(np.round(lot / volume_step) * volume_step, 2)
+    return np.where(valid, lot, np.nan)
+
+
+__all__ = ["DEFAULT_MAX_DRAWDOWN", "calculate_lot", "calculate_lots", "risk_percent"]
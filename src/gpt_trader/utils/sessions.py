@@ -0,0 +1,174 @@
+"""Vectorized trading-session labels driven by a session table.
+
+A session table is a list of entries such as ``{"name": "london", "start":
+"08:00", "end": "16:30", "tz": "Europe/London"}``. Times are wall-clock
+times; an ``end`` before ``start`` wraps past midnight. Without ``tz`` the
+hours are read directly from the bar timestamps, which is how the built-in
+tables of the fetchers work. With ``tz`` the boundaries follow that zone's
+daylight saving changes; the bar timestamps are then converted using
+``utc_offset``, the number of hours the timestamps are ahead of UTC.
+
+Rows get the name of the first session in table order that contains them,
+or the table's ``default`` label. Overlap flags such as
+``overlap_london_newyork`` mark rows inside all of the listed sessions.
+
+The whole column is classified from the minute-of-day array, so no Python
+object is built per row.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+
+_NS_PER_MINUTE = 60_000_000_000
+_MINUTES_PER_DAY = 24 * 60
+
+# Reproduce ``fetch_mt5_data.get_session`` (Thai time, 18:00-19:00 closed).
+MT5_SESSIONS: list[dict[str, Any]] = [
+    {"name": "asia", "start": "05:00", "end": "14:00"},
+    {"name": "london", "start": "14:00", "end": "18:00"},
+    {"name": "newyork", "start": "19:00", "end": "05:00"},
+]
+
+# Reproduce ``fetch_yf_data.get_session``.
+YF_SESSIONS: list[dict[str, Any]] = [
+    {"name": "asia", "start": "00:00", "end": "08:00"},
+    {"name": "london", "start": "08:00", "end": "16:00"},
+    {"name": "newyork", "start": "16:00", "end": "24:00"},
+]
+
+
+def _minute_of_day(value: str) -> int:
+    hours, _, minutes = str(value).partition(":")
+    total = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= total <= _MINUTES_PER_DAY:
+        raise ValueError(f"Session time must be HH:MM between 00:00 and 24:00: {value}")
+    return total
+
+
+class Session:
+    """One row of a session table."""
+
+    __slots__ = ("name", "start", "end", "tz")
+
+    def __init__(self, name: str, start: str, end: str, tz: Optional[str] = None) -> None:
+        self.name = str(name)
+        self.start = _minute_of_day(start)
+        self.end = _minute_of_day(end)
+        self.tz = tz or None
+
+    def __repr__(self) -> str:
+        return f"Session({self.name!r}, {self.start}, {self.end}, tz={self.tz!r})"
+
+    def contains(self, minutes: np.ndarray) -> np.ndarray:
+        """Return a mask of the minute-of-day values inside this session."""
+        if self.start <= self.end:
+            return (minutes >= self.start) & (minutes < self.end)
+        return (minutes >= self.start) | (minutes < self.end)
+
+
+def parse_sessions(table: Iterable[Mapping[str, Any]]) -> list[Session]:
+    """Return :class:`Session` objects for the entries of *table*."""
+    sessions = []
+    for item in table:
+        if "name" not in item or "start" not in item or "end" not in item:
+            raise ValueError(f"Session needs 'name', 'start' and 'end': {item}")
+        sessions.append(Session(item["name"], item["start"], item["end"], item.get("tz")))
+    return sessions
+
+
+def _local_minutes(
+    times: pd.Series, tz: Optional[str], utc_offset: Optional[float]
+) -> np.ndarray:
+    if tz is None:
+        ns = times.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        return (ns // _NS_PER_MINUTE) % _MINUTES_PER_DAY
+    if utc_offset is None:
+        raise ValueError("Sessions with 'tz' need 'utc_offset' for the bar timestamps")
+    utc = pd.DatetimeIndex(times) - pd.Timedelta(hours=float(utc_offset))
+    local = utc.tz_localize("UTC").tz_convert(tz)
+    return local.hour.to_numpy() * 60 + local.minute.to_numpy()
+
+
+def session_masks(
+    times: pd.Series,
+    sessions: Sequence[Session],
+    utc_offset: Optional[float] = None,
+) -> dict[str, np.ndarray]:
+    """Return one boolean mask per session name for *times*."""
+    minutes: dict[Optional[str], np.ndarray] = {}
+    masks: dict[str, np.ndarray] = {}
+    for session in sessions:
+        if session.tz not in minutes:
+            minutes[session.tz] = _local_minutes(times, session.tz, utc_offset)
+        mask = session.contains(minutes[session.tz])
+        masks[session.name] = masks[session.name] | mask if session.name in masks else mask
+    return masks
+
+
+def _labels(masks: Mapping[str, np.ndarray], default: str, size: int) -> np.ndarray:
+    if not masks:
+        return np.full(size, default, dtype=object)
+    return np.select(list(masks.values()), list(masks.keys()), default=default).astype(object)
+
+
+def label_sessions(
+    times: pd.Series,
+    sessions: Sequence[Session],
+    default: str = "closed",
+    utc_offset: Optional[float] = None,
+) -> np.ndarray:
+    """Return the session name of every timestamp in *times*."""
+    masks = session_masks(times, sessions, utc_offset)
+    return _labels(masks, default, len(times))
+
+
+def overlap_flags(
+    masks: Mapping[str, np.ndarray], overlaps: Iterable[Sequence[str]]
+) -> dict[str, np.ndarray]:
+    """Return ``overlap_<a>_<b>`` flags for every group of session names."""
+    flags = {}
+    for group in overlaps:
+        missing = [name for name in group if name not in masks]
+        if missing:
+            raise ValueError(f"Unknown session in overlap: {missing}")
+        flags["overlap_" + "_".join(group)] = np.logical_and.reduce([masks[n] for n in group])
+    return flags
+
+
+def apply_sessions(
+    df: pd.DataFrame,
+    config: Optional[Mapping[str, Any]],
+    default_table: Sequence[Mapping[str, Any]],
+) -> list[str]:
+    """Add the ``session`` column and overlap flags to *df* in place.
+
+    *config* is the ``sessions`` section of a fetch config with the keys
+    ``table``, ``default``, ``utc_offset`` and ``overlaps``; *default_table*
+    is used when it has no ``table``. Returns the added overlap columns.
+    """
+    config = config or {}
+    sessions = parse_sessions(config.get("table") or default_table)
+    masks = session_masks(df["timestamp"], sessions, config.get("utc_offset"))
+    df["session"] = _labels(masks, str(config.get("default", "closed")), len(df))
+    flags = overlap_flags(masks, config.get("overlaps") or [])
+    for column, flag in flags.items():
+        df[column] = flag
+    return list(flags)
+
+
+__all__ = [
+    "MT5_SESSIONS",
+    "YF_SESSIONS",
+    "Session",
+    "apply_sessions",
+    "label_sessions",
+    "overlap_flags",
+    "parse_sessions",
+    "session_masks",
+]
@@ -0,0 +1,106 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from gpt_trader.cli.scheduler_liveTrade import _load_latest_signal
+from gpt_trader.send.send_to_gpt import _find_latest_json
+from gpt_trader.utils.artifact_index import (
+    INDEX_NAME,
+    ArtifactIndex,
+    latest_artifact,
+    record_artifact,
+    signal_symbol,
+)
+
+
+def _write(path: Path, data: dict, mtime: float) -> Path:
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_signal_symbol() -> None:
+    assert signal_symbol("XAUUSD1718000000") == "xauusd"
+    assert signal_symbol("250616_153045") == ""
+    assert signal_symbol(None) == ""
+
+
+def test_latest_per_symbol(tmp_path: Path) -> None:
+    for name, ts in [("xauusd1.json", 100), ("eurusd2.json", 300), ("xauusd3.json", 200)]:
+        record_artifact(_write(tmp_path / name, {}, ts), signal_symbol(name))
+    assert latest_artifact(tmp_path).name == "eurusd2.json"
+    assert latest_artifact(tmp_path, "XAUUSD").name == "xauusd3.json"
+    with pytest.raises(FileNotFoundError):
+        latest_artifact(tmp_path, "gbpusd")
+
+
+def test_missing_index_is_built_from_scan(tmp_path: Path) -> None:
+    _write(tmp_path / "a.json", {"n": 1}, 100)
+    _write(tmp_path / "b.json", {"n": 2}, 200)
+    assert _find_latest_json(tmp_path).name == "b.json"
+    assert (tmp_path / INDEX_NAME).exists()
+    with ArtifactIndex(tmp_path) as index:
+        assert len(index) == 2
+
+    # a later writer is found without scanning
+    record_artifact(_write(tmp_path / "c.json", {"n": 3}, 300))
+    assert _load_latest_signal(tmp_path) == {"n": 3}
+
+
+def test_first_record_indexes_existing_files(tmp_path: Path) -> None:
+    _write(tmp_path / "xauusd1.json", {}, 100)
+    record_artifact(_write(tmp_path / "eurusd2.json", {}, 200), "eurusd")
+    assert latest_artifact(tmp_path, "xauusd").name == "xauusd1.json"
+
+
+def test_deleted_files_are_skipped(tmp_path: Path) -> None:
+    record_artifact(_write(tmp_path / "a.json", {}, 100))
+    record_artifact(_write(tmp_path / "b.json", {}, 200))
+    (tmp_path / "b.json").unlink()
+    assert latest_artifact(tmp_path).name == "a.json"
+    (tmp_path / "a.json").unlink()
+    with pytest.raises(FileNotFoundError):
+        latest_artifact(tmp_path)
+
+
+def test_empty_directory(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        _find_latest_json(tmp_path / "missing")
+    assert not (tmp_path / "missing").exists()
+
+
+def test_files_from_non_recording_writers_are_found(tmp_path: Path) -> None:
+    record_artifact(_write(tmp_path / "xauusd1.json", {"n": 1}, 100), "xauusd")
+    assert _find_latest_json(tmp_path).name == "xauusd1.json"
+
+    # a custom fetch script writes without calling record_artifact
+    _write(tmp_path / "xauusd2.json", {"n": 2}, 200)
+    assert _find_latest_json(tmp_path, "xauusd").name == "xauusd2.json"
+    assert _load_latest_signal(tmp_path) == {"n": 2}
+
+    # an unchanged directory is not listed again
+    with ArtifactIndex(tmp_path) as index:
+        assert index.sync() == 0
+    (tmp_path / "xauusd2.json").unlink()
+    assert latest_artifact(tmp_path).name == "xauusd1.json"
+
+
+def test_ticks_do_not_list_the_directory(tmp_path: Path, monkeypatch) -> None:
+    record_artifact(_write(tmp_path / "xauusd1.json", {}, 100), "xauusd")
+    listings = []
+    glob = Path.glob
+    monkeypatch.setattr(Path, "glob", lambda self, p: listings.append(p) or glob(self, p))
+    for tick in range(2, 5):
+        record_artifact(_write(tmp_path / f"xauusd{tick}.json", {}, tick * 100), "xauusd")
+        assert latest_artifact(tmp_path, "xauusd").name == f"xauusd{tick}.json"
+    assert listings == []
+
+    # a file hidden behind a recorded write is found by the periodic listing
+    _write(tmp_path / "xauusd9.json", {}, 900)
+    record_artifact(_write(tmp_path / "xauusd5.json", {}, 500), "xauusd")
+    assert latest_artifact(tmp_path).name == "xauusd5.json"
+    monkeypatch.setattr("gpt_trader.utils.artifact_index.SYNC_INTERVAL", 0.0)
+    assert latest_artifact(tmp_path).name == "xauusd9.json"
+    assert listings
@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from gpt_trader.utils import atomic_io
+from gpt_trader.utils.atomic_io import (
+    atomic_open,
+    atomic_write_csv,
+    atomic_write_json,
+    atomic_write_text,
+    set_fsync_policy,
+)
+
+
+def test_write_text_replaces_file(tmp_path: Path) -> None:
+    out = tmp_path / "sub" / "latest.json"
+    atomic_write_text(out, '{"a": 1}')
+    atomic_write_text(out, '{"a": 2}')
+    assert json.loads(out.read_text(encoding="utf-8")) == {"a": 2}
+    assert [p.name for p in out.parent.iterdir()] == ["latest.json"]
+
+
+def test_failed_write_keeps_old_file(tmp_path: Path) -> None:
+    out = tmp_path / "signal.json"
+    atomic_write_json(out, {"entry": 1})
+    with pytest.raises(RuntimeError):
+        with atomic_open(out) as f:
+            f.write('{"entry": ')
+            raise RuntimeError("boom")
+    assert json.loads(out.read_text(encoding="utf-8")) == {"entry": 1}
+    assert list(tmp_path.iterdir()) == [out]
+
+
+def test_reader_never_sees_partial_file(tmp_path: Path) -> None:
+    out = tmp_path / "data.json"
+    atomic_write_json(out, [1])
+    with atomic_open(out) as f:
+        f.write("[1, 2")
+        assert json.loads(out.read_text(encoding="utf-8")) == [1]
+        f.write("]")
+    assert json.loads(out.read_text(encoding="utf-8")) == [1, 2]
+
+
+def test_csv_and_fsync_policies(tmp_path: Path, monkeypatch) -> None:
+    synced = []
+    monkeypatch.setattr(atomic_io.os, "fsync", lambda fd: synced.append(fd))
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    out = tmp_path / "data.csv"
+    atomic_write_csv(df, out, fsync="never")
+    assert synced == []
+    atomic_write_csv(df, out, fsync="always")
+    assert len(synced) == 2  # file and directory
+    pd.testing.assert_frame_equal(pd.read_csv(out), df)
+
+    with pytest.raises(ValueError):
+        set_fsync_policy("sometimes")
+
+
+def test_replace_retries_while_reader_holds_file(tmp_path: Path, monkeypatch) -> None:
+    calls = []
+    replace = atomic_io.os.replace
+
+    def _locked(src, dst):
+        calls.append(dst)
+        if len(calls) <= 2:
+            raise PermissionError(13, "The process cannot access the file")
+        replace(src, dst)
+
+    monkeypatch.setattr(atomic_io.os, "replace", _locked)
+    monkeypatch.setattr(atomic_io.time, "sleep", lambda s: None)
+    out = tmp_path / "latest_response.json"
+    atomic_write_json(out, {"ok": True})
+    assert len(calls) == 3
+    assert json.loads(out.read_text(encoding="utf-8")) == {"ok": True}
+
+    calls.clear()
+    monkeypatch.setattr(atomic_io, "REPLACE_ATTEMPTS", 2)
+    with pytest.raises(PermissionError):
+        atomic_write_json(out, {"ok": False})
+    assert len(calls) == 2
+    assert [p.name for p in tmp_path.iterdir()] == ["latest_response.json"]
@@ -0,0 +1,222 @@
+import asyncio
+import csv
+import importlib
+import json
+import sys
+from types import ModuleType, SimpleNamespace
+from unittest.mock import patch
+
+import pandas as pd
+
+from gpt_trader.backtest.engine import BacktestEngine, BarHistory, backtest_steps
+from gpt_trader.fetch.bar_store import to_bar_array
+
+
+def _rates(start: str, periods: int, freq: str) -> list[dict]:
+    times = pd.date_range(start, periods=periods, freq=freq)
+    return [
+        {
+            "time": int(ts.timestamp()),
+            "open": float(i),
+            "high": float(i) + 1,
+            "low": float(i) - 1,
+            "close": float(i),
+            "tick_volume": i,
+            "spread": 0,
+            "real_volume": 0,
+        }
+        for i, ts in enumerate(times)
+    ]
+
+
+class _FakeClient:
+    def __init__(self) -> None:
+        self.messages: list = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages):
+        self.messages.append(messages)
+        signal_id = messages[1]["content"].split('"signal_id": "')[1].split('"')[0]
+        text = json.dumps(
+            {
+                "signal_id": signal_id,
+                "entry": 1.0,
+                "sl": 0.5,
+                "tp": 2.0,
+                "pending_order_type": "buy_limit",
+                "confidence": 60,
+            }
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class _FakeAsyncClient(_FakeClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._acreate))
+
+    async def _acreate(self, model, messages):
+        # finish later requests first to exercise the ordered writer
+        await asyncio.sleep(0.001 * (10 - len(self.messages)))
+        return self._create(model, messages)
+
+
+def test_bar_history_window_is_point_in_time():
+    history = BarHistory()
+    history.add("TEST", "M1", _rates("2024-01-01", 10, "min"))
+    window = history("TEST", "M1", 3, pd.Timestamp("2024-01-01 00:05:30"))
+    assert window["close"].tolist() == [3.0, 4.0, 5.0]
+    assert len(history.window("TEST", "M1", 3, pd.Timestamp("2023-12-31"))) == 0
+
+
+def test_backtest_steps_inclusive():
+    steps = backtest_steps(
+        pd.Timestamp("2024-01-01 00:00").to_pydatetime(),
+        pd.Timestamp("2024-01-01 01:00").to_pydatetime(),
+        pd.Timedelta(minutes=30).to_pytimedelta(),
+    )
+    assert len(steps) == 3
+
+
+def _engine_config(tmp_path) -> dict:
+    return {
+        "fetch": {
+            "symbol": "TEST",
+            "tz_shift": 2,
+            "indicators": {"atr14": True, "rsi14": False, "sma20": True},
+            "timeframes": [{"tf": "M1", "keep": 5}, {"tf": "H1", "keep": 3}],
+        },
+        "send": {"model": "test-model"},
+        "parse": {"path_signals_json": str(tmp_path / "signals")},
+        "start_time": "2024-01-01 06:00:00",
+        "end_time": "2024-01-01 07:00:00",
+        "loop_every_minutes": 30,
+        "signal_table": str(tmp_path / "table.csv"),
+    }
+
+
+def _table_times(tmp_path) -> list:
+    with (tmp_path / "table.csv").open(encoding="utf-8") as f:
+        return [r["timestamp"] for r in csv.DictReader(f)]
+
+
+def _mt5_with_history(calls: list) -> ModuleType:
+    history = {1: _rates("2023-12-31", 2000, "min"), 5: _rates("2023-12-25", 300, "h")}
+    mt5 = ModuleType("MetaTrader5")
+    for i, name in enumerate(["M1", "M5", "M15", "M30", "H1", "H4", "D1"], start=1):
+        setattr(mt5, f"TIMEFRAME_{name}", i)
+
+    def _copy_range(symbol, tf, start, end):
+        calls.append(tf)
+        return to_bar_array(history[tf])
+
+    mt5.copy_rates_range = _copy_range
+    return mt5
+
+
+STEP_TIMES = ["2024-01-01T06:00:00", "2024-01-01T06:30:00", "2024-01-01T07:00:00"]
+
+
+def test_engine_runs_in_process(tmp_path):
+    calls: list = []
+    client = _FakeClient()
+    with patch.dict(sys.modules, {"MetaTrader5": _mt5_with_history(calls)}):
+        mod = importlib.reload(importlib.import_module("gpt_trader.fetch.fetch_mt5_data"))
+        engine = BacktestEngine(_engine_config(tmp_path), client=client, fetch_module=mod)
+        results = engine.run()
+
+    assert calls == [1, 5]
+    assert len(results) == 3
+    assert _table_times(tmp_path) == STEP_TIMES
+    assert len(list((tmp_path / "signals").glob("*.json"))) == 3
+
+    data = json.loads(client.messages[1][1]["content"].split("JSON Data:\n")[1])
+    m1 = [row for row in data if row["timeframe"] == "1m"]
+    assert len(m1) == 5
+    assert m1[-1]["timestamp"] == "2024-01-01T08:30:00"
+    assert "sma20" in m1[-1] and "rsi14" not in m1[-1]
+
+
+def test_engine_concurrent_keeps_step_order(tmp_path):
+    client = _FakeAsyncClient()
+    with patch.dict(sys.modules, {"MetaTrader5": _mt5_with_history([])}):
+        mod = importlib.reload(importlib.import_module("gpt_trader.fetch.fetch_mt5_data"))
+        engine = BacktestEngine(_engine_config(tmp_path), fetch_module=mod)
+        results = asyncio.run(engine.run_concurrent({"concurrency": 3}, client=client))
+
+    assert len(results) == 3
+    assert _table_times(tmp_path) == STEP_TIMES
+    assert [r["signal_id"] for r in results] == [
+        f"test{int(pd.Timestamp(t).timestamp())}" for t in STEP_TIMES
+    ]
+
+
+def test_engine_concurrent_logs_failed_steps(tmp_path, caplog):
+    client = _FakeAsyncClient()
+    create = client.chat.completions.create
+    failing = f"test{int(pd.Timestamp(STEP_TIMES[1]).timestamp())}"
+
+    async def flaky(model, messages):
+        if failing in messages[1]["content"]:
+            raise ValueError("bad request")
+        return await create(model, messages)
+
+    client.chat.completions.create = flaky
+    with patch.dict(sys.modules, {"MetaTrader5": _mt5_with_history([])}):
+        mod = importlib.reload(importlib.import_module("gpt_trader.fetch.fetch_mt5_data"))
+        engine = BacktestEngine(_engine_config(tmp_path), fetch_module=mod)
+        with caplog.at_level("ERROR", logger="gpt_trader.backtest.engine"):
+            results = asyncio.run(engine.run_concurrent({"max_retries": 0}, client=client))
+
+    assert len(results) == 2
+    assert _table_times(tmp_path) == [STEP_TIMES[0], STEP_TIMES[2]]
+    assert f"Backtest step {STEP_TIMES[1]} failed: bad request" in caplog.text
+
+
+def test_engine_rerun_is_served_from_cache(tmp_path):
+    config = _engine_config(tmp_path)
+    config["send"]["cache_path"] = str(tmp_path / "cache.sqlite")
+    first, second = _FakeClient(), _FakeClient()
+    with patch.dict(sys.modules, {"MetaTrader5": _mt5_with_history([])}):
+        mod = importlib.reload(importlib.import_module("gpt_trader.fetch.fetch_mt5_data"))
+        BacktestEngine(config, client=first, fetch_module=mod, cache_mode="read-write").run()
+        engine = BacktestEngine(config, fetch_module=mod, cache_mode="read-write")
+        results = asyncio.run(engine.run_concurrent(client=second))
+
+    assert len(first.messages) == 3
+    assert second.messages == []
+    assert len(results) == 3
+    assert _table_times(tmp_path) == STEP_TIMES * 2
+
+
+def test_engine_runs_on_replay_history(tmp_path):
+    from gpt_trader.fetch.fetch_replay_data import ReplaySource
+
+    history = tmp_path / "history"
+    history.mkdir()
+    pd.DataFrame(_rates("2023-12-31", 2000, "min")).to_csv(history / "TEST_M1.csv", index=False)
+    pd.DataFrame(_rates("2023-12-25", 300, "h")).to_csv(history / "TEST_H1.csv", index=False)
+    client = _FakeClient()
+    with patch.dict(sys.modules, {"MetaTrader5": None}):
+        engine = BacktestEngine(
+            _engine_config(tmp_path), client=client, fetch_module=ReplaySource(history)
+        )
+        results = engine.run()
+
+    assert len(results) == 3
+    assert _table_times(tmp_path) == STEP_TIMES
+    data = json.loads(client.messages[1][1]["content"].split("JSON Data:\n")[1])
+    assert [r["timestamp"] for r in data if r["timeframe"] == "1m"][-1] == "2024-01-01T08:30:00"
+
+
+def test_engine_pipelined_matches_sequential(tmp_path):
+    client = _FakeClient()
+    with patch.dict(sys.modules, {"MetaTrader5": _mt5_with_history([])}):
+        mod = importlib.reload(importlib.import_module("gpt_trader.fetch.fetch_mt5_data"))
+        engine = BacktestEngine(_engine_config(tmp_path), client=client, fetch_module=mod)
+        results = engine.run_pipelined(prefetch=2, send_workers=2)
+
+    assert _table_times(tmp_path) == STEP_TIMES
+    assert [r["signal_id"] for r in results] == [
+        f"test{int(pd.Timestamp(t).timestamp())}" for t in STEP_TIMES
+    ]
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from gpt_trader.backtest.pipeline import Pipeline
+from gpt_trader.utils.metrics import REGISTRY
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    REGISTRY.reset()
+    yield
+    REGISTRY.reset()
+
+
+def test_fetch_overlaps_send_and_commits_in_order() -> None:
+    fetched: list[int] = []
+    sending = threading.Event()
+    committed: list[tuple] = []
+
+    def fetch(item):
+        fetched.append(item)
+        return item * 10
+
+    def send(payload):
+        if payload == 0:
+            # the first request is slow; later steps are fetched meanwhile
+            sending.set()
+            deadline = time.time() + 5
+            while len(fetched) < 4 and time.time() < deadline:
+                time.sleep(0.001)
+        return payload + 1
+
+    def commit(item, payload, response):
+        committed.append((item, payload, response))
+
+    stats = Pipeline(fetch, send, commit, prefetch=3, send_workers=2).run(range(6))
+
+    assert committed == [(i, i * 10, i * 10 + 1) for i in range(6)]
+    assert len(fetched) == 6 and stats.steps == 6
+    assert stats.max_depth["send"] >= 1
+    assert "pipeline_queue_depth[queue=send]" in REGISTRY.gauges()
+    assert "Pipeline ran 6 steps" in stats.summary()
+
+
+def test_failures_reach_commit_as_exceptions() -> None:
+    committed = []
+
+    def fetch(item):
+        if item == 1:
+            raise RuntimeError("no bars")
+        return item
+
+    def send(payload):
+        if payload == 2:
+            raise TimeoutError("gpt")
+        return "ok"
+
+    Pipeline(fetch, send, lambda *entry: committed.append(entry), prefetch=1).run(range(4))
+
+    assert [c[0] for c in committed] == [0, 1, 2, 3]
+    assert isinstance(committed[1][1], RuntimeError)
+    assert isinstance(committed[2][2], TimeoutError)
+    assert committed[3] == (3, 3, "ok")
+
+
+def test_commit_error_stops_pipeline() -> None:
+    def commit(item, payload, response):
+        raise ValueError("disk full")
+
+    with pytest.raises(ValueError):
+        Pipeline(lambda i: i, lambda p: p, commit, prefetch=1).run(range(50))
@@ -0,0 +1,144 @@
+import importlib
+import sys
+from types import ModuleType
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from gpt_trader.fetch.bar_store import (
+    BarIndex,
+    BarStore,
+    bars_ending_at,
+    epoch_seconds,
+    to_bar_array,
+)
+
+
+def _rates(start: str, periods: int, freq: str = "min") -> list[dict]:
+    times = pd.date_range(start, periods=periods, freq=freq)
+    return [
+        {
+            "time": int(ts.timestamp()),
+            "open": float(i),
+            "high": float(i) + 1,
+            "low": float(i) - 1,
+            "close": float(i),
+            "tick_volume": i,
+            "spread": 0,
+            "real_volume": 0,
+        }
+        for i, ts in enumerate(times)
+    ]
+
+
+def test_write_merges_across_days(tmp_path):
+    store = BarStore(tmp_path)
+    store.write("XAUUSD", "M1", _rates("2024-01-01 23:58", 4))
+    store.write("XAUUSD", "M1", _rates("2024-01-02 00:01", 3))
+    files = sorted(p.name for p in (tmp_path / "XAUUSD" / "M1").glob("*.npy"))
+    assert files == ["20240101.npy", "20240102.npy"]
+    data = store.read("XAUUSD", "M1")
+    assert len(data) == 6
+    assert np.all(np.diff(data["time"]) > 0)
+    assert store.last_time("XAUUSD", "M1") == data["time"][-1]
+
+
+def test_tail_requires_coverage(tmp_path):
+    store = BarStore(tmp_path)
+    store.write("EURUSD", "M5", _rates("2024-01-01", 10, "5min"))
+    store.write("EURUSD", "M5", _rates("2024-01-01 02:00", 10, "5min"))
+    end = int(pd.Timestamp("2024-01-01 00:45").timestamp())
+    assert len(store.tail("EURUSD", "M5", 5, end)) == 5
+    gap_end = int(pd.Timestamp("2024-01-01 02:10").timestamp())
+    assert store.tail("EURUSD", "M5", 5, gap_end) is None
+    assert store.tail("EURUSD", "M5", 3, gap_end) is not None
+
+
+def test_to_bar_array_fills_missing_columns():
+    arr = to_bar_array([{"time": 2, "close": 1.0}, {"time": 1, "close": 2.0}])
+    assert list(arr["time"]) == [1, 2]
+    assert arr["spread"].tolist() == [0, 0]
+
+
+def _mt5_stub(rates: list[dict], calls: list) -> ModuleType:
+    mt5 = ModuleType("MetaTrader5")
+    for i, name in enumerate(["M1", "M5", "M15", "M30", "H1", "H4", "D1"], start=1):
+        setattr(mt5, f"TIMEFRAME_{name}", i)
+
+    def _from_pos(symbol, tf, pos, count):
+        calls.append(count)
+        return to_bar_array(rates[-count:])
+
+    mt5.copy_rates_from_pos = _from_pos
+    return mt5
+
+
+def test_fetch_only_requests_missing_tail(tmp_path):
+    rates = _rates("2024-01-01", 30)
+    calls: list = []
+    mt5 = _mt5_stub(rates[:28], calls)
+    with patch.dict(sys.modules, {"MetaTrader5": mt5}):
+        mod = importlib.reload(importlib.import_module("gpt_trader.fetch.fetch_mt5_data"))
+        store = BarStore(tmp_path)
+        first = mod._fetch_rates("TEST", 1, 20, store=store, tf_name="M1")
+        mt5.copy_rates_from_pos = _mt5_stub(rates, calls).copy_rates_from_pos
+        second = mod._fetch_rates("TEST", 1, 20, store=store, tf_name="M1")
+    assert calls == [20, 2, 8]
+    assert len(first) == len(second) == 20
+    assert second["close"].iloc[-1] == 29
+
+
+def test_widened_window_stores_every_fetched_bar(tmp_path):
+    rates = _rates("2024-01-04", 576, "5min") + _rates("2024-01-08", 13, "5min")
+    mt5 = _mt5_stub(rates, [])
+
+    def _range(symbol, tf, start, end):
+        lo, hi = int(pd.Timestamp(start).timestamp()), int(pd.Timestamp(end).timestamp())
+        return to_bar_array([r for r in rates if lo <= r["time"] <= hi])
+
+    mt5.copy_rates_range = _range
+    with patch.dict(sys.modules, {"MetaTrader5": mt5}):
+        mod = importlib.reload(importlib.import_module("gpt_trader.fetch.fetch_mt5_data"))
+        store = BarStore(tmp_path)
+        end = pd.Timestamp("2024-01-08 01:00")
+        df = mod._fetch_rates("TEST", 2, 100, end_time=end, store=store, tf_name="M5")
+    assert len(df) == 100
+    # the weekend made the first span come up short; whatever span is now
+    # marked as fetched must hold every bar the terminal has in it
+    assert store.coverage("TEST", "M5")
+    for start, stop in store.coverage("TEST", "M5"):
+        expected = [r for r in rates if start <= r["time"] <= stop]
+        assert len(store.read("TEST", "M5", start, stop)) == len(expected)
+
+
+def test_epoch_seconds_converts_aware_times_to_utc():
+    naive = epoch_seconds(["2024-01-02 10:00"])
+    assert naive.tolist() == [int(pd.Timestamp("2024-01-02 10:00").timestamp())]
+    assert epoch_seconds(["2024-01-02 12:00+02:00"]).tolist() == naive.tolist()
+
+
+def test_bars_ending_at_counts_rows_across_gaps():
+    friday = _rates("2024-01-05 23:55", 5)
+    monday = _rates("2024-01-08 00:00", 5)
+    data = to_bar_array(friday + monday)
+    end = int(pd.Timestamp("2024-01-08 00:01:30").timestamp())
+    window = bars_ending_at(data, 4, end)
+    assert [pd.Timestamp(t, unit="s").strftime("%a %H:%M") for t in window["time"]] == [
+        "Fri 23:58",
+        "Fri 23:59",
+        "Mon 00:00",
+        "Mon 00:01",
+    ]
+    assert len(bars_ending_at(data, 4, int(pd.Timestamp("2024-01-01").timestamp()))) == 0
+
+
+def test_bar_index_memoizes_windows():
+    index = BarIndex(memo_size=2)
+    index.add("TEST", "M1", _rates("2024-01-01", 10))
+    end = pd.Timestamp("2024-01-01 00:05")
+    first = index("TEST", "M1", 3, end)
+    assert first["close"].tolist() == [3.0, 4.0, 5.0]
+    assert index.ending_at("TEST", "M1", 3, int(end.timestamp())) is first
+    index.add("TEST", "M1", _rates("2024-01-01", 4))
+    assert index("TEST", "M1", 3, end)["close"].tolist() == [1.0, 2.0, 3.0]
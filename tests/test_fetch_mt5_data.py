@@ -291,3 +291,55 @@ def test_main_omits_nulls(tmp_path) -> None:
     data_json = json.loads(json_file.read_text())
     assert "sma200" not in data_json[0]
     assert data_json[1]["sma200"] == 2
+
+
+def test_time_fetch_span_widens_across_weekend() -> None:
+    """A short first span is widened until exactly fetch_bars bars end at time_fetch."""
+    times = list(pd.date_range("2024-01-05 23:50", periods=10, freq="min")) + list(
+        pd.date_range("2024-01-08 00:00", periods=3, freq="min")
+    )
+    rates = [
+        {
+            "time": int(ts.timestamp()),
+            "open": float(i),
+            "high": float(i),
+            "low": float(i),
+            "close": float(i),
+            "tick_volume": 0,
+            "spread": 0,
+            "real_volume": 0,
+        }
+        for i, ts in enumerate(times)
+    ]
+    calls = []
+
+    mt5 = ModuleType("MetaTrader5")
+    for i, name in enumerate(["M1", "M5", "M15", "M30", "H1", "H4", "D1"], start=1):
+        setattr(mt5, f"TIMEFRAME_{name}", i)
+
+    def _range(symbol, tf, start, end):
+        calls.append(start)
+        lo, hi = int(pd.Timestamp(start).timestamp()), int(pd.Timestamp(end).timestamp())
+        return [r for r in rates if lo <= r["time"] <= hi]
+
+    mt5.copy_rates_range = _range
+
+    with patch.dict(sys.modules, {"MetaTrader5": mt5}):
+        fetch_mt5_data = importlib.reload(
+            importlib.import_module("gpt_trader.fetch.fetch_mt5_data")
+        )
+        config = {
+            "fetch_bars": 6,
+            "indicators": {"atr14": False, "rsi14": False, "sma20": False},
+            "time_fetch": "2024-01-08 00:02:00",
+            "timeframes": [{"tf": "M1", "keep": 6}],
+        }
+        df = fetch_mt5_data.fetch_multi_tf("TEST", config)
+        assert list(df["close"]) == [7.0, 8.0, 9.0, 10.0, 11.0, 12.0]
+        assert calls[0] == pd.Timestamp("2024-01-07 23:57")
+        assert len(calls) > 1
+
+        # the same window again is served from the memo
+        count = len(calls)
+        fetch_mt5_data.fetch_multi_tf("TEST", config)
+        assert len(calls) == count
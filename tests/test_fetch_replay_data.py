@@ -0,0 +1,109 @@
+import json
+import sys
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gpt_trader.fetch import fetch_replay_data
+from gpt_trader.fetch.bar_store import BarStore
+from gpt_trader.fetch.fetch_replay_data import ReplaySource, fetch_multi_tf, read_history_file
+
+
+def _bars(start: str, periods: int, freq: str) -> pd.DataFrame:
+    times = pd.date_range(start, periods=periods, freq=freq)
+    values = np.arange(periods, dtype=float)
+    return pd.DataFrame(
+        {"timestamp": times, "open": values, "high": values + 1, "low": values - 1,
+         "close": values, "tick_volume": np.arange(periods)}
+    )
+
+
+def _write_mt5_export(path, df: pd.DataFrame) -> None:
+    lines = ["<DATE>\t<TIME>\t<OPEN>\t<HIGH>\t<LOW>\t<CLOSE>\t<TICKVOL>\t<VOL>\t<SPREAD>"]
+    for row in df.itertuples():
+        lines.append(
+            f"{row.timestamp:%Y.%m.%d}\t{row.timestamp:%H:%M:%S}\t{row.open}\t{row.high}"
+            f"\t{row.low}\t{row.close}\t{row.tick_volume}\t0\t12"
+        )
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_mt5_export_and_csv_formats(tmp_path) -> None:
+    df = _bars("2024-01-02", 4, "5min")
+    _write_mt5_export(tmp_path / "export.csv", df)
+    bars = read_history_file(tmp_path / "export.csv")
+    assert bars["time"].tolist() == [int(ts.timestamp()) for ts in df["timestamp"]]
+    assert bars["spread"].tolist() == [12] * 4 and bars["close"].tolist() == [0, 1, 2, 3]
+
+    plain = df.assign(time=bars["time"]).drop(columns="timestamp")
+    plain.to_csv(tmp_path / "plain.csv", index=False)
+    again = read_history_file(tmp_path / "plain.csv")
+    for name in ("time", "open", "high", "low", "close", "tick_volume"):
+        assert again[name].tolist() == bars[name].tolist()
+
+
+def test_point_in_time_windows(tmp_path) -> None:
+    # two monthly exports overlap by one bar and are merged
+    df = _bars("2024-01-31 23:00", 120, "min")
+    _write_mt5_export(tmp_path / "XAUUSD_M1_202401.csv", df.iloc[:61])
+    _write_mt5_export(tmp_path / "XAUUSD_M1_202402.csv", df.iloc[60:])
+    _bars("2024-01-20", 300, "h").to_csv(tmp_path / "XAUUSD_H1.csv", index=False)
+    config = {
+        "replay": {"path": str(tmp_path)},
+        "indicators": {"atr14": False, "rsi14": False, "sma20": True},
+        "fetch_bars": 25,
+        "timeframes": [{"tf": "M1", "keep": 3}, {"tf": "H1", "keep": 2}],
+        "time_fetch": "2024-02-01 00:30:30",
+    }
+    out = fetch_multi_tf("XAUUSD", config, tz_shift=2)
+    m1 = out[out["timeframe"] == "1m"]
+    assert m1["timestamp"].tolist() == list(
+        pd.date_range("2024-02-01 02:28", periods=3, freq="min")
+    )
+    assert m1["sma20"].notna().all()
+    h1 = out[out["timeframe"] == "1h"]
+    assert h1["timestamp"].iloc[-1] == pd.Timestamp("2024-02-01 02:00")
+
+    source = ReplaySource(tmp_path)
+    assert len(source.bars("XAUUSD", "M1")) == 120
+    start, end = pd.Timestamp("2024-02-01 00:00"), pd.Timestamp("2024-02-01 00:09")
+    assert len(source.fetch_range("XAUUSD", "M1", start, end)) == 10
+    with pytest.raises(FileNotFoundError):
+        source.bars("XAUUSD", "M5")
+
+
+def test_bar_store_history_needs_no_terminal(tmp_path) -> None:
+    df = _bars("2024-01-02", 50, "5min")
+    store = BarStore(tmp_path)
+    store.write("XAUUSD", "M5", df.assign(time=df["timestamp"].astype("int64") // 10**9))
+    config = {
+        "bar_store": str(tmp_path),
+        "fetch_bars": 5,
+        "indicators": {"atr14": False, "rsi14": False},
+        "timeframes": [{"tf": "M5", "keep": 5}],
+    }
+    with patch.dict(sys.modules, {"MetaTrader5": None}):
+        out = fetch_replay_data.fetch_multi_tf("XAUUSD", config)
+    assert out["close"].tolist() == [45.0, 46.0, 47.0, 48.0, 49.0]
+
+
+def test_main_writes_outputs(tmp_path) -> None:
+    _bars("2024-01-02", 30, "5min").to_csv(tmp_path / "XAUUSD_M5.csv", index=False)
+    cfg = {
+        "symbol": "XAUUSD",
+        "fetch_bars": 5,
+        "indicators": {"atr14": False, "rsi14": False},
+        "timeframes": [{"tf": "M5", "keep": 2}],
+        "replay": {"path": str(tmp_path)},
+    }
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(json.dumps(cfg))
+    output = tmp_path / "out" / "xauusd1.csv"
+    argv = ["fetch_replay_data.py", "--config", str(cfg_path), "--output", str(output),
+            "--time-fetch", "2024-01-02 00:20:00"]
+    with patch.object(sys, "argv", argv):
+        fetch_replay_data.main()
+    rows = json.loads(output.with_suffix(".json").read_text(encoding="utf-8"))
+    assert [r["close"] for r in rows] == [3.0, 4.0]
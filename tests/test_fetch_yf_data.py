@@ -7,7 +7,13 @@ import sys
 import pandas as pd
 import pytest
 
-from gpt_trader.fetch.fetch_yf_data import fetch_multi_tf, get_session
+from gpt_trader.fetch.fetch_yf_data import (
+    _download_period,
+    _download_plan,
+    fetch_multi_tf,
+    fetch_symbols,
+    get_session,
+)
 
 
 def _fake_download(
@@ -84,3 +90,73 @@ def test_main_error_on_empty_df(tmp_path, caplog) -> None:
             importlib.import_module("gpt_trader.fetch.fetch_yf_data").main()
         assert exc.value.code == 1
         assert "No data available" in caplog.text
+
+
+def test_one_download_resamples_coarser_timeframes() -> None:
+    """M5, M15 and H4 for two symbols come from a single 5m download."""
+    index = pd.date_range("2024-01-01 22:00", periods=12 * 12, freq="5min", tz="UTC")
+    calls = []
+
+    def fake_download(tickers, interval, period, progress):
+        calls.append((tickers, interval, period))
+        columns = pd.MultiIndex.from_product(
+            [["Open", "High", "Low", "Close", "Volume"], tickers], names=["Price", "Ticker"]
+        )
+        values = [[float(i)] * len(columns) for i in range(len(index))]
+        return pd.DataFrame(values, index=index, columns=columns)
+
+    config = {
+        "fetch_bars": 3,
+        "indicators": {"rsi14": False, "atr14": False},
+        "timeframes": [{"tf": "M5", "keep": 2}, {"tf": "M15", "keep": 2}, {"tf": "H4", "keep": 3}],
+    }
+    with patch("gpt_trader.fetch.fetch_yf_data.yf.download", side_effect=fake_download):
+        frames = fetch_symbols(["GC=F", "EURUSD=X"], config, tz_shift=2)
+
+    assert calls == [(["GC=F", "EURUSD=X"], "5m", "4d")]
+    h4 = frames["EURUSD=X"].query("timeframe == '4h'")
+    # 22:00 UTC + 2h starts a new day; buckets follow the session boundaries
+    assert [ts.hour for ts in h4["timestamp"]] == [0, 4, 8]
+    first = h4.iloc[0]
+    assert (first["open"], first["high"], first["low"], first["close"]) == (0.0, 47.0, 0.0, 47.0)
+    m15 = frames["GC=F"].query("timeframe == '15m'")
+    assert list(m15["close"]) == [140.0, 143.0]
+    assert list(m15["tick_volume"]) == [138.0 + 139.0 + 140.0, 141.0 + 142.0 + 143.0]
+
+
+def test_daily_bars_are_downloaded_natively() -> None:
+    assert _download_plan({"M5": 50, "H1": 50, "D1": 250}) == {"5m": ["M5", "H1"], "1d": ["D1"]}
+    assert _download_plan({"H4": 50}) == {"60m": ["H4"]}
+    assert _download_period("1m", [pd.Timedelta(days=30)]) == "7d"
+    assert _download_period("1d", [pd.Timedelta(days=250)]) == "378d"
+
+
+def test_long_indicators_keep_their_history_next_to_m1() -> None:
+    """Yahoo keeps 7 days of 1m bars, so H1 with sma200 gets its own 60m download."""
+    calls = []
+
+    def fake_download(tickers, interval, period, progress):
+        calls.append((interval, period))
+        step = {"1m": "1min", "60m": "1h"}[interval]
+        end = pd.Timestamp("2024-03-01", tz="UTC")
+        index = pd.date_range(end=end, periods=int(period[:-1]) * 24, freq="1h")
+        index = pd.date_range(index[0], end, freq=step)
+        close = [2000.0 + i % 7 for i in range(len(index))]
+        return pd.DataFrame(
+            {"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1.0},
+            index=index,
+        )
+
+    config = {
+        "fetch_bars": "auto",
+        "indicators": {"sma200": True},
+        "timeframes": [{"tf": "M1", "keep": 5}, {"tf": "H1", "keep": 5}],
+    }
+    assert _download_plan({"M1": 205, "H1": 205}) == {"1m": ["M1"], "60m": ["H1"]}
+    with patch("gpt_trader.fetch.fetch_yf_data.yf.download", side_effect=fake_download):
+        df = fetch_multi_tf("GC=F", config)
+
+    assert [interval for interval, _ in calls] == ["1m", "60m"]
+    h1 = df.query("timeframe == '1h'")
+    assert len(h1) == 5
+    assert h1["sma200"].notna().all()
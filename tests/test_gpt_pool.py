@@ -0,0 +1,122 @@
+import asyncio
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from gpt_trader.send.gpt_pool import (
+    GptPool,
+    OrderedWriter,
+    RateBudget,
+    backoff_delay,
+    is_retryable,
+)
+from gpt_trader.send.send_to_gpt import create_async_client
+
+
+class _FakeOpenAI(BaseHTTPRequestHandler):
+    """Minimal ``/chat/completions`` endpoint echoing the user message."""
+
+    fail_first: set = set()
+    seen: list = []
+
+    def do_POST(self):  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        content = body["messages"][-1]["content"]
+        self.seen.append(content)
+        if content in self.fail_first:
+            self.fail_first.discard(content)
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("retry-after", "0")
+            self.end_headers()
+            self.wfile.write(b'{"error": {"message": "slow down"}}')
+            return
+        reply = {
+            "id": "x",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": f"echo {content}"},
+                }
+            ],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 5, "total_tokens": 10},
+        }
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_endpoint():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOpenAI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _FakeOpenAI.seen = []
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+
+def test_pool_against_fake_endpoint(fake_endpoint):
+    _FakeOpenAI.fail_first = {"msg 3"}
+    client = create_async_client({"openai_api_key": "test", "base_url": fake_endpoint})
+    pool = GptPool(client, "fake-model", concurrency=4, base_delay=0.01)
+    requests = [[{"role": "user", "content": f"msg {i}"}] for i in range(10)]
+    order: list = []
+
+    results = asyncio.run(pool.map(requests, lambda i, r: order.append(i)))
+
+    assert results == [f"echo msg {i}" for i in range(10)]
+    assert order == list(range(10))
+    assert pool.retries == 1
+    assert len(_FakeOpenAI.seen) == 11
+
+
+def test_ordered_writer_buffers_out_of_order():
+    out: list = []
+    writer = OrderedWriter(lambda i, r: out.append(r))
+    writer.push(2, "c")
+    writer.push(1, "b")
+    assert out == [] and writer.pending == 2
+    writer.push(0, "a")
+    assert out == ["a", "b", "c"] and writer.pending == 0
+
+
+def test_rate_budget_waits_for_refill():
+    now = [0.0]
+    waits: list = []
+
+    async def _sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    async def _take():
+        budget = RateBudget(60, clock=lambda: now[0], sleep=_sleep)
+        for _ in range(61):
+            await budget.acquire(1)
+
+    asyncio.run(_take())
+    assert waits == [pytest.approx(1.0)]
+
+
+def test_retry_helpers():
+    class _Err(Exception):
+        def __init__(self, status):
+            self.status_code = status
+
+    assert is_retryable(_Err(429)) and is_retryable(_Err(503))
+    assert not is_retryable(_Err(400))
+    rng = random.Random(0)
+    assert all(0 <= backoff_delay(a, 1.0, 8.0, rng) <= 8.0 for a in range(10))
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gpt_trader.utils.indicators import compute_indicators
+from gpt_trader.utils.indicator_kernel import (
+    compute_indicators_batch,
+    compute_indicators_many,
+)
+
+
+def _frame(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 1900 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame(
+        {
+            "open": close,
+            "high": close + rng.random(n),
+            "low": close - rng.random(n),
+            "close": close,
+        }
+    )
+
+
+def test_batch_matches_compute_indicators():
+    frames = [_frame(n, i) for i, n in enumerate([5, 30, 250, 251])]
+    conf = {"ema50": True, "sma200": True}
+    for out, df in zip(compute_indicators_many(frames, conf), frames):
+        pd.testing.assert_frame_equal(out, compute_indicators(df, conf), rtol=1e-9)
+
+
+def test_batch_respects_disabled_indicators():
+    df = _frame(20, 0)
+    arr = df[["close"]].to_numpy()
+    out = compute_indicators_batch(arr + 1, arr - 1, arr, {"rsi14": False})
+    assert set(out) == {"atr14", "sma20"}
+    assert out["sma20"].shape == arr.shape
+
+
+def test_batch_rejects_mismatched_shapes():
+    with pytest.raises(ValueError):
+        compute_indicators_batch(np.zeros((3, 2)), np.zeros((3, 1)), np.zeros((3, 2)))
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from gpt_trader.utils.indicator_registry import (
+    IndicatorSpec,
+    compute_specs,
+    output_columns,
+    parse_specs,
+    required_bars,
+    resolve_fetch_bars,
+)
+
+
+def _frame(n: int = 60) -> pd.DataFrame:
+    close = pd.Series(range(n), dtype=float) % 7 + 100
+    return pd.DataFrame({"open": close, "high": close + 1, "low": close - 1, "close": close})
+
+
+def test_legacy_mapping_defaults():
+    specs = parse_specs({"rsi14": False, "sma200": True})
+    assert output_columns(specs) == ["atr14", "sma20", "sma200"]
+
+
+def test_spec_list_columns_and_warmup():
+    specs = parse_specs(
+        [{"kind": "ema", "window": 21}, {"kind": "bollinger", "window": 20, "k": 2}, "rsi14"]
+    )
+    assert output_columns(specs) == ["ema21", "bb20_mid", "bb20_upper", "bb20_lower", "rsi14"]
+    assert required_bars(specs, keep=10) == 30
+    assert specs[0] == IndicatorSpec("ema", 21)
+
+
+def test_unknown_kind_raises():
+    with pytest.raises(ValueError):
+        parse_specs([{"kind": "macd", "window": 12}])
+
+
+def test_legacy_mapping_skips_unknown_names(caplog):
+    with caplog.at_level("WARNING"):
+        specs = parse_specs({"macd": True, "vwap": False, "rsi14": False})
+    assert output_columns(specs) == ["atr14", "sma20"]
+    assert "macd" in caplog.text and "vwap" not in caplog.text
+    with pytest.raises(ValueError):
+        parse_specs(["macd"])
+
+
+def test_bollinger_matches_pandas():
+    df = _frame()
+    out = compute_specs(df, parse_specs([{"kind": "bollinger", "window": 20, "k": 2}]))
+    mid = df["close"].rolling(20).mean()
+    std = df["close"].rolling(20).std()
+    pd.testing.assert_series_equal(out["bb20_upper"], mid + 2 * std, check_names=False)
+    pd.testing.assert_series_equal(out["bb20_lower"], mid - 2 * std, check_names=False)
+
+
+def test_resolve_fetch_bars_auto_and_explicit():
+    specs = parse_specs({"sma200": True})
+    assert resolve_fetch_bars("auto", specs, keep=6) == 205
+    assert resolve_fetch_bars(None, parse_specs(None), keep=20) == 39
+    assert resolve_fetch_bars(50, specs, keep=6) == 50
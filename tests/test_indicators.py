@@ -1,5 +1,10 @@
+import numpy as np
 import pandas as pd
-from gpt_trader.utils.indicators import compute_indicators
+from gpt_trader.utils.indicators import (
+    IncrementalIndicators,
+    IndicatorEngine,
+    compute_indicators,
+)
 
 
 def test_disable_single_indicator():
@@ -53,3 +58,44 @@ def test_ema50_and_sma200_present():
     assert "ema50" in out.columns
     assert "sma200" in out.columns
 
+
+
+def _random_bars(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    close = 1900 + np.cumsum(rng.normal(0, 1, n))
+    close[40:70] = close[39]
+    return pd.DataFrame(
+        {
+            "timestamp": pd.date_range("2024-01-01", periods=n, freq="min"),
+            "open": close,
+            "high": close + rng.random(n),
+            "low": close - rng.random(n),
+            "close": close,
+        }
+    )
+
+
+def test_incremental_update_matches_batch():
+    df = _random_bars(300)
+    conf = {"ema50": True, "sma200": True}
+    expected = compute_indicators(df, conf)
+    calc = IncrementalIndicators(conf)
+    rows = [calc.update(h, l, c) for h, l, c in zip(df["high"], df["low"], df["close"])]
+    out = pd.DataFrame(rows)
+    cols = ["atr14", "rsi14", "sma20", "ema50", "sma200"]
+    pd.testing.assert_frame_equal(out[cols], expected[cols], rtol=1e-9)
+
+
+def test_engine_advances_sliding_windows():
+    df = _random_bars(400)
+    conf = {"ema50": True, "sma200": True}
+    cols = ["atr14", "rsi14", "sma20", "ema50", "sma200"]
+    engine = IndicatorEngine(conf)
+    for end in range(250, 401, 7):
+        window = df.iloc[end - 250 : end]
+        forming = window.copy()
+        forming.loc[forming.index[-1], ["high", "close"]] += 5
+        engine.apply("XAUUSD", "5m", forming)
+        out = engine.apply("XAUUSD", "5m", window)
+        expected = compute_indicators(df.iloc[:end], conf).iloc[end - 250 : end]
+        pd.testing.assert_frame_equal(out[cols], expected[cols], rtol=1e-9)
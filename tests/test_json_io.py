@@ -3,7 +3,7 @@ from pathlib import Path
 
 import pandas as pd
 
-from gpt_trader.utils import write_json_no_nulls
+from gpt_trader.utils import dumps_no_nulls, write_json_no_nulls
 
 
 def test_write_json_no_nulls(tmp_path: Path) -> None:
@@ -21,3 +21,42 @@ def test_write_json_timestamp_conversion(tmp_path: Path) -> None:
     data = json.loads(out.read_text())
     assert data == [{"dt": "2024-01-01T12:34:56"}]
     assert isinstance(data[0]["dt"], str)
+
+
+def _reference_dumps(df: pd.DataFrame) -> str:
+    records = []
+    for record in df.to_dict(orient="records"):
+        clean = {}
+        for k, v in record.items():
+            if pd.isna(v):
+                continue
+            if isinstance(v, pd.Timestamp):
+                v = v.isoformat()
+            clean[k] = v
+        records.append(clean)
+    return json.dumps(records, ensure_ascii=False)
+
+
+def test_dumps_matches_record_encoding() -> None:
+    df = pd.DataFrame(
+        {
+            "timestamp": pd.to_datetime(["2024-01-01 00:05", None, "2024-01-01 00:15"]),
+            "ms": pd.to_datetime(["2024-01-01 00:00:00.250", "2024-01-01", "2024-01-02"], format="ISO8601"),
+            "utc": pd.to_datetime(["2024-01-01"] * 3).tz_localize("UTC"),
+            "close": [2034.5, float("nan"), 1e-05],
+            "f32": pd.Series([0.1, 2.5, 3.0], dtype="float32"),
+            "volume": [1, 2, 3],
+            "nullable": pd.array([1, None, 3], dtype="Int64"),
+            "flag": [True, False, True],
+            "session": ["asia", None, 'ลอนดอน "q"\n'],
+        }
+    )
+    assert dumps_no_nulls(df) == _reference_dumps(df)
+    assert dumps_no_nulls(df.iloc[:0]) == "[]"
+
+
+def test_write_streams_same_text(tmp_path: Path) -> None:
+    df = pd.DataFrame({"a": range(12000), "b": [0.5, None] * 6000})
+    out = tmp_path / "big.json"
+    write_json_no_nulls(df, out)
+    assert out.read_text(encoding="utf-8") == _reference_dumps(df)
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pandas as pd
+
+import gpt_trader.cli.scheduler_liveTrade as sched
+from gpt_trader.cli.live_trade_daemon import (
+    LiveTradeDaemon,
+    MultiSymbolDaemon,
+    symbol_configs,
+)
+from gpt_trader.utils.mt5_session import get_mt5_session
+
+
+def _fetch_module(calls: list):
+    df = pd.DataFrame(
+        {
+            "timestamp": pd.date_range("2024-01-01", periods=2, freq="5min"),
+            "open": [1.0, 2.0],
+            "high": [1.0, 2.0],
+            "low": [1.0, 2.0],
+            "close": [1.0, 2.0],
+            "tick_volume": [1, 2],
+            "timeframe": ["5m", "5m"],
+            "session": ["asia", "asia"],
+        }
+    )
+    state = {"connected": False}
+
+    def _init():
+        calls.append("init")
+        state["connected"] = True
+        return True
+
+    def _fetch(symbol, config, tz_shift=0, engine=None, store=None):
+        calls.append("fetch")
+        assert engine is not None
+        return df
+
+    mt5 = SimpleNamespace(
+        initialize=_init,
+        shutdown=lambda: state.update(connected=False),
+        terminal_info=lambda: object() if state["connected"] else None,
+    )
+    return SimpleNamespace(
+        mt5=mt5,
+        fetch_multi_tf=_fetch,
+        _init_mt5=lambda: get_mt5_session(mt5).acquire(),
+        _shutdown_mt5=lambda: get_mt5_session(mt5).release(),
+    ), state
+
+
+def _client(calls: list):
+    def _create(model, messages):
+        calls.append("send")
+        text = json.dumps({"signal_id": "xauusd1", "entry": 1, "sl": 0.5, "tp": 2,
+                           "pending_order_type": "buy_limit", "confidence": 50})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=_create)))
+
+
+def _config(tmp_path) -> dict:
+    return {
+        "fetch": {"symbol": "XAUUSD", "save_as_path": str(tmp_path / "fetch")},
+        "send": {"save_prompt_dir": str(tmp_path / "prompts")},
+        "parse": {
+            "path_signals_csv": str(tmp_path / "csv"),
+            "path_signals_json": str(tmp_path / "json"),
+            "path_latest_response": str(tmp_path / "latest.txt"),
+        },
+    }
+
+
+def test_daemon_reuses_session_across_ticks(tmp_path):
+    calls: list = []
+    orders: list = []
+
+    def _order(latest_json, signal, risk, max_risk):
+        orders.append(json.loads(latest_json.read_text())["entry"])
+        return "success"
+
+    module, state = _fetch_module(calls)
+    daemon = LiveTradeDaemon(
+        _config(tmp_path),
+        fetch_module=module,
+        client=_client(calls),
+        place_order=_order,
+    )
+    with patch.object(sched, "LOG_FILE", tmp_path / "run.log"):
+        daemon.start()
+        first = asyncio.run(daemon.run_once())
+        state["connected"] = False  # terminal dropped between ticks
+        second = asyncio.run(daemon.run_once())
+        daemon.stop()
+
+    assert calls == ["init", "fetch", "send", "init", "fetch", "send"]
+    assert state["connected"] is False
+    assert first == second == {
+        "fetch": "success",
+        "send": "success",
+        "parse": "success",
+        "post_signal": "success",
+    }
+    assert orders == [1, 1]
+    assert set(daemon.timings) == {"fetch", "send", "parse", "order", "report", "total"}
+    log = (tmp_path / "run.log").read_text(encoding="utf-8")
+    assert "order:success" in log and "timing:fetch=" in log
+
+
+def test_daemon_reports_failed_stage(tmp_path):
+    calls: list = []
+    module, _ = _fetch_module(calls)
+    module.fetch_multi_tf = lambda *a, **k: (_ for _ in ()).throw(RuntimeError("boom"))
+    daemon = LiveTradeDaemon(
+        _config(tmp_path), fetch_module=module, client=_client(calls),
+        place_order=lambda *a: "success",
+    )
+    with patch.object(sched, "LOG_FILE", tmp_path / "run.log"):
+        daemon.start()
+        results = asyncio.run(daemon.run_once())
+        daemon.stop()
+    assert results == {"fetch": "error"}
+    assert "send" not in calls
+
+
+def test_symbol_configs_override_fetch_and_risk(tmp_path):
+    config = _config(tmp_path)
+    config["fetch"]["symbol_signal"] = "xauusd"
+    config["risk_per_trade"] = 1.0
+    config["symbols"] = [
+        "XAUUSD",
+        {"symbol": "EURUSD", "timeframes": [{"tf": "M5", "keep": 5}], "risk_per_trade": 0.5},
+    ]
+    gold, eur = symbol_configs(config)
+    assert gold["fetch"]["symbol_signal"] == "xauusd" and gold["risk_per_trade"] == 1.0
+    assert eur["fetch"]["symbol_signal"] == "eurusd" and eur["risk_per_trade"] == 0.5
+    assert eur["fetch"]["timeframes"] == [{"tf": "M5", "keep": 5}]
+    assert eur["parse"]["path_signals_json"] == str(tmp_path / "json" / "eurusd")
+    assert eur["parse"]["path_latest_response"] == str(tmp_path / "eurusd" / "latest.txt")
+    assert "symbols" not in eur
+
+
+def test_multi_symbol_tick_serializes_orders(tmp_path):
+    calls: list = []
+    fetched: list = []
+    orders: list = []
+    active = [0]
+    notified: list = []
+
+    def _order(latest_json, signal, risk, max_risk):
+        active[0] += 1
+        assert active[0] == 1
+        time.sleep(0.01)
+        orders.append((latest_json.parent.name, risk))
+        active[0] -= 1
+        return "success"
+
+    module, _ = _fetch_module(calls)
+    fetch = module.fetch_multi_tf
+    module.fetch_multi_tf = lambda symbol, *a, **k: fetched.append(symbol) or fetch(
+        symbol, *a, **k
+    )
+    config = _config(tmp_path)
+    config["workflow"] = {"gpt_pool": {"concurrency": 2}}
+    config["symbols"] = [
+        {"symbol": s, "risk_per_trade": r}
+        for s, r in (("XAUUSD", 1.0), ("EURUSD", 0.5), ("GBPUSD", 0.5))
+    ]
+    daemon = MultiSymbolDaemon(
+        config, fetch_module=module, client=_client(calls), place_order=_order
+    )
+    with patch.object(sched, "LOG_FILE", tmp_path / "run.log"), patch.object(
+        sched, "_notify_summary", lambda cfg, msg: notified.append(msg)
+    ):
+        daemon.start()
+        results = asyncio.run(daemon.run_once())
+        daemon.stop()
+
+    assert sorted(fetched) == ["EURUSD", "GBPUSD", "XAUUSD"]
+    assert calls.count("init") == 1
+    assert set(results) == {"XAUUSD", "EURUSD", "GBPUSD"}
+    assert all(r["parse"] == "success" for r in results.values())
+    assert sorted(orders) == [("eurusd", 0.5), ("gbpusd", 0.5), ("xauusd", 1.0)]
+    assert len(notified) == 1
+    assert all(f"symbol:{s}" in notified[0] for s in ("XAUUSD", "EURUSD", "GBPUSD"))
+    assert (tmp_path / "json" / "eurusd").is_dir()
@@ -0,0 +1,127 @@
+import json
+import threading
+import urllib.request
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from gpt_trader.send.send_to_gpt import _call_gpt
+from gpt_trader.utils import metrics
+from gpt_trader.utils.metrics import JSONL_ENV, REGISTRY, MetricsRegistry, ingest_jsonl, span
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry(monkeypatch):
+    monkeypatch.delenv(JSONL_ENV, raising=False)
+    REGISTRY.reset()
+    yield
+    REGISTRY.reset()
+
+
+def test_span_records_status_and_renders() -> None:
+    with span("fetch", symbol="XAUUSDm"):
+        pass
+    with pytest.raises(RuntimeError):
+        with span("fetch", symbol="XAUUSDm"):
+            raise RuntimeError("boom")
+    snap = REGISTRY.snapshot()
+    assert snap["fetch[symbol=XAUUSDm]"]["count"] == 2
+
+    text = REGISTRY.render()
+    assert '# TYPE gpt_trader_stage_seconds histogram' in text
+    assert 'gpt_trader_stage_seconds_bucket{stage="fetch",symbol="XAUUSDm",le="+Inf"} 2' in text
+    assert 'gpt_trader_stage_runs_total{stage="fetch",symbol="XAUUSDm",status="error"} 1' in text
+    assert 'gpt_trader_stage_runs_total{stage="fetch",symbol="XAUUSDm",status="ok"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    registry = MetricsRegistry(buckets=(1.0, 5.0))
+    for seconds in (0.5, 2.0, 7.0):
+        registry.observe("gpt", seconds)
+    text = registry.render()
+    assert 'gpt_trader_stage_seconds_bucket{stage="gpt",le="1"} 1' in text
+    assert 'gpt_trader_stage_seconds_bucket{stage="gpt",le="5"} 2' in text
+    assert 'gpt_trader_stage_seconds_bucket{stage="gpt",le="+Inf"} 3' in text
+    assert 'gpt_trader_stage_last_seconds{stage="gpt"} 7.000000' in text
+
+
+def test_jsonl_and_ingest_from_other_processes(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setenv(JSONL_ENV, str(path))
+    metrics.observe("order", 0.2, symbol="XAUUSDm")
+    record = json.loads(path.read_text(encoding="utf-8"))
+    assert record["stage"] == "order" and record["symbol"] == "XAUUSDm"
+
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"stage": "indicators", "seconds": 0.1, "status": "ok", "pid": -1}) + "\n")
+        f.write('{"stage": "partial')  # still being written
+    assert ingest_jsonl() == 1  # own span skipped
+    assert ingest_jsonl() == 0
+    assert REGISTRY.snapshot()["indicators"]["count"] == 1
+
+
+def test_configure_skips_spans_of_earlier_processes(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "metrics.jsonl"
+    line = json.dumps({"stage": "gpt", "seconds": 1.0, "status": "ok", "pid": -1}) + "\n"
+    path.write_text(line * 3, encoding="utf-8")
+    monkeypatch.setenv(JSONL_ENV, "")
+    monkeypatch.setattr(metrics, "_ingest_offsets", {})
+    metrics.configure({"jsonl": str(path)})
+    assert ingest_jsonl() == 0
+    with path.open("a", encoding="utf-8") as f:
+        f.write(line)
+    assert ingest_jsonl() == 1
+
+
+def test_concurrent_scrapes_count_each_span_once(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "metrics.jsonl"
+    line = json.dumps({"stage": "parse", "seconds": 0.1, "status": "ok", "pid": -1}) + "\n"
+    path.write_text(line * 2000, encoding="utf-8")
+    monkeypatch.setattr(metrics, "_ingest_offsets", {})
+    threads = [threading.Thread(target=ingest_jsonl, args=(path,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert REGISTRY.snapshot()["parse"]["count"] == 2000
+
+
+def test_http_endpoint(monkeypatch) -> None:
+    monkeypatch.setattr(metrics, "_server", None)
+    server = metrics.start_http_server(0)
+    try:
+        metrics.observe("notify", 0.3, channel="line")
+        url = f"http://127.0.0.1:{server.server_port}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            body = resp.read().decode("utf-8")
+        assert resp.headers["Content-Type"].startswith("text/plain")
+        assert 'stage="notify"' in body
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_call_gpt_stream_records_ttft() -> None:
+    def chunk(text):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    def create(model, messages, stream=False):
+        assert stream
+        return iter([SimpleNamespace(choices=[]), chunk(None), chunk('{"a"'), chunk(": 1} ")])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    assert _call_gpt([], "gpt-4o", client, stream=True) == '{"a": 1}'
+    snap = REGISTRY.snapshot()
+    assert snap["gpt_ttft[model=gpt-4o]"]["count"] == 1
+    assert snap["gpt[model=gpt-4o]"]["count"] == 1
+
+
+def test_gauges_render_and_reset() -> None:
+    metrics.gauge("pipeline_queue_depth", 3, queue="send")
+    metrics.gauge("pipeline_queue_depth", 1, queue="send")
+    text = REGISTRY.render()
+    assert "# TYPE gpt_trader_pipeline_queue_depth gauge" in text
+    assert 'gpt_trader_pipeline_queue_depth{queue="send"} 1' in text
+    REGISTRY.reset()
+    assert REGISTRY.gauges() == {}
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+from gpt_trader.utils.mt5_session import Mt5Session, get_mt5_session
+
+
+def _stub(fail_first: int = 0):
+    state = {"up": False, "fails": fail_first, "calls": []}
+
+    def _init():
+        state["calls"].append("init")
+        if state["fails"]:
+            state["fails"] -= 1
+            return False
+        state["up"] = True
+        return True
+
+    def _shutdown():
+        state["calls"].append("shutdown")
+        state["up"] = False
+
+    mt5 = SimpleNamespace(
+        initialize=_init,
+        shutdown=_shutdown,
+        terminal_info=lambda: object() if state["up"] else None,
+        last_error=lambda: (-10004, "No IPC connection"),
+    )
+    return mt5, state
+
+
+def test_refcount_keeps_connection_until_last_release():
+    mt5, state = _stub()
+    session = Mt5Session(mt5)
+    session.acquire()
+    session.acquire()
+    session.release()
+    assert state["calls"] == ["init"]
+    session.release()
+    assert state["calls"] == ["init", "shutdown"]
+
+
+def test_persistent_session_survives_release():
+    mt5, state = _stub()
+    session = Mt5Session(mt5)
+    session.persistent = True
+    with session.use():
+        pass
+    assert state["up"] and state["calls"] == ["init"]
+    session.close()
+    assert not state["up"]
+
+
+def test_reconnects_with_backoff():
+    mt5, state = _stub(fail_first=2)
+    delays: list = []
+    session = Mt5Session(mt5, max_attempts=3, base_delay=0.5, sleep=delays.append)
+    session.acquire()
+    assert state["calls"] == ["init"] * 3
+    assert delays == [0.5, 1.0]
+
+    state["up"] = False
+    session.ensure()
+    assert session.reconnects == 1
+    assert state["calls"][-2:] == ["shutdown", "init"]
+
+
+def test_connect_gives_up_after_max_attempts():
+    mt5, _ = _stub(fail_first=5)
+    session = Mt5Session(mt5, max_attempts=2, sleep=lambda s: None)
+    with pytest.raises(RuntimeError, match="No IPC connection"):
+        session.acquire()
+
+
+def test_get_session_is_shared_per_module():
+    mt5, _ = _stub()
+    assert get_mt5_session(mt5) is get_mt5_session(mt5)
+    assert get_mt5_session(_stub()[0]) is not get_mt5_session(mt5)
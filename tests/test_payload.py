@@ -0,0 +1,63 @@
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from gpt_trader.send.payload import encode_compact, infer_digits, prepare_payload
+from gpt_trader.utils import dumps_no_nulls
+from gpt_trader.utils.indicators import compute_indicators
+
+
+def _frame() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    frames = []
+    for label, freq, keep in (("5m", "5min", 20), ("15m", "15min", 8), ("1h", "h", 6)):
+        n = 250
+        close = np.round(2300 + rng.normal(0, 1, n).cumsum(), 2)
+        df = pd.DataFrame(
+            {
+                "timestamp": pd.date_range("2024-01-01", periods=n, freq=freq),
+                "open": close,
+                "high": close + 0.5,
+                "low": close - 0.5,
+                "close": close,
+                "tick_volume": rng.integers(100, 1000, n),
+            }
+        )
+        df = compute_indicators(
+            df, {"atr14": True, "rsi14": True, "sma20": True, "ema50": True, "sma200": True}
+        ).tail(keep)
+        df["timeframe"] = label
+        df["session"] = "asia"
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_compact_payload_is_columnar_and_delta_encoded():
+    df = _frame()
+    doc = json.loads(encode_compact(json.loads(dumps_no_nulls(df)), indicator_digits=1))
+    m5 = doc["timeframes"]["5m"]
+    assert list(doc["timeframes"]) == ["5m", "15m", "1h"]
+    assert m5["cols"][:6] == ["t", "o", "h", "l", "c", "v"]
+    assert m5["session"] == [[0, "asia"]]
+    assert m5["t0"] == df["timestamp"].iloc[0].isoformat()
+    assert [row[0] for row in m5["rows"]] == [0] + [300] * 19
+    rsi = m5["cols"].index("rsi14")
+    assert m5["rows"][-1][rsi] == round(df[df["timeframe"] == "5m"]["rsi14"].iloc[-1], 1)
+    assert m5["rows"][-1][4] == df[df["timeframe"] == "5m"]["close"].iloc[-1]
+
+
+def test_prepare_payload_shrinks_prompt(caplog):
+    text = dumps_no_nulls(_frame())
+    assert prepare_payload(text, {}) == text
+    with caplog.at_level(logging.INFO):
+        compact = prepare_payload(text, {"payload_format": "compact"})
+    assert len(text) / len(compact) > 3
+    assert "Payload tokens" in caplog.text
+
+
+def test_infer_digits():
+    assert infer_digits([2034.5, 2034.25, None]) == 2
+    assert infer_digits([1.08765, 1.1]) == 5
+    assert infer_digits([150.0]) == 0
@@ -0,0 +1,60 @@
+from gpt_trader.send.response_cache import (
+    ResponseCache,
+    cache_key,
+    lookup,
+    open_cache,
+    store,
+)
+
+MESSAGES = [
+    {"role": "system", "content": "sys"},
+    {"role": "user", "content": "prompt\n\nJSON Data:\n[]"},
+]
+
+
+def test_cache_key_depends_on_model_and_messages():
+    key = cache_key("gpt-4o", MESSAGES)
+    assert key == cache_key("gpt-4o", [dict(m) for m in MESSAGES])
+    assert key != cache_key("gpt-4o-mini", MESSAGES)
+    changed = [MESSAGES[0], {"role": "user", "content": "prompt\n\nJSON Data:\n[1]"}]
+    assert key != cache_key("gpt-4o", changed)
+
+
+def test_ttl_expires_entries(tmp_path):
+    now = [1000.0]
+    cache = ResponseCache(tmp_path / "c.sqlite", ttl=60, clock=lambda: now[0])
+    cache.put("k", "resp")
+    assert cache.get("k") == "resp"
+    now[0] += 61
+    assert cache.get("k") is None
+    assert cache.evict() == 1
+    assert len(cache) == 0
+
+
+def test_size_limits_evict_least_recently_used(tmp_path):
+    now = [0.0]
+    cache = ResponseCache(tmp_path / "c.sqlite", max_entries=2, clock=lambda: now[0])
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        cache.put(key, key * 10)
+    now[0] += 1
+    cache.get("a")
+    cache.evict()
+    assert cache.get("a") is not None and cache.get("b") is None
+    cache.max_entries = None
+    cache.max_bytes = 15
+    cache.evict()
+    assert len(cache) == 1
+
+
+def test_modes(tmp_path):
+    cache = open_cache({"cache_path": str(tmp_path / "c.sqlite")}, "read-write")
+    store(cache, "read-only", "k", "ignored")
+    assert lookup(cache, "read-write", "k") is None
+    store(cache, "read-write", "k", "first")
+    assert lookup(cache, "read-only", "k") == "first"
+    assert lookup(cache, "refresh", "k") is None
+    store(cache, "refresh", "k", "second")
+    assert lookup(cache, "read-write", "k") == "second"
+    assert open_cache({}, "off") is None
+    cache.close()
@@ -0,0 +1,98 @@
+import json
+import os
+from pathlib import Path
+
+from gpt_trader.utils.artifact_index import ArtifactIndex, latest_artifact, record_artifact
+from gpt_trader.utils.retention import (
+    RetentionRule,
+    apply_rule,
+    expired_files,
+    iter_archive,
+    read_archived,
+    retention_rules,
+    run_retention,
+)
+
+DAY = 86400
+NOW = 1_700_000_000.0
+
+
+def _write(path: Path, text: str, age_days: float) -> Path:
+    path.write_text(text, encoding="utf-8")
+    mtime = NOW - age_days * DAY
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_age_and_count_limits(tmp_path: Path) -> None:
+    for i, age in enumerate([10, 5, 3, 1, 0.5]):
+        _write(tmp_path / f"f{i}.json", "{}", age)
+    _write(tmp_path / ".artifact_index.sqlite", "", 30)
+
+    by_age = RetentionRule(tmp_path, max_age_days=4)
+    assert [p.name for p in expired_files(by_age, NOW)] == ["f0.json", "f1.json"]
+    by_count = RetentionRule(tmp_path, max_age_days=None, max_files=2)
+    assert [p.name for p in expired_files(by_count, NOW)] == ["f0.json", "f1.json", "f2.json"]
+    assert expired_files(RetentionRule(tmp_path / "missing"), NOW) == []
+
+
+def test_compaction_round_trip(tmp_path: Path) -> None:
+    directory = tmp_path / "fetch"
+    directory.mkdir()
+    old = _write(directory / "xauusd1.json", '[{"close": 1.5}]', 20)
+    _write(directory / "xauusd1.csv", "close\n1.5\n", 20)
+    _write(directory / "xauusd2.json", '[{"close": 2.5}]', 20.5)
+    record_artifact(old, "xauusd")
+    keep = _write(directory / "xauusd3.json", "[]", 1)
+    record_artifact(keep, "xauusd")
+
+    stats = apply_rule(RetentionRule(directory, max_age_days=7), NOW)
+    assert stats == {"archived": 3, "deleted": 3}
+    # the index keeps its (empty) journal file next to it
+    files = [p for p in directory.iterdir() if p.is_file() and not p.name.endswith("-journal")]
+    assert sorted(p.name for p in files) == [
+        ".artifact_index.sqlite",
+        "xauusd3.json",
+    ]
+    with ArtifactIndex(directory) as index:
+        assert len(index) == 1
+    assert latest_artifact(directory, "xauusd") == keep
+
+    archive = directory / "archive"
+    assert read_archived(archive, "xauusd1.csv") == "close\n1.5\n"
+    records = list(iter_archive(archive, pattern="*.json"))
+    assert sorted(json.loads(r["text"])[0]["close"] for r in records) == [1.5, 2.5]
+
+    # a second run appends to the same daily archive
+    _write(directory / "xauusd4.json", "[4]", 20)
+    apply_rule(RetentionRule(directory, max_age_days=7), NOW)
+    assert read_archived(archive, "xauusd4.json") == "[4]"
+    assert read_archived(archive, "xauusd1.csv") == "close\n1.5\n"
+
+
+def test_delete_without_archive(tmp_path: Path) -> None:
+    _write(tmp_path / "a.json", "{}", 9)
+    stats = apply_rule(RetentionRule(tmp_path, max_age_days=3, archive=False), NOW)
+    assert stats == {"archived": 0, "deleted": 1}
+    assert not (tmp_path / "archive").exists()
+
+
+def test_rules_from_config(tmp_path: Path) -> None:
+    config = {
+        "fetch": {"save_as_path": str(tmp_path / "fetch")},
+        "send": {"save_prompt_dir": str(tmp_path / "prompts")},
+        "parse": {"path_signals_json": str(tmp_path / "signals")},
+        "retention": {"max_age_days": 2},
+    }
+    rules = retention_rules(config)
+    assert [r.path.name for r in rules] == ["fetch", "prompts", "signals"]
+    assert all(r.max_age_days == 2 for r in rules)
+
+    (tmp_path / "signals").mkdir()
+    _write(tmp_path / "signals" / "old.json", "{}", 3)
+    results = run_retention(config, NOW)
+    assert results[str(tmp_path / "signals")] == {"archived": 1, "deleted": 1}
+
+    config["retention"] = {"dirs": [{"path": str(tmp_path), "max_files": 5, "archive": False}]}
+    (rule,) = retention_rules(config)
+    assert rule.max_files == 5 and rule.archive_dir is None
@@ -6,8 +6,11 @@ import importlib
 from types import ModuleType
 import sys
 
+import numpy as np
 import pytest
 
+from gpt_trader.utils.risk import calculate_lot, calculate_lots
+
 
 def _get_sender():
     mod = importlib.import_module("gpt_trader.cli.latest_signal_to_mt5")
@@ -268,3 +271,15 @@ def test_adjust_note_recorded(tmp_path) -> None:
         assert sender.pending_order_type == "sell_limit"
         assert sender.adjust_note == "adjust:sell_stop->sell_limit"
 
+
+
+def test_sender_and_simulator_share_lot_formula() -> None:
+    entries = np.array([2000.0, 2000.0, 1.1050, 2000.0])
+    sls = np.array([1990.0, 1999.5, 1.1000, 2000.0])
+    risks = np.array([1.0, 2.0, 0.5, 1.0])
+    lots = calculate_lots(10000, risks, entries, sls, 1.0, 0.1, 0.01, 2.0, 0.01)
+    assert lots[:3].tolist() == [
+        calculate_lot(10000, r, e, s, 1.0, 0.1, 0.01, 2.0, 0.01)
+        for r, e, s in zip([1.0, 2.0, 0.5], entries[:3], sls[:3])
+    ]
+    assert np.isnan(lots[3])
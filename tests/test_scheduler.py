@@ -1,6 +1,15 @@
+import json
 from datetime import datetime, time, timezone
+from pathlib import Path
 
-from gpt_trader.cli.scheduler_liveTrade import _within_window, _next_window_run
+from gpt_trader.cli.scheduler_liveTrade import (
+    NewBarDebouncer,
+    _add_retention_job,
+    _next_bar_close,
+    _next_window_run,
+    _watch_new_bars,
+    _within_window,
+)
 
 
 def test_within_window_basic() -> None:
@@ -102,3 +111,67 @@ def test_next_run_midweek_late_hour() -> None:
         time(23, 35),
     )
     assert next_run == datetime(2024, 6, 12, 9, 40)
+
+
+def test_next_bar_close_aligns_to_candles() -> None:
+    now = datetime(2024, 6, 10, 9, 7, 30)
+    assert _next_bar_close(now, "M5", 5) == datetime(2024, 6, 10, 9, 10, 5)
+    assert _next_bar_close(datetime(2024, 6, 10, 9, 10, 3), "M5", 5) == datetime(
+        2024, 6, 10, 9, 10, 5
+    )
+    assert _next_bar_close(now, "H4") == datetime(2024, 6, 10, 12, 0)
+    assert _next_bar_close(now, "H4", offset_minutes=180) == datetime(2024, 6, 10, 11, 0)
+    aware = datetime(2024, 6, 10, 9, 7, tzinfo=timezone.utc)
+    assert _next_bar_close(aware, "M15") == datetime(2024, 6, 10, 9, 15, tzinfo=timezone.utc)
+
+
+def test_new_bar_debouncer_fires_once_per_bar() -> None:
+    now = [0.0]
+    debouncer = NewBarDebouncer(2.0, clock=lambda: now[0])
+    assert debouncer.feed(300) is None  # primes with the bar being formed
+    assert debouncer.feed(300) is None
+    assert debouncer.feed(600) is None
+    now[0] = 1.0
+    assert debouncer.feed(600) is None
+    now[0] = 2.5
+    assert debouncer.feed(600) == 600
+    assert debouncer.feed(600) is None
+    assert debouncer.feed(None) is None
+
+
+def test_watch_new_bars_runs_on_each_new_bar() -> None:
+    feed = iter([60, 60, 120, 120, 180, 240, 240])
+    runs: list = []
+    polls: list = []
+    _watch_new_bars(
+        lambda: runs.append(len(polls)),
+        lambda: next(feed),
+        NewBarDebouncer(0.0),
+        sleep=polls.append,
+        should_stop=lambda: len(polls) == 7,
+    )
+    assert runs == [2, 4, 5]
+
+
+class _FakeScheduler:
+    def __init__(self) -> None:
+        self.jobs: list = []
+
+    def add_job(self, func, trigger, **kwargs):
+        self.jobs.append((func, trigger, kwargs))
+        return kwargs
+
+
+def test_retention_job_only_when_enabled(tmp_path: Path) -> None:
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(json.dumps({"retention": {"enabled": False}}))
+    scheduler = _FakeScheduler()
+    assert _add_retention_job(scheduler, cfg_path) is None
+    assert scheduler.jobs == []
+
+    cfg_path.write_text(json.dumps({"retention": {"enabled": True, "interval_minutes": 15}}))
+    assert _add_retention_job(scheduler, cfg_path) is not None
+    (_, trigger, kwargs), = scheduler.jobs
+    assert trigger == "interval"
+    assert kwargs["minutes"] == 15
+    assert kwargs["args"] == [cfg_path]
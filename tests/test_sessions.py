@@ -0,0 +1,42 @@
+import pandas as pd
+
+from gpt_trader.fetch import fetch_mt5_data, fetch_yf_data
+from gpt_trader.utils.sessions import (
+    MT5_SESSIONS,
+    YF_SESSIONS,
+    apply_sessions,
+    label_sessions,
+    parse_sessions,
+)
+
+
+def test_default_tables_match_scalar_labels():
+    times = pd.Series(pd.date_range("2024-03-30", periods=2 * 24 * 60, freq="min"))
+    for table, scalar in (
+        (MT5_SESSIONS, fetch_mt5_data.get_session),
+        (YF_SESSIONS, fetch_yf_data.get_session),
+    ):
+        labels = label_sessions(times, parse_sessions(table))
+        assert list(labels) == [scalar(ts) for ts in times]
+
+
+def test_tz_sessions_follow_dst_and_flag_overlaps():
+    df = pd.DataFrame(
+        {
+            "timestamp": pd.to_datetime(
+                ["2024-01-15 07:30", "2024-07-15 07:30", "2024-07-15 13:00", "2024-07-15 22:00"]
+            )
+        }
+    )
+    config = {
+        "utc_offset": 0,
+        "table": [
+            {"name": "london", "start": "08:00", "end": "16:30", "tz": "Europe/London"},
+            {"name": "newyork", "start": "08:00", "end": "17:00", "tz": "America/New_York"},
+        ],
+        "default": "off",
+        "overlaps": [["london", "newyork"]],
+    }
+    assert apply_sessions(df, config, MT5_SESSIONS) == ["overlap_london_newyork"]
+    assert df["session"].tolist() == ["off", "london", "london", "off"]
+    assert df["overlap_london_newyork"].tolist() == [False, False, True, False]
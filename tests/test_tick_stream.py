@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from gpt_trader.fetch.tick_stream import (
+    CandleAggregator,
+    TickPoller,
+    replay_ticks,
+    write_tick_csv,
+)
+
+TICK_DTYPE = np.dtype(
+    [("time_msc", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("last", "<f8"), ("volume", "<f8")]
+)
+
+
+def _ticks(rows) -> np.ndarray:
+    return np.array([(t, p, p + 0.1, 0.0, 1.0) for t, p in rows], dtype=TICK_DTYPE)
+
+
+# 00:00:05 .. 00:05:10, prices chosen so every M1 candle differs
+ROWS = [(5_000, 10.0), (30_000, 12.0), (59_999, 11.0), (60_000, 9.0), (119_000, 13.0),
+        (130_000, 8.0), (299_000, 14.0), (310_000, 15.0)]
+
+
+def test_replay_builds_candles_and_emits_in_order(tmp_path):
+    path = tmp_path / "ticks.csv"
+    write_tick_csv(path, _ticks(ROWS))
+    seen: list = []
+    agg = CandleAggregator(["M1", "M5"], on_bar_closed=lambda tf, bar: seen.append((tf, bar["time"])))
+
+    events = replay_ticks(path, agg, chunk=3)
+
+    assert seen == [(tf, t) for tf, t in [("M1", 0), ("M1", 60), ("M1", 120), ("M1", 240), ("M5", 0)]]
+    assert [e[0] for e in events] == [s[0] for s in seen]
+    first = events[0][1]
+    assert (first["open"], first["high"], first["low"], first["close"]) == (10.0, 12.0, 10.0, 11.0)
+    assert first["tick_volume"] == 3
+    m5 = agg.bars("M5")
+    assert m5["high"].tolist() == [14.0] and m5["low"].tolist() == [8.0]
+    assert agg.current("M5")["open"] == 15.0
+
+
+def test_tick_by_tick_matches_batch():
+    batch, single = CandleAggregator(["M1"]), CandleAggregator(["M1"])
+    batch.add_ticks([t for t, _ in ROWS], [p for _, p in ROWS])
+    for t, p in ROWS:
+        single.add_ticks([t], [p])
+    assert batch.bars("M1").tolist() == single.bars("M1").tolist()
+
+
+def test_close_due_closes_quiet_candle_and_drops_late_ticks():
+    agg = CandleAggregator(["M1"])
+    agg.add_ticks([5_000], [10.0])
+    assert agg.close_due(59.0) == []
+    assert [bar["close"] for _, bar in agg.close_due(60.5)] == [10.0]
+    assert agg.add_ticks([59_500, 61_000], [99.0, 11.0]) == []
+    assert agg.current("M1")["open"] == 11.0
+
+
+def test_poller_skips_ticks_it_already_saw(tmp_path):
+    feed = [_ticks(ROWS[:3]), _ticks(ROWS[2:5]), _ticks(ROWS[4:])]
+    calls: list = []
+
+    def _copy_ticks_from(symbol, since, count, flags):
+        calls.append(int(since.timestamp()))
+        return feed.pop(0)
+
+    mt5 = SimpleNamespace(
+        COPY_TICKS_ALL=-1,
+        copy_ticks_from=_copy_ticks_from,
+        symbol_info_tick=lambda symbol: SimpleNamespace(time=100),
+    )
+    agg = CandleAggregator(["M1"])
+    poller = TickPoller(mt5, "XAUUSD", agg, lookback=100, record_path=tmp_path / "rec.csv",
+                        clock=lambda: 0.0)
+    events = poller.poll() + poller.poll() + poller.poll()
+
+    assert calls == [0, 59, 119]
+    assert [bar["time"] for _, bar in events] == [0, 60, 120, 240]
+    replayed = CandleAggregator(["M1"])
+    replay_ticks(tmp_path / "rec.csv", replayed)
+    assert replayed.bars("M1")["tick_volume"].tolist() == [3, 2, 1, 1]
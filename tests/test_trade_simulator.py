@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gpt_trader.backtest.simulator import (
+    TouchIndex,
+    TradeSimulator,
+    adjust_order_types,
+    summarize,
+)
+from gpt_trader.utils.risk import calculate_lot
+
+START = pd.Timestamp("2024-01-02 10:00:00")
+
+
+def _bars(rows):
+    """Return M1 bars from ``(high, low, close)`` tuples starting at START."""
+    times = [int((START + pd.Timedelta(minutes=i)).timestamp()) for i in range(len(rows))]
+    high, low, close = zip(*rows)
+    return pd.DataFrame({"time": times, "open": close, "high": high, "low": low, "close": close})
+
+
+def _signal(order_type, entry, sl, tp, minute=0, confidence=80):
+    return {
+        "timestamp": (START + pd.Timedelta(minutes=minute)).isoformat(),
+        "signal_id": "xauusd240102",
+        "entry": entry,
+        "sl": sl,
+        "tp": tp,
+        "pending_order_type": order_type,
+        "confidence": confidence,
+    }
+
+
+BARS = _bars(
+    [
+        (2001, 1999, 2000),  # 10:00 signal bar, close 2000
+        (2001, 1996, 1997),  # 10:01 buy_limit 1997 fills
+        (2003, 1996, 2002),  # 10:02
+        (2009, 2001, 2008),  # 10:03 tp 2006 reached
+        (2009, 1990, 1991),  # 10:04 drops through everything
+    ]
+)
+
+
+def test_touch_index_matches_linear_scan() -> None:
+    rng = np.random.default_rng(7)
+    for size in (1, 2, 5, 33, 200):
+        values = rng.normal(size=size)
+        index = TouchIndex(values)
+        thresholds = rng.normal(size=500) * 1.5
+        starts = rng.integers(0, size + 1, size=500)
+        expected = []
+        for level, start in zip(thresholds, starts):
+            hits = np.flatnonzero(values[start:] >= level)
+            expected.append(start + hits[0] if len(hits) else -1)
+        assert index.first_at_or_above(thresholds, starts).tolist() == expected
+
+
+def test_buy_limit_fills_then_hits_tp() -> None:
+    signals = pd.DataFrame([_signal("buy_limit", 1997, 1994, 2006)])
+    trades = TradeSimulator(max_risk_per_trade=1.0).run(signals, BARS)
+    row = trades.iloc[0]
+    assert row["status"] == "tp"
+    assert row["fill_time"] == START + pd.Timedelta(minutes=1)
+    assert row["exit_time"] == START + pd.Timedelta(minutes=3)
+    assert row["r_multiple"] == pytest.approx(3.0)
+    lot = calculate_lot(10_000, 0.8, 1997, 1994, 1.0, 0.01, 0.01, 100.0, 0.01)
+    assert row["lot"] == lot
+    assert row["pnl"] == pytest.approx(9 * lot * 100)
+
+
+def test_tp_in_fill_bar_is_ignored() -> None:
+    signals = pd.DataFrame([_signal("sell_stop", 1999, 2010, 1992, minute=3)])
+    row = TradeSimulator(risk_per_trade=1.0).run(signals, BARS).iloc[0]
+    # the 10:04 bar fills the order and reaches the TP, but the SL is never hit
+    assert row["fill_time"] == START + pd.Timedelta(minutes=4)
+    assert row["status"] == "open"
+    assert row["exit_price"] == 1991
+    assert row["pnl_points"] == pytest.approx(8.0)
+
+
+def test_same_bar_sl_and_tp_counts_as_sl() -> None:
+    bars = _bars([(2001, 1999, 2000), (2001, 1996, 1997), (2010, 1990, 2000)])
+    signals = pd.DataFrame([_signal("buy_limit", 1997, 1994, 2006)])
+    row = TradeSimulator(risk_per_trade=1.0).run(signals, bars).iloc[0]
+    assert row["status"] == "sl"
+    assert row["r_multiple"] == pytest.approx(-1.0)
+    assert row["pnl"] == pytest.approx(-3 * row["lot"] * 100)
+
+
+def test_order_types_swap_like_the_sender() -> None:
+    types = np.array(["buy_stop", "buy_limit", "sell_stop", "sell_limit"], dtype=object)
+    entry = np.array([1990.0, 2010.0, 2010.0, 1990.0])
+    bid = np.full(4, 2000.0)
+    assert adjust_order_types(types, entry, bid, bid + 0.5).tolist() == [
+        "buy_limit",
+        "buy_stop",
+        "sell_limit",
+        "sell_stop",
+    ]
+
+
+def test_skip_invalid_expiry_and_summary() -> None:
+    signals = pd.DataFrame(
+        [
+            _signal("skip", None, None, None),
+            _signal("buy_limit", 1997, 1999, 2006),  # SL above entry
+            _signal("buy_limit", 1992, 1985, 2000),  # reached at 10:04, after expiry
+            _signal("buy_limit", 1997, 1994, 2006),
+        ]
+    )
+    simulator = TradeSimulator(max_risk_per_trade=1.0, expiry_minutes=3)
+    trades = simulator.run(signals, BARS)
+    assert trades["status"].tolist() == ["skipped", "invalid", "unfilled", "tp"]
+    summary = summarize(trades, simulator.balance)
+    assert summary["orders"] == 2
+    assert summary["fill_rate"] == 0.5
+    assert summary["win_rate"] == 1.0
+    assert summary["total_r"] == pytest.approx(3.0)
+    assert summary["final_balance"] == pytest.approx(10_000 + trades["pnl"].sum())
+
+
+def test_spread_delays_buy_fill() -> None:
+    signals = pd.DataFrame([_signal("buy_limit", 1996.5, 1993, 2006)])
+    assert TradeSimulator().run(signals, BARS).iloc[0]["status"] == "tp"
+    spread = TradeSimulator(spread=1.0).run(signals, BARS).iloc[0]
+    assert spread["fill_time"] == START + pd.Timedelta(minutes=4)
+    assert spread["status"] == "sl"
+
+
+def test_timezone_aware_timestamps_use_the_bar_clock() -> None:
+    row = _signal("buy_limit", 1997, 1994, 2006)
+    # 12:00+02:00 is 10:00 on the naive bar clock
+    row["timestamp"] = (START + pd.Timedelta(hours=2)).isoformat() + "+02:00"
+    trade = TradeSimulator().run(pd.DataFrame([row]), BARS).iloc[0]
+    assert trade["fill_time"] == START + pd.Timedelta(minutes=1)
+    assert trade["status"] == "tp"